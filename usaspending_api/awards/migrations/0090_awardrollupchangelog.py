@@ -0,0 +1,24 @@
+# Generated by Django 2.2.23 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('awards', '0089_auto_20211019_1755'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AwardRollupChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('award_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'award_rollup_change_log',
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from usaspending_api.awards.models.award import Award
+from usaspending_api.awards.models.award_rollup_change_log import AwardRollupChangeLog
 from usaspending_api.awards.models.broker_subaward import BrokerSubaward
 from usaspending_api.awards.models.financial_accounts_by_awards import (
     AbstractFinancialAccountsByAwards,
@@ -15,6 +16,7 @@ from usaspending_api.awards.models.transaction_normalized import TransactionNorm
 __all__ = [
     "AbstractFinancialAccountsByAwards",
     "Award",
+    "AwardRollupChangeLog",
     "BrokerSubaward",
     "CovidFinancialAccountMatview",
     "FinancialAccountsByAwards",
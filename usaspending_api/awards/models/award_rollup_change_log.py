@@ -0,0 +1,39 @@
+"""
+AwardRollupChangeLog (award_rollup_change_log) records the awards whose transactions were created, updated, or deleted
+by a loader, and so whose values rolled up from those transactions (earliest/latest transaction, totals, executive
+compensation, etc.) need to be recalculated.
+
+Loaders append the ids of the awards they touch as they go, and usaspending_api.etl.award_helpers
+.update_awards_from_change_log drains the table in bounded batches, recalculating only those awards. An award can be
+appended more than once before it is drained; each batch recalculates it once.
+"""
+import io
+
+from datetime import datetime, timezone
+from django.db import connection, models
+
+
+class AwardRollupChangeLogManager(models.Manager):
+    def append(self, award_ids):
+        """COPY the award ids into the change log, rather than building an INSERT statement with all of them"""
+        award_ids = set(award_id for award_id in award_ids if award_id is not None)
+        if not award_ids:
+            return 0
+
+        created_at = datetime.now(timezone.utc).isoformat()
+        rows = io.StringIO("".join(f"{award_id}\t{created_at}\n" for award_id in award_ids))
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(f"COPY {self.model._meta.db_table} (award_id, created_at) FROM STDIN", rows)
+        return len(award_ids)
+
+
+class AwardRollupChangeLog(models.Model):
+
+    id = models.BigAutoField(primary_key=True)
+    award_id = models.BigIntegerField()
+    created_at = models.DateTimeField()
+
+    objects = AwardRollupChangeLogManager()
+
+    class Meta:
+        db_table = "award_rollup_change_log"
@@ -3,18 +3,22 @@ import time
 
 from copy import copy
 from datetime import datetime, timezone
+from django.conf import settings
 from django.db import connection, transaction
 
-from usaspending_api.awards.models import TransactionFABS, TransactionNormalized, Award
+from usaspending_api.awards.models import AwardRollupChangeLog, TransactionFABS, TransactionNormalized, Award
 from usaspending_api.broker.helpers.get_business_categories import get_business_categories
 from usaspending_api.common.helpers.date_helper import cast_datetime_to_utc
 from usaspending_api.common.helpers.dict_helpers import upper_case_dict_values
 from usaspending_api.common.helpers.etl_helpers import update_c_to_d_linkages
 from usaspending_api.common.helpers.date_helper import fy
 from usaspending_api.common.helpers.timing_helpers import timer
-from usaspending_api.etl.award_helpers import update_awards, update_assistance_awards
+from usaspending_api.etl.award_helpers import update_awards, update_assistance_awards, update_awards_from_change_log
 from usaspending_api.etl.broker_etl_helpers import dictfetchall
 from usaspending_api.etl.management.load_base import load_data_into_model, format_date
+from usaspending_api.etl.reference_data_cache import reference_data, AGENCY_BY_SUBTIER_CODE
+from usaspending_api.etl.transaction_loaders.data_load_helpers import format_column_list, format_update_from_pairs
+from usaspending_api.etl.transaction_loaders.generic_loaders import copy_load_objects_to_temp_table
 from usaspending_api.references.models import Agency
 
 
@@ -22,6 +26,25 @@ logger = logging.getLogger("script")
 
 BATCH_FETCH_SIZE = 25000
 
+FABS_NORMALIZED_FIELD_MAP = {
+    "type": "assistance_type",
+    "description": "award_description",
+    "funding_amount": "total_funding_amount",
+}
+
+FABS_FIELD_MAP = {
+    "officer_1_name": "high_comp_officer1_full_na",
+    "officer_1_amount": "high_comp_officer1_amount",
+    "officer_2_name": "high_comp_officer2_full_na",
+    "officer_2_amount": "high_comp_officer2_amount",
+    "officer_3_name": "high_comp_officer3_full_na",
+    "officer_3_amount": "high_comp_officer3_amount",
+    "officer_4_name": "high_comp_officer4_full_na",
+    "officer_4_amount": "high_comp_officer4_amount",
+    "officer_5_name": "high_comp_officer5_full_na",
+    "officer_5_amount": "high_comp_officer5_amount",
+}
+
 
 def fetch_fabs_data_generator(dap_uid_list):
     db_cursor = connection.cursor()
@@ -49,31 +72,19 @@ def insert_all_new_fabs(all_new_to_insert):
     update_award_ids = []
     for to_insert in fetch_fabs_data_generator(all_new_to_insert):
         start = time.perf_counter()
-        update_award_ids.extend(insert_new_fabs(to_insert))
+        if settings.FABS_SET_BASED_LOAD:
+            award_ids = bulk_insert_new_fabs(to_insert)
+        else:
+            award_ids = insert_new_fabs(to_insert)
+        if settings.AWARD_ROLLUP_CHANGE_LOG:
+            # Logged in the same transaction as the chunk, so that the log holds every award of the loaded transactions
+            AwardRollupChangeLog.objects.append(award_ids)
+        update_award_ids.extend(award_ids)
         logger.info("FABS insertions took {:.2f}s".format(time.perf_counter() - start))
     return update_award_ids
 
 
 def insert_new_fabs(to_insert):
-    fabs_normalized_field_map = {
-        "type": "assistance_type",
-        "description": "award_description",
-        "funding_amount": "total_funding_amount",
-    }
-
-    fabs_field_map = {
-        "officer_1_name": "high_comp_officer1_full_na",
-        "officer_1_amount": "high_comp_officer1_amount",
-        "officer_2_name": "high_comp_officer2_full_na",
-        "officer_2_amount": "high_comp_officer2_amount",
-        "officer_3_name": "high_comp_officer3_full_na",
-        "officer_3_amount": "high_comp_officer3_amount",
-        "officer_4_name": "high_comp_officer4_full_na",
-        "officer_4_amount": "high_comp_officer4_amount",
-        "officer_5_name": "high_comp_officer5_full_na",
-        "officer_5_amount": "high_comp_officer5_amount",
-    }
-
     update_award_ids = []
     for row in to_insert:
         upper_case_dict_values(row)
@@ -94,41 +105,10 @@ def insert_new_fabs(to_insert):
         # Append row to list of Awards updated
         update_award_ids.append(award.id)
 
-        try:
-            last_mod_date = datetime.strptime(str(row["modified_at"]), "%Y-%m-%d %H:%M:%S.%f").date()
-        except ValueError:
-            last_mod_date = datetime.strptime(str(row["modified_at"]), "%Y-%m-%d %H:%M:%S").date()
-
-        parent_txn_value_map = {
-            "award": award,
-            "awarding_agency": awarding_agency,
-            "funding_agency": funding_agency,
-            "period_of_performance_start_date": format_date(row["period_of_performance_star"]),
-            "period_of_performance_current_end_date": format_date(row["period_of_performance_curr"]),
-            "action_date": format_date(row["action_date"]),
-            "last_modified_date": last_mod_date,
-            "type_description": row["assistance_type_desc"],
-            "transaction_unique_id": row["afa_generated_unique"],
-            "business_categories": get_business_categories(row=row, data_type="fabs"),
-        }
-
-        transaction_normalized_dict = load_data_into_model(
-            TransactionNormalized(),  # thrown away
-            row,
-            field_map=fabs_normalized_field_map,
-            value_map=parent_txn_value_map,
-            as_dict=True,
-        )
-
-        financial_assistance_data = load_data_into_model(
-            TransactionFABS(), row, field_map=fabs_field_map, as_dict=True  # thrown away
+        transaction_normalized_dict, financial_assistance_data = _build_fabs_transaction_dicts(
+            row, award, awarding_agency, funding_agency
         )
 
-        # Hack to cut back on the number of warnings dumped to the log.
-        financial_assistance_data["updated_at"] = cast_datetime_to_utc(financial_assistance_data["updated_at"])
-        financial_assistance_data["created_at"] = cast_datetime_to_utc(financial_assistance_data["created_at"])
-        financial_assistance_data["modified_at"] = cast_datetime_to_utc(financial_assistance_data["modified_at"])
-
         afa_generated_unique = financial_assistance_data["afa_generated_unique"]
         unique_fabs = TransactionFABS.objects.filter(afa_generated_unique=afa_generated_unique)
 
@@ -155,15 +135,206 @@ def insert_new_fabs(to_insert):
     return update_award_ids
 
 
+def _build_fabs_transaction_dicts(row, award, awarding_agency, funding_agency):
+    """Map a source_assistance_transaction row to the field values of its TransactionNormalized and TransactionFABS"""
+    try:
+        last_mod_date = datetime.strptime(str(row["modified_at"]), "%Y-%m-%d %H:%M:%S.%f").date()
+    except ValueError:
+        last_mod_date = datetime.strptime(str(row["modified_at"]), "%Y-%m-%d %H:%M:%S").date()
+
+    parent_txn_value_map = {
+        "award": award,
+        "awarding_agency": awarding_agency,
+        "funding_agency": funding_agency,
+        "period_of_performance_start_date": format_date(row["period_of_performance_star"]),
+        "period_of_performance_current_end_date": format_date(row["period_of_performance_curr"]),
+        "action_date": format_date(row["action_date"]),
+        "last_modified_date": last_mod_date,
+        "type_description": row["assistance_type_desc"],
+        "transaction_unique_id": row["afa_generated_unique"],
+        "business_categories": get_business_categories(row=row, data_type="fabs"),
+    }
+
+    transaction_normalized_dict = load_data_into_model(
+        TransactionNormalized(),  # thrown away
+        row,
+        field_map=FABS_NORMALIZED_FIELD_MAP,
+        value_map=parent_txn_value_map,
+        as_dict=True,
+    )
+
+    financial_assistance_data = load_data_into_model(
+        TransactionFABS(), row, field_map=FABS_FIELD_MAP, as_dict=True  # thrown away
+    )
+
+    # Hack to cut back on the number of warnings dumped to the log.
+    financial_assistance_data["updated_at"] = cast_datetime_to_utc(financial_assistance_data["updated_at"])
+    financial_assistance_data["created_at"] = cast_datetime_to_utc(financial_assistance_data["created_at"])
+    financial_assistance_data["modified_at"] = cast_datetime_to_utc(financial_assistance_data["modified_at"])
+
+    return transaction_normalized_dict, financial_assistance_data
+
+
+def bulk_insert_new_fabs(to_insert):
+    """
+    Set-based version of insert_new_fabs. Agencies are looked up in the reference data cache, missing summary awards are created
+    with a single bulk insert, and the chunk's transactions are COPYed to temporary tables to be merged into
+    transaction_normalized and transaction_fabs with a few statements.
+
+    returns ids for each award touched
+    """
+    if not to_insert:
+        return []
+
+    for row in to_insert:
+        upper_case_dict_values(row)
+
+    awards = _get_or_create_summary_awards(to_insert)
+
+    # Only the last copy of a transaction in the chunk is kept, as it would be when updating one row at a time
+    load_objects = {}
+    now = datetime.now(timezone.utc)
+    for row, award in zip(to_insert, awards):
+        transaction_normalized_dict, financial_assistance_data = _build_fabs_transaction_dicts(
+            row,
+            award,
+            reference_data.get(AGENCY_BY_SUBTIER_CODE, row["awarding_sub_tier_agency_c"]),
+            reference_data.get(AGENCY_BY_SUBTIER_CODE, row["funding_sub_tier_agency_co"]),
+        )
+        transaction_normalized_dict["update_date"] = now
+        transaction_normalized_dict["fiscal_year"] = fy(transaction_normalized_dict["action_date"])
+        load_objects[row["afa_generated_unique"]] = {
+            "transaction_normalized": _column_values(TransactionNormalized(**transaction_normalized_dict), "id"),
+            "transaction_fabs": _column_values(TransactionFABS(**financial_assistance_data), "transaction"),
+        }
+    load_objects = list(load_objects.values())
+
+    # Existing transactions are only updated with the values that insert_new_fabs would update them with
+    normalized_update_columns = [
+        TransactionNormalized._meta.get_field(field).column for field in transaction_normalized_dict
+    ]
+    fabs_update_columns = [TransactionFABS._meta.get_field(field).column for field in financial_assistance_data]
+
+    with connection.cursor() as django_cursor:
+        cursor = django_cursor.cursor
+        normalized_columns = copy_load_objects_to_temp_table(
+            cursor, load_objects, "transaction_normalized", "transaction_normalized", "temp_fabs_transaction_normalized"
+        )
+        fabs_columns = copy_load_objects_to_temp_table(
+            cursor, load_objects, "transaction_fabs", "transaction_fabs", "temp_fabs_transaction_fabs"
+        )
+
+        cursor.execute(
+            """
+            alter table temp_fabs_transaction_normalized
+                add column id bigint,
+                add column is_new boolean not null default false;
+            update temp_fabs_transaction_normalized t set id = f.transaction_id
+            from transaction_fabs f where f.afa_generated_unique = t.transaction_unique_id;
+            """
+        )
+        cursor.execute(
+            f"""
+            update transaction_normalized n set {format_update_from_pairs(normalized_update_columns, "t")}
+            from temp_fabs_transaction_normalized t
+            where n.id = t.id
+            """
+        )
+        cursor.execute(
+            f"""
+            update transaction_fabs f set {format_update_from_pairs(fabs_update_columns, "t", excluded=())}
+            from temp_fabs_transaction_fabs t
+            where f.afa_generated_unique = t.afa_generated_unique
+            """
+        )
+        logger.info(f"{cursor.rowcount:,} FABS transactions updated")
+        cursor.execute(
+            f"""
+            with inserted as (
+                insert into transaction_normalized ({format_column_list(normalized_columns)})
+                select {format_column_list(normalized_columns, "t")}
+                from temp_fabs_transaction_normalized t
+                where t.id is null
+                returning id, transaction_unique_id
+            )
+            update temp_fabs_transaction_normalized t set id = i.id, is_new = true
+            from inserted i where i.transaction_unique_id = t.transaction_unique_id
+            """
+        )
+        cursor.execute(
+            f"""
+            insert into transaction_fabs (transaction_id, {format_column_list(fabs_columns)})
+            select n.id, {format_column_list(fabs_columns, "f")}
+            from temp_fabs_transaction_fabs f
+            inner join temp_fabs_transaction_normalized n on n.transaction_unique_id = f.afa_generated_unique
+            where n.is_new
+            """
+        )
+        logger.info(f"{cursor.rowcount:,} FABS transactions created")
+
+        # The next chunk is loaded in the same transaction
+        cursor.execute("drop table temp_fabs_transaction_normalized, temp_fabs_transaction_fabs")
+
+    return list({award.id for award in awards})
+
+
+def _column_values(instance, excluded_field):
+    """Map each column of a new model instance to the value that saving it would insert"""
+    return {
+        field.column: field.get_db_prep_save(field.pre_save(instance, True), connection)
+        for field in instance._meta.concrete_fields
+        if field.name != excluded_field
+    }
+
+
+def _get_or_create_summary_awards(rows):
+    """
+    Find the summary Award of each row as Award.get_or_create_summary_award would, with one query for the rows'
+    unique award keys, and create the Awards that don't exist yet with a single bulk insert
+    """
+    awards_by_key = {}
+    new_awards_by_key = {}
+    keys = {row["unique_award_key"] for row in rows if row["unique_award_key"] is not None}
+    for award in Award.objects.filter(generated_unique_award_id__in=keys):
+        awards_by_key[award.generated_unique_award_id] = award
+
+    for row in rows:
+        key = row["unique_award_key"]
+        if key is not None and key not in awards_by_key and key not in new_awards_by_key:
+            new_awards_by_key[key] = Award(generated_unique_award_id=key)
+            if row["record_type"]:
+                lookup_field = "fain" if str(row["record_type"]) in ("2", "3") else "uri"
+                setattr(new_awards_by_key[key], lookup_field, row[lookup_field])
+    awards_by_key.update(zip(new_awards_by_key, Award.objects.bulk_create(new_awards_by_key.values())))
+
+    awards = []
+    for row in rows:
+        if row["unique_award_key"] is not None:
+            awards.append(awards_by_key[row["unique_award_key"]])
+        else:
+            # Rows without a unique award key are matched on fain or uri instead, one at a time
+            created, award = Award.get_or_create_summary_award(
+                fain=row["fain"], uri=row["uri"], record_type=row["record_type"]
+            )
+            awards.append(award)
+    return awards
+
+
 def upsert_fabs_transactions(ids_to_upsert, externally_updated_award_ids):
     if ids_to_upsert or externally_updated_award_ids:
         update_award_ids = copy(externally_updated_award_ids)
+        if settings.AWARD_ROLLUP_CHANGE_LOG:
+            # The deletes are already committed, so their awards are logged before anything else can fail
+            AwardRollupChangeLog.objects.append(externally_updated_award_ids)
 
         if ids_to_upsert:
             with timer("inserting new FABS data", logger.info):
                 update_award_ids.extend(insert_all_new_fabs(ids_to_upsert))
 
-        if update_award_ids:
+        if update_award_ids and settings.AWARD_ROLLUP_CHANGE_LOG:
+            with timer("updating awards from the award rollup change log", logger.info):
+                update_awards_from_change_log()
+        elif update_award_ids:
             update_award_ids = tuple(set(update_award_ids))  # Convert to tuple and remove duplicates.
             with timer("updating awards to reflect their latest associated transaction info", logger.info):
                 award_record_count = update_awards(update_award_ids)
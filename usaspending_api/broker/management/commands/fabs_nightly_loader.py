@@ -17,6 +17,7 @@ from usaspending_api.broker.models import ExternalDataLoadDate
 from usaspending_api.common.helpers.date_helper import cast_datetime_to_naive, datetime_command_line_argument_type
 from usaspending_api.common.helpers.timing_helpers import timer
 from usaspending_api.common.retrieve_file_from_uri import RetrieveFileFromUri
+from usaspending_api.etl.reference_data_cache import reference_data
 from usaspending_api.transactions.transaction_delete_journal_helpers import retrieve_deleted_fabs_transactions
 
 
@@ -218,6 +219,7 @@ class Command(BaseCommand):
 
         update_award_ids = delete_fabs_transactions(ids_to_delete) if is_incremental_load else []
         upsert_fabs_transactions(ids_to_upsert, update_award_ids)
+        reference_data.log_stats()
 
         if is_incremental_load:
             logger.info(f"Storing {processing_start_datetime} for the next incremental run")
@@ -3,15 +3,24 @@ import psycopg2
 import re
 
 from datetime import datetime, timezone
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from typing import IO, List, AnyStr, Optional
 
+from usaspending_api.awards.models import AwardRollupChangeLog
 from usaspending_api.broker.helpers.last_load_date import get_last_load_date, update_last_load_date
 from usaspending_api.common.helpers.date_helper import datetime_command_line_argument_type
 from usaspending_api.common.helpers.etl_helpers import update_c_to_d_linkages
 from usaspending_api.common.helpers.sql_helpers import get_database_dsn_string
 from usaspending_api.common.retrieve_file_from_uri import RetrieveFileFromUri
-from usaspending_api.etl.award_helpers import update_awards, update_procurement_awards, prune_empty_awards
+from usaspending_api.etl.award_helpers import (
+    update_awards,
+    update_awards_from_change_log,
+    update_procurement_awards,
+    prune_empty_awards,
+)
+from usaspending_api.etl.reference_data_cache import reference_data
 from usaspending_api.etl.transaction_loaders.fpds_loader import load_fpds_transactions, failed_ids, delete_stale_fpds
 from usaspending_api.transactions.transaction_delete_journal_helpers import retrieve_deleted_fpds_transactions
 
@@ -51,7 +60,10 @@ class Command(BaseCommand):
             logger.info(f"Handling fpds transactions since {date}...")
 
             detached_award_procurement_ids = retrieve_deleted_fpds_transactions(start_datetime=date)
-            stale_awards = delete_stale_fpds(detached_award_procurement_ids)
+            with transaction.atomic():
+                stale_awards = [row[0] for row in delete_stale_fpds(detached_award_procurement_ids)]
+                if settings.AWARD_ROLLUP_CHANGE_LOG:
+                    AwardRollupChangeLog.objects.append(stale_awards)
             self.update_award_records(awards=stale_awards, skip_cd_linkage=True)
 
         with psycopg2.connect(dsn=get_database_dsn_string()) as connection:
@@ -65,7 +77,7 @@ class Command(BaseCommand):
                 if len(id_list) == 0:
                     break
                 logger.info("Loading batch (size: {}) from date query...".format(len(id_list)))
-                self.modified_award_ids.extend(load_fpds_transactions([row[0] for row in id_list]))
+                self.load_chunk([row[0] for row in id_list])
                 records_processed = records_processed + len(id_list)
                 logger.info("{} out of {} processed".format(records_processed, total_records))
 
@@ -88,20 +100,36 @@ class Command(BaseCommand):
                 id_list = [int(re.search(r"\d+", x).group()) for x in next_batch]
                 total_count += len(id_list)
                 logger.info(f"Loading next batch (size: {len(id_list)}, ids {id_list[0]}-{id_list[-1]})...")
-                self.modified_award_ids.extend(load_fpds_transactions(id_list))
+                self.load_chunk(id_list)
 
         logger.info(f"Total transaction IDs in file: {total_count}")
 
+    def load_chunk(self, id_list: List[int]) -> None:
+        """
+        Load the transactions, noting the awards they touched. With AWARD_ROLLUP_CHANGE_LOG, the awards are appended to
+        the change log in the chunk's own transaction, so that they are still recalculated if a later chunk fails, and
+        are logged if and only if the chunk is committed.
+        """
+        with transaction.atomic():
+            award_ids = load_fpds_transactions(id_list)
+            if settings.AWARD_ROLLUP_CHANGE_LOG:
+                AwardRollupChangeLog.objects.append(award_ids)
+        self.modified_award_ids.extend(award_ids)
+
     @staticmethod
     def update_award_records(awards, skip_cd_linkage=True):
         if awards:
             unique_awards = set(awards)
             logger.info(f"{len(unique_awards)} award records impacted by transaction DML operations")
-            logger.info(f"{prune_empty_awards(tuple(unique_awards))} award records removed")
-            logger.info(f"{update_awards(tuple(unique_awards))} award records updated")
-            logger.info(
-                f"{update_procurement_awards(tuple(unique_awards))} award records updated on FPDS-specific fields"
-            )
+            if settings.AWARD_ROLLUP_CHANGE_LOG:
+                # The awards were appended to the change log as they were loaded or deleted
+                update_awards_from_change_log()
+            else:
+                logger.info(f"{prune_empty_awards(tuple(unique_awards))} award records removed")
+                logger.info(f"{update_awards(tuple(unique_awards))} award records updated")
+                logger.info(
+                    f"{update_procurement_awards(tuple(unique_awards))} award records updated on FPDS-specific fields"
+                )
             if not skip_cd_linkage:
                 update_c_to_d_linkages("contract")
         else:
@@ -152,7 +180,7 @@ class Command(BaseCommand):
             self.load_fpds_incrementally(options["date"])
 
         elif options["ids"]:
-            self.modified_award_ids.extend(load_fpds_transactions(options["ids"]))
+            self.load_chunk(options["ids"])
 
         elif options["file"]:
             self.load_fpds_from_file(options["file"])
@@ -165,6 +193,7 @@ class Command(BaseCommand):
 
         self.update_award_records(awards=self.modified_award_ids, skip_cd_linkage=False)
 
+        reference_data.log_stats()
         logger.info(f"Script took {datetime.now(timezone.utc) - update_time}")
 
         if failed_ids:
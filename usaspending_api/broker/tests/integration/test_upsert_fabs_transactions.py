@@ -0,0 +1,125 @@
+import pytest
+
+from datetime import datetime
+from model_mommy import mommy
+
+from usaspending_api.awards.models import Award, AwardRollupChangeLog, TransactionFABS, TransactionNormalized
+from usaspending_api.broker.helpers import upsert_fabs_transactions as upsert_fabs_transactions_module
+from usaspending_api.broker.helpers.upsert_fabs_transactions import insert_all_new_fabs, upsert_fabs_transactions
+from usaspending_api.etl.reference_data_cache import reference_data
+from usaspending_api.transactions.models import SourceAssistanceTransaction
+
+
+@pytest.fixture
+def source_assistance_transactions():
+    mommy.make("references.Agency", id=1, subtier_agency__subtier_code="1000", toptier_agency__toptier_code="010")
+    mommy.make("references.Agency", id=2, subtier_agency__subtier_code="2000", toptier_agency__toptier_code="020")
+    reference_data.invalidate()
+
+    for published_id, unique_award_key, action_date, funding_subtier_code in (
+        (1, "ASST_NON_A", "20200115", "2000"),
+        (2, "ASST_NON_A", "20200315", "9999"),
+        (3, "ASST_NON_B", "20191001", "1000"),
+    ):
+        mommy.make(
+            "transactions.SourceAssistanceTransaction",
+            published_award_financial_assistance_id=published_id,
+            afa_generated_unique=f"AFA_{published_id}",
+            unique_award_key=unique_award_key,
+            fain=unique_award_key[-1],
+            record_type=2,
+            action_date=action_date,
+            assistance_type="02",
+            business_types="R",
+            federal_action_obligation=100 * published_id,
+            awarding_sub_tier_agency_c="1000",
+            funding_sub_tier_agency_co=funding_subtier_code,
+            is_active=True,
+            created_at=datetime(2020, 3, 1, 12),
+            updated_at=datetime(2020, 3, 1, 12),
+            modified_at=datetime(2020, 3, 1, 12),
+        )
+
+
+def _loaded_transactions():
+    return sorted(
+        (
+            fabs.afa_generated_unique,
+            fabs.transaction.transaction_unique_id,
+            fabs.transaction.award.generated_unique_award_id,
+            fabs.transaction.award.fain,
+            fabs.transaction.awarding_agency_id,
+            fabs.transaction.funding_agency_id,
+            fabs.transaction.action_date,
+            fabs.transaction.fiscal_year,
+            fabs.transaction.type,
+            fabs.transaction.federal_action_obligation,
+            fabs.transaction.business_categories,
+            fabs.transaction.last_modified_date,
+            fabs.fain,
+            fabs.federal_action_obligation,
+            fabs.modified_at,
+            fabs.is_active,
+        )
+        for fabs in TransactionFABS.objects.select_related("transaction__award")
+    )
+
+
+@pytest.mark.django_db
+def test_set_based_load_matches_row_by_row_load(settings, source_assistance_transactions):
+    settings.FABS_SET_BASED_LOAD = False
+    insert_all_new_fabs([1, 2, 3])
+    expected = _loaded_transactions()
+    assert len(expected) == 3
+
+    TransactionFABS.objects.all().delete()
+    TransactionNormalized.objects.all().delete()
+    Award.objects.all().delete()
+
+    settings.FABS_SET_BASED_LOAD = True
+    award_ids = insert_all_new_fabs([1, 2, 3])
+    assert _loaded_transactions() == expected
+    assert sorted(award_ids) == sorted(Award.objects.values_list("id", flat=True))
+    assert len(award_ids) == 2
+
+    # Loading the same records again updates the existing transactions instead of adding new ones
+    transaction_ids = sorted(TransactionNormalized.objects.values_list("id", flat=True))
+    SourceAssistanceTransaction.objects.filter(published_award_financial_assistance_id=3).update(
+        federal_action_obligation=1234
+    )
+    assert sorted(insert_all_new_fabs([1, 2, 3])) == sorted(award_ids)
+    assert sorted(TransactionNormalized.objects.values_list("id", flat=True)) == transaction_ids
+    assert TransactionFABS.objects.get(afa_generated_unique="AFA_3").federal_action_obligation == 1234
+    assert TransactionNormalized.objects.get(transaction_unique_id="AFA_3").federal_action_obligation == 1234
+
+
+@pytest.mark.django_db
+def test_interrupted_load_leaves_touched_awards_in_change_log(settings, monkeypatch, source_assistance_transactions):
+    settings.AWARD_ROLLUP_CHANGE_LOG = True
+
+    def fail_to_drain(*args, **kwargs):
+        raise RuntimeError("Lost the connection to the database")
+
+    monkeypatch.setattr(upsert_fabs_transactions_module, "update_awards_from_change_log", fail_to_drain)
+
+    with pytest.raises(RuntimeError):
+        upsert_fabs_transactions([1, 2, 3], [1001])
+
+    loaded_award_ids = set(Award.objects.values_list("id", flat=True))
+    assert len(loaded_award_ids) == 2
+    assert set(AwardRollupChangeLog.objects.values_list("award_id", flat=True)) == loaded_award_ids | {1001}
+
+
+@pytest.mark.django_db
+def test_failed_insert_leaves_deleted_awards_in_change_log(settings, monkeypatch):
+    settings.AWARD_ROLLUP_CHANGE_LOG = True
+
+    def fail_to_insert(ids_to_upsert):
+        raise RuntimeError("Lost the connection to the database")
+
+    monkeypatch.setattr(upsert_fabs_transactions_module, "insert_all_new_fabs", fail_to_insert)
+
+    with pytest.raises(RuntimeError):
+        upsert_fabs_transactions([1], [1001, 1002])
+
+    assert sorted(AwardRollupChangeLog.objects.values_list("award_id", flat=True)) == [1001, 1002]
@@ -1,15 +1,54 @@
 # -*- coding: utf-8 -*-
+import json
 import logging
 
 from collections.abc import Iterable
+from functools import partial
 from django.conf import settings
+from django.db import connections
 from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.http.request import RawPostDataException
+from django.test import RequestFactory
+from django.urls import resolve
 from rest_framework_extensions.cache.decorators import CacheResponse
-from typing import Any
+from threading import Thread
+from typing import Any, Optional
+from uuid import uuid4
 from usaspending_api.common.experimental_api_flags import is_experimental_elasticsearch_api
+from usaspending_api.common.local_cache import LocalLRUCache
+from usaspending_api.common.single_flight import SingleFlight
 
 logger = logging.getLogger("console")
 
+# In-process tier in front of the shared cache, holding the rendered content of the hottest responses. It is not
+# cleared along with the shared cache, so a response can be served for up to LOCAL_RESPONSE_CACHE_TTL_SECONDS after.
+local_response_cache = (
+    LocalLRUCache(settings.LOCAL_RESPONSE_CACHE_MAX_BYTES, settings.LOCAL_RESPONSE_CACHE_TTL_SECONDS)
+    if settings.LOCAL_RESPONSE_CACHE_MAX_BYTES
+    else None
+)
+
+# Identical requests missing the shared cache at the same time wait for the first of them to compute the response
+response_single_flight = (
+    SingleFlight(settings.RESPONSE_CACHE_SINGLE_FLIGHT_WAIT_SECONDS)
+    if settings.RESPONSE_CACHE_SINGLE_FLIGHT_WAIT_SECONDS
+    else None
+)
+
+# Version of the data that cached responses were computed from, replaced by mark_cached_responses_stale()
+RESPONSE_CACHE_VERSION_KEY = "usaspending-response-cache-version"
+
+# WSGI environ key, which unlike headers can only be set in process, telling a request to refresh a stale response
+# rather than be served it
+REFRESH_STALE_ENVIRON_KEY = "usaspending.refresh_stale_response"
+
+# Headers set for each request, which are not copied from a cached response
+_PER_REQUEST_HEADERS = ("Cache-Trace", "key")
+
+# Parts of the WSGI environ copied to the request that refreshes a stale response, for the URLs built by views
+_REVALIDATE_META = ("HTTP_HOST", "SERVER_NAME", "SERVER_PORT")
+
 
 def contains_queryset(data: Any) -> bool:
     """Traverse a complex object and return True if a Queryset exists anywhere"""
@@ -37,50 +76,195 @@ class CustomCacheResponse(CacheResponse):
         key = self.calculate_key(
             view_instance=view_instance, view_method=view_method, request=request, args=args, kwargs=kwargs
         )
+        endpoint = type(view_instance).__name__
         response = None
+        if local_response_cache is not None:
+            response = _get_local_response(key, endpoint)
+            if response:
+                response["Cache-Trace"] = _cache_trace("hit-local-cache", endpoint)
+                response["key"] = key
+                return response
+
+        response, version = self._get_cached_response_and_version(key, request)
+        is_stale = response and _is_stale(response, version)
+        if is_stale and request.META.get(REFRESH_STALE_ENVIRON_KEY):
+            response = None
+
+        if not response:
+            compute = partial(
+                self._compute_response, key, endpoint, version, view_instance, view_method, request, args, kwargs
+            )
+            if response_single_flight is None:
+                response = compute()
+            else:
+                read = partial(self._get_fresh_cached_response, key, request, version)
+                response, coalesced = response_single_flight.run(key, self.cache, compute, read)
+                if coalesced:
+                    response["Cache-Trace"] = "hit-cache-coalesced"
+                    _set_local_response(key, endpoint, response)
+        elif is_stale:
+            # Not kept in the local tier, which would go on serving it after the refresh
+            response["Cache-Trace"] = "hit-cache-stale"
+            self._revalidate_in_background(key, request)
+        else:
+            response["Cache-Trace"] = "hit-cache"
+            _set_local_response(key, endpoint, response)
+
+        if local_response_cache is not None:
+            response["Cache-Trace"] = _cache_trace(response["Cache-Trace"], endpoint)
+
+        if not hasattr(response, "_closable_objects"):
+            response._closable_objects = []
+
+        response["key"] = key
+        return response
+
+    def _get_cached_response(self, key, request):
         try:
-            response = self.cache.get(key)
+            return self.cache.get(key)
         except Exception:
             msg = "Problem while retrieving key [{k}] from cache for path:'{p}'"
             logger.exception(msg.format(k=key, p=str(request.path)))
+            return None
 
-        if not response:
-            response = view_method(view_instance, request, *args, **kwargs)
-            response = view_instance.finalize_response(request, response, *args, **kwargs)
+    def _get_cached_response_and_version(self, key, request):
+        """The cached response, along with the current version of the data when serving stale responses"""
+        if not settings.RESPONSE_CACHE_SERVE_STALE:
+            return self._get_cached_response(key, request), None
+        try:
+            cached = self.cache.get_many([key, RESPONSE_CACHE_VERSION_KEY])
+        except Exception:
+            msg = "Problem while retrieving key [{k}] from cache for path:'{p}'"
+            logger.exception(msg.format(k=key, p=str(request.path)))
+            return None, None
+        return cached.get(key), cached.get(RESPONSE_CACHE_VERSION_KEY)
 
-            # While returning a Queryset is functional most of the time, it isn't
-            # fully supported by Django Rest Framework. This check was inserted
-            # in local mode to catch if a Queryset is being returned by the view
-            # which could cause an exception when setting the cache
-            if settings.IS_LOCAL and response and not response.is_rendered:
-                if contains_queryset(response.data):
-                    raise RuntimeError(
-                        "Your view is returning a QuerySet. QuerySets are not"
-                        " really designed to be pickled and can cause caching"
-                        " issues. Please materialize the QuerySet using a List"
-                        " or some other more primitive data structure."
-                    )
+    def _get_fresh_cached_response(self, key, request, version):
+        response = self._get_cached_response(key, request)
+        return None if response is None or _is_stale(response, version) else response
 
-            response["Cache-Trace"] = "no-cache"
-            response.render()  # should be rendered, before pickling while storing to cache
+    def _revalidate_in_background(self, key, request):
+        """
+        Refresh a stale response in a thread, unless a refresh of it has already started in any process.
+
+        The thread runs a new request, rebuilt from the method, path, query string and body of the one being served,
+        through the view the path resolves to, which caches the response as it would any stale response it is told to
+        refresh. Nothing of the request being served, or of its view, is used after its response is returned.
+        """
+        lock_key = f"revalidate:{key}"
+        try:
+            if not self.cache.add(lock_key, 1, settings.RESPONSE_CACHE_REVALIDATE_LOCK_SECONDS):
+                return
+        except Exception:
+            return
+
+        try:
+            body = request.body
+        except RawPostDataException:
+            # The body was parsed without being kept, as it is when nothing but the view reads it
+            body = json.dumps(request.data)
+        meta = {header: request.META[header] for header in _REVALIDATE_META if header in request.META}
+        refresh_request = RequestFactory().generic(
+            request.method,
+            request.get_full_path(),
+            body,
+            content_type=request.content_type,
+            secure=request.is_secure(),
+            **meta,
+            **{REFRESH_STALE_ENVIRON_KEY: True},
+        )
 
-            if not response.status_code >= 400 or self.cache_errors:
-                if self.cache_errors:
-                    logger.error(self.cache_errors)
+        def revalidate():
+            try:
+                match = resolve(refresh_request.path_info)
+                response = match.func(refresh_request, *match.args, **match.kwargs)
+                if response.status_code >= 400:
+                    logger.warning(f"Refreshing stale response for key [{key}] returned {response.status_code}")
+                elif response.get("key") != key:
+                    logger.warning(f"Stale response for key [{key}] was refreshed as key [{response.get('key')}]")
+            except Exception:
+                logger.exception(f"Problem while refreshing stale response for key [{key}] for path:'{request.path}'")
+            finally:
+                connections.close_all()
                 try:
-                    self.cache.set(key, response, self.timeout)
-                    response["Cache-Trace"] = "set-cache"
+                    self.cache.delete(lock_key)
                 except Exception:
-                    msg = "Problem while writing to cache: path:'{p}' data:'{d}'"
-                    logger.exception(msg.format(p=str(request.path), d=str(request.data)))
-        else:
-            response["Cache-Trace"] = "hit-cache"
+                    pass
 
-        if not hasattr(response, "_closable_objects"):
-            response._closable_objects = []
+        Thread(target=revalidate, daemon=True).start()
 
-        response["key"] = key
+    def _compute_response(self, key, endpoint, version, view_instance, view_method, request, args, kwargs):
+        response = view_method(view_instance, request, *args, **kwargs)
+        response = view_instance.finalize_response(request, response, *args, **kwargs)
+
+        # While returning a Queryset is functional most of the time, it isn't
+        # fully supported by Django Rest Framework. This check was inserted
+        # in local mode to catch if a Queryset is being returned by the view
+        # which could cause an exception when setting the cache
+        if settings.IS_LOCAL and response and not response.is_rendered:
+            if contains_queryset(response.data):
+                raise RuntimeError(
+                    "Your view is returning a QuerySet. QuerySets are not"
+                    " really designed to be pickled and can cause caching"
+                    " issues. Please materialize the QuerySet using a List"
+                    " or some other more primitive data structure."
+                )
+
+        response["Cache-Trace"] = "no-cache"
+        response.render()  # should be rendered, before pickling while storing to cache
+
+        if not response.status_code >= 400 or self.cache_errors:
+            if self.cache_errors:
+                logger.error(self.cache_errors)
+            try:
+                response.cache_version = version
+                self.cache.set(key, response, self.timeout)
+                response["Cache-Trace"] = "set-cache"
+            except Exception:
+                msg = "Problem while writing to cache: path:'{p}' data:'{d}'"
+                logger.exception(msg.format(p=str(request.path), d=str(request.data)))
+            _set_local_response(key, endpoint, response)
         return response
 
 
+def mark_cached_responses_stale(cache) -> str:
+    """
+    Starts a new version of the cached responses' data, after which responses cached before are served while being
+    refreshed, rather than deleted
+    """
+    version = uuid4().hex
+    cache.set(RESPONSE_CACHE_VERSION_KEY, version, None)
+    return version
+
+
+def _is_stale(response: HttpResponse, version: Optional[str]) -> bool:
+    return settings.RESPONSE_CACHE_SERVE_STALE and getattr(response, "cache_version", None) != version
+
+
+def _get_local_response(key: str, endpoint: str) -> Optional[HttpResponse]:
+    """Build a new response from the content cached for the key, as a response object is modified by each request"""
+    cached = local_response_cache.get(key, endpoint)
+    if cached is None:
+        return None
+    content, status, headers = cached
+    response = HttpResponse(content, status=status)
+    for header, value in headers:
+        response[header] = value
+    return response
+
+
+def _set_local_response(key: str, endpoint: str, response: HttpResponse) -> None:
+    if local_response_cache is None or response.status_code >= 400:
+        return
+    headers = [(header, value) for header, value in response.items() if header not in _PER_REQUEST_HEADERS]
+    size = len(response.content) + sum(len(header) + len(value) for header, value in headers)
+    local_response_cache.set(key, (response.content, response.status_code, headers), size, endpoint)
+
+
+def _cache_trace(trace: str, endpoint: str) -> str:
+    """Adds the local tier's counts for the endpoint to a Cache-Trace header value"""
+    stats = local_response_cache.stats(endpoint)
+    return f"{trace}; local-hits={stats['hits']}; local-misses={stats['misses']}; local-evictions={stats['evictions']}"
+
+
 cache_response = CustomCacheResponse
@@ -1,12 +1,14 @@
-from typing import Union, Optional
+from typing import Dict, Tuple, Union, Optional
 
 import certifi
 import logging
+import os
 
 from django.conf import settings
 from elasticsearch import Elasticsearch
 from elasticsearch.connection import create_ssl_context
 from ssl import CERT_NONE
+from threading import Lock
 
 from elasticsearch_dsl.response import Response
 
@@ -14,21 +16,56 @@ logger = logging.getLogger("console")
 CLIENT = None
 ElasticsearchResponse = Optional[Union[dict, Response]]
 
+# Clients shared by everything in this process, keyed by host and timeout
+_CLIENTS: Dict[Tuple[str, int], Elasticsearch] = {}
+_CLIENTS_LOCK = Lock()
 
-def instantiate_elasticsearch_client() -> Elasticsearch:
-    es_kwargs = {"timeout": 300}
 
-    if "https" in settings.ES_HOSTNAME:
-        es_kwargs.update({"use_ssl": True, "verify_certs": True, "ca_certs": certifi.where()})
+def _forget_clients_after_fork() -> None:
+    """A forked process must not share its parent's sockets, so it starts without any clients"""
+    global _CLIENTS_LOCK
+    _CLIENTS.clear()
+    _CLIENTS_LOCK = Lock()
 
-    return Elasticsearch(settings.ES_HOSTNAME, **es_kwargs)
 
+os.register_at_fork(after_in_child=_forget_clients_after_fork)
 
-def create_es_client() -> Elasticsearch:
+
+def get_es_client(timeout: Optional[int] = None) -> Elasticsearch:
+    """
+    Returns the process-wide client for the configured Elasticsearch host and the given timeout (ES_TIMEOUT by
+    default), creating it on first use.  Each client holds a pool of up to ES_MAX_CONNECTIONS keep-alive connections
+    per node, so searches made with it don't pay for a new connection and TLS handshake every time.
+    """
+    timeout = settings.ES_TIMEOUT if timeout is None else timeout
+    key = (settings.ES_HOSTNAME, timeout)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _build_es_client(timeout)
+            if client is not None:
+                _CLIENTS[key] = client
+        return client
+
+
+def close_es_clients() -> None:
+    """Closes the connections of every client shared by this process"""
+    with _CLIENTS_LOCK:
+        for client in _CLIENTS.values():
+            client.transport.close()
+        _CLIENTS.clear()
+
+
+def _build_es_client(timeout: int) -> Optional[Elasticsearch]:
     if settings.ES_HOSTNAME is None or settings.ES_HOSTNAME == "":
         logger.error("env var 'ES_HOSTNAME' needs to be set for Elasticsearch connection")
-    global CLIENT
-    es_config = {"hosts": [settings.ES_HOSTNAME], "timeout": settings.ES_TIMEOUT}
+    es_config = {"hosts": [settings.ES_HOSTNAME], "timeout": timeout, "maxsize": settings.ES_MAX_CONNECTIONS}
+    if not settings.ES_KEEP_ALIVE:
+        es_config["headers"] = {"connection": "close"}
+    if settings.ES_SNIFF:
+        es_config.update(
+            {"sniff_on_start": True, "sniff_on_connection_fail": True, "sniffer_timeout": settings.ES_SNIFFER_TIMEOUT}
+        )
     try:
         # If the connection string is using SSL with localhost, disable verifying
         # the certificates to allow testing in a development environment
@@ -42,7 +79,19 @@ def create_es_client() -> Elasticsearch:
             ssl_context.check_hostname = False
             ssl_context.verify_mode = CERT_NONE
             es_config["ssl_context"] = ssl_context
+        elif "https" in settings.ES_HOSTNAME:
+            es_config.update({"use_ssl": True, "verify_certs": True, "ca_certs": certifi.where()})
 
-        CLIENT = Elasticsearch(**es_config)
+        return Elasticsearch(**es_config)
     except Exception as e:
         logger.error("Error creating the elasticsearch client: {}".format(e))
+
+
+def instantiate_elasticsearch_client() -> Elasticsearch:
+    return get_es_client(timeout=300)
+
+
+def create_es_client() -> Elasticsearch:
+    global CLIENT
+    CLIENT = get_es_client()
+    return CLIENT
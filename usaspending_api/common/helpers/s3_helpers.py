@@ -56,3 +56,14 @@ def multipart_upload(bucketname, regionname, source_path, keyname):
     config = TransferConfig(multipart_chunksize=bytes_per_chunk)
     transfer = S3Transfer(s3client, config)
     transfer.upload_file(source_path, bucketname, Path(keyname).name, extra_args={"ACL": "bucket-owner-full-control"})
+
+
+def copy_s3_object(bucketname, regionname, source_keyname, destination_keyname):
+    """Copy an object within a bucket on the S3 side, so none of its data passes through this host"""
+    s3client = boto3.client("s3", region_name=regionname)
+    s3client.copy(
+        {"Bucket": bucketname, "Key": source_keyname},
+        bucketname,
+        destination_keyname,
+        ExtraArgs={"ACL": "bucket-owner-full-control"},
+    )
@@ -281,7 +281,9 @@ def execute_sql_return_single_value(sql, model=Award, read_only=True):
 def get_connection(model=Award, read_only=True):
     """
     As of this writing, USAspending alternates database reads between multiple
-    databases using usaspending_api.routers.replicas.ReadReplicaRouter.  Django
+    databases using usaspending_api.routers.replicas.ReadReplicaRouter (or
+    HealthAwareReadReplicaRouter, which also measures the queries run on the
+    connection it returns).  Django
     will not take advantage of this router when executing raw SQL against a
     connection.  This function will help with that by using the database router
     to choose an appropriate connection.
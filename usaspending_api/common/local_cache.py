@@ -0,0 +1,75 @@
+from collections import defaultdict, OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+    namespace: Optional[str]
+
+
+class LocalLRUCache:
+    """
+    In-process, thread-safe LRU cache bounded by the total size of its values, whose entries also expire after a TTL.
+
+    Sizes are given by the caller when setting a value, since only the caller knows what is worth counting (e.g. the
+    bytes of a rendered response). Hits, misses, and evictions are counted for each namespace the keys are grouped
+    under, such as the endpoint that produced a cached response. Expired entries are dropped when next read, and are
+    not counted as evictions.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "evictions": 0})
+        self._lock = Lock()
+
+    def get(self, key: str, namespace: Optional[str] = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._stats[namespace]["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats[namespace]["hits"] += 1
+            return entry.value
+
+    def set(self, key: str, value: Any, size: int, namespace: Optional[str] = None) -> bool:
+        """Returns False, without caching anything, for a value too large to ever fit in the cache"""
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, monotonic() + self.ttl_seconds, namespace)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+                self._stats[evicted.namespace]["evictions"] += 1
+        return True
+
+    def stats(self, namespace: Optional[str] = None) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats[namespace])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        self.current_bytes -= self._entries.pop(key).size
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -65,6 +65,7 @@ class LoggingMiddleware(MiddlewareMixin):
             "remote_addr": get_remote_addr(request),
             "host": request.get_host(),
             "method": request.method,
+            "query_string": request.META.get("QUERY_STRING", ""),
             "timestamp": now().strftime("%m/%d/%y %H:%M:%S"),
         }
 
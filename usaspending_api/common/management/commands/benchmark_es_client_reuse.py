@@ -0,0 +1,82 @@
+import json
+import logging
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from statistics import mean, median
+from time import perf_counter
+
+from usaspending_api.common.elasticsearch.client import close_es_clients
+from usaspending_api.common.experimental_api_flags import ELASTICSEARCH_HEADER_VALUE, EXPERIMENTAL_API_HEADER
+
+logger = logging.getLogger("script")
+
+
+class Command(BaseCommand):
+    """Compare the latency of spending_by_category requests with and without reusing Elasticsearch connections
+
+    Requests are made in process against the configured Elasticsearch cluster, with the header that bypasses the
+    response cache. Without reuse, the shared clients are closed before each request, so that every request opens new
+    connections like it did when each search created its own client. The two modes alternate so that both see the
+    same cluster conditions.
+    """
+
+    help = "Benchmark spending_by_category request latency with and without Elasticsearch connection reuse"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--category",
+            type=str,
+            help="spending_by_category endpoint to request",
+            default="awarding_agency",
+            metavar="(default: awarding_agency)",
+        )
+        parser.add_argument(
+            "--requests", type=int, help="Requests to time in each mode", default=50, metavar="(default: 50)"
+        )
+        parser.add_argument(
+            "--fiscal-year", type=int, help="Fiscal year to filter on", default=2020, metavar="(default: 2020)"
+        )
+
+    def handle(self, *args, **options):
+        url = f"/api/v2/search/spending_by_category/{options['category']}/"
+        fiscal_year = options["fiscal_year"]
+        body = json.dumps(
+            {
+                "filters": {
+                    "time_period": [{"start_date": f"{fiscal_year - 1}-10-01", "end_date": f"{fiscal_year}-09-30"}]
+                },
+                "limit": 10,
+                "page": 1,
+            }
+        )
+        client = Client()
+
+        def timed_request():
+            start = perf_counter()
+            response = client.post(
+                url, body, content_type="application/json", **{EXPERIMENTAL_API_HEADER: ELASTICSEARCH_HEADER_VALUE}
+            )
+            elapsed = perf_counter() - start
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}: {response.content[:500]}")
+            return elapsed
+
+        # Warm up the process (imports, URL resolution, the cluster's own caches) before timing anything
+        timed_request()
+
+        timings = {"new": [], "reused": []}
+        for _ in range(options["requests"]):
+            close_es_clients()
+            timings["new"].append(timed_request())
+            # Reuses the connections the previous request just opened
+            timings["reused"].append(timed_request())
+
+        for label, seconds in timings.items():
+            ordered = sorted(seconds)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            logger.info(
+                f"{label:>6} connections: {len(seconds):,} requests | mean {mean(seconds) * 1000:,.1f}ms | "
+                f"median {median(seconds) * 1000:,.1f}ms | p95 {p95 * 1000:,.1f}ms"
+            )
+        logger.info(f"Median speedup from reuse: {median(timings['new']) / median(timings['reused']):.2f}x")
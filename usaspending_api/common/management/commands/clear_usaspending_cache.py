@@ -1,19 +1,36 @@
 import logging
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.core.cache import caches
 
+from usaspending_api.common.cache_decorator import mark_cached_responses_stale
+
 
 class Command(BaseCommand):
     """
     This command will clear the usaspending-cache (useful after a load or a deletion
     to ensure end users don't see stale data)
+
+    When RESPONSE_CACHE_SERVE_STALE is enabled, cached responses are instead marked stale, and are then served
+    while being refreshed in the background, unless --hard is given.
     """
 
     help = "Clears the usaspending-cache"
     logger = logging.getLogger("script")
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hard",
+            action="store_true",
+            help="Delete cached responses even when RESPONSE_CACHE_SERVE_STALE is enabled",
+        )
+
     def handle(self, *args, **options):
-        self.logger.info("Clearing usaspending-cache...")
         cache = caches["usaspending-cache"]
-        cache.clear()
+        if settings.RESPONSE_CACHE_SERVE_STALE and not options["hard"]:
+            self.logger.info("Marking usaspending-cache responses stale...")
+            mark_cached_responses_stale(cache)
+        else:
+            self.logger.info("Clearing usaspending-cache...")
+            cache.clear()
         self.logger.info("Done.")
@@ -0,0 +1,123 @@
+import json
+import logging
+
+from collections import Counter
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from time import perf_counter
+from typing import Dict, Iterable, Tuple
+
+from usaspending_api.common.cache_decorator import REFRESH_STALE_ENVIRON_KEY
+
+logger = logging.getLogger("script")
+
+
+@dataclass(frozen=True)
+class LoggedRequest:
+    method: str
+    path: str
+    query_string: str
+    body: str
+
+
+def read_logged_requests(lines: Iterable[str]) -> Tuple[Counter, Dict[str, LoggedRequest], int]:
+    """
+    Counts the successful requests in server.log lines by their cache key, and keeps the latest request of each key
+    to replay. Also returns the number of such requests, cached or not, to measure coverage against.
+    """
+    counts = Counter()
+    requests = {}
+    total = 0
+    for line in lines:
+        try:
+            entry = json.loads(line)
+            status_code = int(entry.get("status_code") or 0)
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if not 100 <= status_code < 400:
+            continue
+        total += 1
+        key = entry.get("cache_key")
+        if not key or not entry.get("path") or not entry.get("method"):
+            continue
+        counts[key] += 1
+        requests[key] = LoggedRequest(
+            entry["method"], entry["path"], entry.get("query_string") or "", entry.get("request") or ""
+        )
+    return counts, requests, total
+
+
+class Command(BaseCommand):
+    """
+    Replays the requests behind the most frequent cache keys in server.log, so that their responses are cached for the
+    current data before users ask for them, e.g. right after clear_usaspending_cache following a load.
+
+    Requests are made in process, one at a time. Responses marked stale by clear_usaspending_cache are refreshed
+    rather than served. Coverage is the share of the logged requests whose response is now cached.
+    """
+
+    help = "Caches responses for the most frequently requested cache keys in the server logs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--log-file",
+            action="append",
+            help="server.log file to read requests from; may be given more than once",
+            metavar=f"(default: {settings.LOGGING['handlers']['server']['filename']})",
+        )
+        parser.add_argument(
+            "--top", type=int, help="Number of most frequent cache keys to warm", default=100, metavar="(default: 100)"
+        )
+
+    def handle(self, *args, **options):
+        log_files = options["log_file"] or [settings.LOGGING["handlers"]["server"]["filename"]]
+        counts, requests, total = Counter(), {}, 0
+        for log_file in log_files:
+            with open(log_file) as f:
+                file_counts, file_requests, file_total = read_logged_requests(f)
+            counts.update(file_counts)
+            requests.update(file_requests)
+            total += file_total
+        logger.info(f"Read {total:,} successful requests with {len(counts):,} distinct cache keys from {log_files}")
+
+        client = Client()
+        outcomes = Counter()
+        covered = 0
+        start = perf_counter()
+        for key, count in counts.most_common(options["top"]):
+            request = requests[key]
+            path = f"{request.path}?{request.query_string}" if request.query_string else request.path
+            try:
+                response = client.generic(
+                    request.method,
+                    path,
+                    request.body,
+                    content_type="application/json",
+                    **{REFRESH_STALE_ENVIRON_KEY: True},
+                )
+            except Exception:
+                logger.exception(f"Problem while warming {request.method} {path}")
+                outcomes["failed"] += 1
+                continue
+
+            if response.status_code >= 400:
+                logger.warning(f"{request.method} {path} returned {response.status_code}")
+                outcomes["failed"] += 1
+            elif response.get("key") != key:
+                # The request no longer maps to the logged key, e.g. because the key's construction has changed
+                outcomes["key changed"] += 1
+            elif response.get("Cache-Trace", "").startswith(("set-cache", "hit-cache", "hit-local-cache")):
+                outcomes["cached"] += 1
+                covered += count
+            else:
+                outcomes["not cached"] += 1
+
+        elapsed = perf_counter() - start
+        warmed = sum(outcomes.values())
+        logger.info(
+            f"Warmed {warmed:,} cache keys in {elapsed:,.1f}s ({elapsed / max(warmed, 1):,.2f}s per key): "
+            + ", ".join(f"{outcome} {n:,}" for outcome, n in sorted(outcomes.items()))
+        )
+        logger.info(f"Coverage: {covered:,} of {total:,} logged requests ({covered / max(total, 1):.1%})")
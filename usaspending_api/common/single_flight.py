@@ -0,0 +1,82 @@
+from threading import Event, Lock
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+
+class SingleFlight:
+    """
+    Lets only one of several identical, concurrent computations run, while the others wait to read its result.
+
+    Within a process, the first caller for a key computes and later callers wait for it to finish. Across processes,
+    the computing caller also holds a short-lived lock in a shared cache, added atomically with cache.add(), and the
+    first caller of any other process polls for the result instead of computing too. Callers that have waited
+    wait_seconds without finding a result (e.g. because it was an error that is not cached, or because its process
+    died) compute it themselves, so the lock only ever delays a request, never fails it.
+    """
+
+    def __init__(self, wait_seconds: float, poll_seconds: float = 0.1):
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._in_flight: Dict[str, Event] = {}
+        self._lock = Lock()
+
+    def run(
+        self, key: str, shared_cache: Any, compute: Callable[[], Any], read: Callable[[], Optional[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Returns the result of compute(), or of read() once another caller has computed it for the same key, along
+        with whether it came from another caller. compute() is expected to store its result where read() finds it.
+        """
+        with self._lock:
+            event = self._in_flight.get(key)
+            is_leader = event is None
+            if is_leader:
+                event = self._in_flight[key] = Event()
+
+        if not is_leader:
+            if event.wait(self.wait_seconds):
+                result = read()
+                if result is not None:
+                    return result, True
+            return compute(), False
+
+        lock_key = f"single-flight:{key}"
+        token = str(uuid4())
+        try:
+            if not _add_to_cache(shared_cache, lock_key, token, self.wait_seconds):
+                result = self._poll(read)
+                if result is not None:
+                    return result, True
+                _add_to_cache(shared_cache, lock_key, token, self.wait_seconds)
+            return compute(), False
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+            _delete_from_cache_if_owned(shared_cache, lock_key, token)
+
+    def _poll(self, read: Callable[[], Optional[Any]]) -> Optional[Any]:
+        deadline = monotonic() + self.wait_seconds
+        while monotonic() < deadline:
+            sleep(self.poll_seconds)
+            result = read()
+            if result is not None:
+                return result
+        return None
+
+
+def _add_to_cache(cache: Any, key: str, value: str, timeout: float) -> bool:
+    """Returns True when the key was added, or when the cache is unavailable so that nobody waits on it"""
+    try:
+        return cache.add(key, value, timeout)
+    except Exception:
+        return True
+
+
+def _delete_from_cache_if_owned(cache: Any, key: str, value: str) -> None:
+    try:
+        if cache.get(key) == value:
+            cache.delete(key)
+    except Exception:
+        pass
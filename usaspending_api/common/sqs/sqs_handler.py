@@ -108,7 +108,7 @@ class _FakeFileBackedSQSQueue:
             return messages
 
     @classmethod
-    def send_message(cls, MessageBody: str, MessageAttributes: dict = None):  # noqa
+    def send_message(cls, MessageBody: str, MessageAttributes: dict = None, DelaySeconds: int = 0):  # noqa
         msg = FakeSQSMessage(cls._FAKE_QUEUE_URL)
         msg.body = MessageBody
         msg.message_attributes = MessageAttributes
@@ -0,0 +1,58 @@
+import time
+
+from django.core.cache import caches
+from django.test import RequestFactory, override_settings
+from django.urls import path
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from threading import Event
+
+from usaspending_api.common.cache_decorator import cache_response, mark_cached_responses_stale
+
+
+class CountingView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    computed = []
+    refresh_started = Event()
+    finish_refresh = Event()
+
+    @cache_response(cache="default")
+    def post(self, request):
+        if self.computed:
+            self.refresh_started.set()
+            self.finish_refresh.wait(5)
+        self.computed.append(request.data["page"])
+        return Response({"page": request.data["page"], "computed": len(self.computed)})
+
+
+urlpatterns = [path("api/v2/counting/", CountingView.as_view())]
+
+
+def _post():
+    request = RequestFactory().post("/api/v2/counting/", {"page": 1}, content_type="application/json")
+    return CountingView.as_view()(request)
+
+
+@override_settings(ROOT_URLCONF=__name__, RESPONSE_CACHE_SERVE_STALE=True)
+def test_stale_response_served_while_refreshed():
+    caches["default"].clear()
+    assert _post()["Cache-Trace"] == "set-cache"
+    mark_cached_responses_stale(caches["default"])
+
+    # Served the stale response straight away, while the refresh waits to be let through
+    response = _post()
+    assert response["Cache-Trace"] == "hit-cache-stale"
+    assert response.data == {"page": 1, "computed": 1}
+    assert CountingView.refresh_started.wait(5)
+    assert _post().data == {"page": 1, "computed": 1}
+
+    CountingView.finish_refresh.set()
+    for _ in range(50):
+        response = _post()
+        if response["Cache-Trace"] == "hit-cache":
+            break
+        time.sleep(0.1)
+    assert response["Cache-Trace"] == "hit-cache"
+    assert response.data == {"page": 1, "computed": 2}
+    assert CountingView.computed == [1, 1]
@@ -0,0 +1,65 @@
+import csv
+import pytest
+
+from usaspending_api.common import csv_helpers
+from usaspending_api.common.csv_helpers import (
+    count_rows_in_delimited_file,
+    fast_count_rows_in_delimited_file,
+    fast_partition_large_delimited_file,
+    partition_large_delimited_file,
+)
+
+ROWS = [
+    ["plain", "SMITH, JOHN", ""],
+    ['THE "BEST" SERVICES', "LINE ONE\nLINE TWO", "x"],
+    ["", "", ""],
+    ["a\n\nb", '""', "z"],
+    ["last", "row", "here"],
+]
+
+
+@pytest.fixture
+def delimited_file(tmp_path, monkeypatch):
+    # Small blocks, so that quoted fields and partitions span more than one of them
+    monkeypatch.setattr(csv_helpers, "SCAN_BLOCK_SIZE", 7)
+    file_path = tmp_path / "download.csv"
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["col_a", "col_b", "col_c"])
+        writer.writerows(ROWS)
+    return file_path
+
+
+def _read_partitions(file_paths):
+    partitions = []
+    for file_path in file_paths:
+        with open(file_path, newline="") as f:
+            partitions.append(list(csv.reader(f)))
+    return partitions
+
+
+def test_fast_count_rows_in_delimited_file(delimited_file):
+    assert fast_count_rows_in_delimited_file(str(delimited_file)) == len(ROWS)
+    assert fast_count_rows_in_delimited_file(str(delimited_file)) == count_rows_in_delimited_file(str(delimited_file))
+    assert fast_count_rows_in_delimited_file(str(delimited_file), has_header=False) == len(ROWS) + 1
+
+    # The last row needs no trailing newline
+    delimited_file.write_bytes(delimited_file.read_bytes().rstrip(b"\n"))
+    assert fast_count_rows_in_delimited_file(str(delimited_file)) == len(ROWS)
+
+    delimited_file.write_bytes(b"")
+    assert fast_count_rows_in_delimited_file(str(delimited_file)) == 0
+
+
+@pytest.mark.parametrize("row_limit", [1, 2, 5, 10])
+@pytest.mark.parametrize("keep_headers", [True, False])
+def test_fast_partition_large_delimited_file(delimited_file, row_limit, keep_headers):
+    expected = partition_large_delimited_file(
+        str(delimited_file), row_limit=row_limit, output_name_template="expected_%s.csv", keep_headers=keep_headers
+    )
+    actual = fast_partition_large_delimited_file(
+        str(delimited_file), row_limit=row_limit, output_name_template="actual_%s.csv", keep_headers=keep_headers
+    )
+
+    assert len(actual) == len(expected)
+    assert _read_partitions(actual) == _read_partitions(expected)
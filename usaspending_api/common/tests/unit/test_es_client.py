@@ -0,0 +1,41 @@
+import os
+import pytest
+
+from usaspending_api.common.elasticsearch.client import close_es_clients, get_es_client
+from usaspending_api.common.elasticsearch.search_wrappers import AwardSearch, TransactionSearch
+
+
+@pytest.fixture
+def es_clients(settings):
+    settings.ES_HOSTNAME = "http://localhost:9200"
+    close_es_clients()
+    yield
+    close_es_clients()
+
+
+def test_get_es_client_shares_clients_by_timeout(es_clients):
+    client = get_es_client()
+    assert get_es_client() is client
+    assert get_es_client(timeout=300) is not client
+    assert get_es_client(timeout=300) is get_es_client(timeout=300)
+
+    # Every search uses the same client, and so the same connection pool
+    assert AwardSearch()._using is client
+    assert TransactionSearch()._using is client
+
+    close_es_clients()
+    assert get_es_client() is not client
+
+
+def test_get_es_client_after_fork(es_clients):
+    client = get_es_client()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # A forked process gets its own client rather than the parent's
+        child_client = get_es_client()
+        os.write(write_fd, b"1" if child_client is not client and get_es_client() is child_client else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"1"
+    assert get_es_client() is client
@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+from usaspending_api.common.local_cache import LocalLRUCache
+
+
+def test_get_and_set():
+    cache = LocalLRUCache(max_bytes=100, ttl_seconds=60)
+    assert cache.get("a", "endpoint") is None
+    assert cache.set("a", "value", 10, "endpoint")
+    assert cache.get("a", "endpoint") == "value"
+    assert cache.stats("endpoint") == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_evicts_least_recently_used_by_size():
+    cache = LocalLRUCache(max_bytes=30, ttl_seconds=60)
+    cache.set("a", 1, 10, "first")
+    cache.set("b", 2, 10, "second")
+    cache.set("c", 3, 10, "second")
+    cache.get("a", "first")  # "b" is now the least recently used
+    cache.set("d", 4, 15, "third")
+
+    assert cache.get("b", "second") is None
+    assert cache.get("c", "second") is None
+    assert cache.get("a", "first") == 1
+    assert cache.current_bytes == 25
+    assert cache.stats("second")["evictions"] == 2
+    assert cache.stats("third")["evictions"] == 0
+
+
+def test_rejects_values_larger_than_the_cache():
+    cache = LocalLRUCache(max_bytes=10, ttl_seconds=60)
+    cache.set("a", 1, 5)
+    assert not cache.set("b", 2, 11)
+    assert cache.get("a") == 1
+    assert len(cache) == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = LocalLRUCache(max_bytes=100, ttl_seconds=60)
+    with patch("usaspending_api.common.local_cache.monotonic", return_value=1000):
+        cache.set("a", 1, 10)
+    with patch("usaspending_api.common.local_cache.monotonic", return_value=1059):
+        assert cache.get("a") == 1
+    with patch("usaspending_api.common.local_cache.monotonic", return_value=1060):
+        assert cache.get("a") is None
+    assert cache.current_bytes == 0
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0}
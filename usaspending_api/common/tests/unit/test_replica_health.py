@@ -0,0 +1,203 @@
+import pytest
+
+from collections import Counter
+from contextlib import contextmanager
+from threading import Event
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import RequestFactory
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from usaspending_api.awards.models import Award
+from usaspending_api.download.models.download_job import DownloadJob
+from usaspending_api.references.models import FilterHash
+from usaspending_api.routers import replicas
+from usaspending_api.routers.replica_health import ReplicaHealth, _query_lag, pin_reads_to, pinned_alias
+
+ALIASES = ("default", "db_r1", "db_analytics")
+
+
+class FakeConnection:
+    def __init__(self, alias, lag=0):
+        self.alias = alias
+        self.execute_wrappers = []
+        self.lag = lag
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, sql):
+        pass
+
+    def fetchone(self):
+        return (self.lag,)
+
+
+def _sample_lag(health, aliases):
+    health.sample_lag_if_due(aliases)
+    health._sampler.join()
+
+
+def _run_query(health, alias, seconds):
+    with patch("usaspending_api.routers.replica_health.perf_counter", side_effect=[0, seconds]):
+        health.execute_wrapper(lambda *args: None, "SELECT 1", None, False, {"connection": FakeConnection(alias)})
+
+
+def test_rolling_latency():
+    health = ReplicaHealth(window=2, lag_sample_seconds=30, max_lag_seconds=60)
+    _run_query(health, "db_r1", 3)
+    _run_query(health, "db_r1", 1)
+    _run_query(health, "db_r1", 2)
+
+    stats = health.stats()["db_r1"]
+    assert stats["mean_latency_ms"] == 1500
+    assert stats["queries_in_window"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_install_once():
+    health = ReplicaHealth(window=10, lag_sample_seconds=30, max_lag_seconds=60)
+    connection = FakeConnection("db_r1")
+    health.install(connection)
+    health.install(connection)
+    assert connection.execute_wrappers == [health.execute_wrapper]
+
+
+def test_prefers_faster_database():
+    health = ReplicaHealth(window=10, lag_sample_seconds=30, max_lag_seconds=60)
+    _run_query(health, "default", 0.5)
+    _run_query(health, "db_r1", 0.05)
+
+    chosen = Counter(health.choose(["default", "db_r1"]) for _ in range(2000))
+    # About 90% weighted by latency, of which db_r1 gets ten elevenths, plus half of the 10% spread evenly
+    assert 1550 < chosen["db_r1"] < 1850
+
+
+def test_sheds_lagging_replica():
+    health = ReplicaHealth(window=10, lag_sample_seconds=30, max_lag_seconds=60)
+    _run_query(health, "db_r1", 0.01)
+    _run_query(health, "default", 1)
+    with patch("usaspending_api.routers.replica_health._query_lag", return_value=120.0):
+        _sample_lag(health, ["db_r1"])
+
+    assert {health.choose(["default", "db_r1"]) for _ in range(100)} == {"default"}
+    assert not health.is_fresh("db_r1")
+    assert health.stats()["db_r1"]["routed"] == {"skipped_for_lag": 100}
+
+
+def test_samples_lag_periodically():
+    health = ReplicaHealth(window=10, lag_sample_seconds=30, max_lag_seconds=60)
+    with patch("usaspending_api.routers.replica_health._query_lag", return_value=5.0) as query_lag:
+        _sample_lag(health, ["db_r1"])
+        health.sample_lag_if_due(["db_r1"])
+        assert query_lag.call_count == 1
+        health._sampled_at -= 31
+        _sample_lag(health, ["db_r1"])
+        assert query_lag.call_count == 2
+    assert health.stats()["db_r1"]["lag_seconds"] == 5.0
+
+
+def test_samples_lag_in_background():
+    health = ReplicaHealth(window=10, lag_sample_seconds=30, max_lag_seconds=60)
+    replica_answers = Event()
+    with patch(
+        "usaspending_api.routers.replica_health._query_lag", side_effect=lambda alias: replica_answers.wait() and 120.0
+    ):
+        # Returns while the replica has yet to answer, and until it does, routes by the previous sample
+        health.sample_lag_if_due(["db_r1"])
+        assert health.is_fresh("db_r1")
+        replica_answers.set()
+        health._sampler.join()
+    assert not health.is_fresh("db_r1")
+
+
+def test_pin_reads_to():
+    assert pinned_alias() is None
+    with pin_reads_to("db_analytics"):
+        assert pinned_alias() == "db_analytics"
+    assert pinned_alias() is None
+
+
+def test_query_lag():
+    connections = {"db_r1": FakeConnection("db_r1", lag=5), "db_r2": FakeConnection("db_r2", lag=None)}
+    with patch("usaspending_api.routers.replica_health.connections", connections):
+        assert _query_lag("db_r1") == 5.0
+        # The replica isn't streaming from the primary
+        assert _query_lag("db_r2") == float("inf")
+        assert _query_lag("db_r3") == float("inf")
+
+
+@pytest.fixture
+def router(monkeypatch):
+    """A HealthAwareReadReplicaRouter over fake connections, with an analytics replica lagging by db_analytics_lag"""
+    health = ReplicaHealth(window=10, lag_sample_seconds=30, max_lag_seconds=60)
+    monkeypatch.setattr(replicas, "replica_health", health)
+    monkeypatch.setattr(replicas, "connections", {alias: FakeConnection(alias) for alias in ALIASES})
+    monkeypatch.setattr(replicas, "settings", SimpleNamespace(DATABASES=dict.fromkeys(ALIASES)))
+    router = replicas.HealthAwareReadReplicaRouter()
+    router.db_analytics_lag = 0.0
+    with patch(
+        "usaspending_api.routers.replica_health._query_lag",
+        side_effect=lambda alias: router.db_analytics_lag if alias == "db_analytics" else 0.0,
+    ):
+        yield router
+        if health._sampler:
+            # Finish a sample started by a read while its lag is still patched
+            health._sampler.join()
+
+
+def test_router_reads_writable_models_from_default(router):
+    assert router.db_for_read(FilterHash) == "default"
+    assert router.db_for_read(DownloadJob) == "default"
+    assert router.db_for_write(Award) == "default"
+    assert replicas.replica_health.stats()["default"]["routed"] == {"writable_model": 2, "write": 1}
+
+
+def test_router_balances_unpinned_reads(router):
+    assert {router.db_for_read(Award) for _ in range(200)} == {"default", "db_r1"}
+
+
+def test_router_pins_analytical_reads(router):
+    with pin_reads_to("db_analytics"):
+        assert {router.db_for_read(Award) for _ in range(20)} == {"db_analytics"}
+        # Writable models are read from the source all the same
+        assert router.db_for_read(FilterHash) == "default"
+    assert replicas.replica_health.stats()["db_analytics"]["routed"] == {"pinned": 20}
+
+
+def test_router_skips_lagging_analytics_replica(router):
+    router.db_analytics_lag = float("inf")
+    _sample_lag(replicas.replica_health, router.usaspending_databases[1:])
+    with pin_reads_to("db_analytics"):
+        assert {router.db_for_read(Award) for _ in range(20)} <= {"default", "db_r1"}
+    assert replicas.replica_health.stats()["db_analytics"]["routed"] == {"skipped_for_lag": 20}
+
+
+def test_pin_analytical_reads_middleware(monkeypatch):
+    monkeypatch.setattr(
+        replicas,
+        "settings",
+        SimpleNamespace(DATABASES=dict.fromkeys(ALIASES), DB_ANALYTICS_PATH_PREFIXES=["/api/v2/search/"]),
+    )
+    middleware = replicas.PinAnalyticalReadsMiddleware(lambda request: pinned_alias())
+
+    assert middleware(RequestFactory().post("/api/v2/search/spending_by_award/")) == "db_analytics"
+    assert middleware(RequestFactory().get("/api/v2/references/toptier_agencies/")) is None
+    assert pinned_alias() is None
+
+
+def test_pin_analytical_reads_middleware_not_used(monkeypatch):
+    monkeypatch.setattr(
+        replicas, "settings", SimpleNamespace(DATABASES=dict.fromkeys(ALIASES), DB_ANALYTICS_PATH_PREFIXES=[])
+    )
+    with pytest.raises(MiddlewareNotUsed):
+        replicas.PinAnalyticalReadsMiddleware(lambda request: None)
+
+    monkeypatch.setattr(
+        replicas,
+        "settings",
+        SimpleNamespace(DATABASES=dict.fromkeys(ALIASES[:2]), DB_ANALYTICS_PATH_PREFIXES=["/api/v2/search/"]),
+    )
+    with pytest.raises(MiddlewareNotUsed):
+        replicas.PinAnalyticalReadsMiddleware(lambda request: None)
@@ -0,0 +1,122 @@
+from threading import Barrier, Lock, Thread
+from time import sleep
+
+from usaspending_api.common.single_flight import SingleFlight
+
+
+class DictCache:
+    """Stands in for a shared Django cache, whose add() only sets keys that are not already set"""
+
+    def __init__(self):
+        self.values = {}
+        self._lock = Lock()
+
+    def add(self, key, value, timeout):
+        with self._lock:
+            if key in self.values:
+                return False
+            self.values[key] = value
+            return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def test_concurrent_callers_compute_once():
+    cache = DictCache()
+    single_flight = SingleFlight(wait_seconds=5)
+    computed = []
+    results = []
+    barrier = Barrier(5)
+
+    def compute():
+        computed.append(1)
+        sleep(0.2)
+        cache.set("key", "response")
+        return "response"
+
+    def call():
+        barrier.wait()
+        results.append(single_flight.run("key", cache, compute, lambda: cache.get("key")))
+
+    threads = [Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(computed) == 1
+    assert sorted(results) == [("response", False)] + [("response", True)] * 4
+    assert "single-flight:key" not in cache.values
+
+
+def test_waits_for_other_process_holding_the_lock():
+    cache = DictCache()
+    cache.add("single-flight:key", "other process", 5)
+    single_flight = SingleFlight(wait_seconds=5, poll_seconds=0.01)
+
+    def other_process_finishes():
+        sleep(0.1)
+        cache.set("key", "response")
+
+    Thread(target=other_process_finishes).start()
+
+    def compute():
+        raise AssertionError("should have waited for the other process")
+
+    assert single_flight.run("key", cache, compute, lambda: cache.get("key")) == ("response", True)
+    assert cache.get("single-flight:key") == "other process"
+
+
+def test_computes_after_waiting_too_long():
+    cache = DictCache()
+    cache.add("single-flight:key", "other process", 5)
+    single_flight = SingleFlight(wait_seconds=0.05, poll_seconds=0.01)
+
+    assert single_flight.run("key", cache, lambda: "response", lambda: cache.get("key")) == ("response", False)
+
+
+def test_followers_compute_when_leader_does_not_cache():
+    cache = DictCache()
+    single_flight = SingleFlight(wait_seconds=5)
+    computed = []
+    barrier = Barrier(3)
+
+    def compute():
+        computed.append(1)
+        sleep(0.1)
+        return "error response"
+
+    def call():
+        barrier.wait()
+        single_flight.run("key", cache, compute, lambda: cache.get("key"))
+
+    threads = [Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(computed) == 3
+
+
+def test_leader_failure_releases_waiters_and_lock():
+    cache = DictCache()
+    single_flight = SingleFlight(wait_seconds=5)
+
+    def compute():
+        raise ValueError()
+
+    try:
+        single_flight.run("key", cache, compute, lambda: cache.get("key"))
+    except ValueError:
+        pass
+
+    assert single_flight.run("key", cache, lambda: "response", lambda: None) == ("response", False)
+    assert cache.values == {}
@@ -0,0 +1,26 @@
+import json
+
+from usaspending_api.common.management.commands.warm_usaspending_cache import LoggedRequest, read_logged_requests
+
+
+def _line(**entry):
+    return json.dumps({"method": "POST", "path": "/api/v2/search/spending_by_award/", "status_code": 200, **entry})
+
+
+def test_read_logged_requests():
+    lines = [
+        _line(cache_key="a", request='{"page": 1}'),
+        _line(cache_key="b", method="GET", path="/api/v2/references/toptier_agencies/", query_string="sort=name"),
+        _line(cache_key="a", request='{"page": 1}'),
+        _line(cache_key="c", status_code=400),
+        _line(cache_key=None),
+        "not json",
+        "[1, 2]",
+    ]
+
+    counts, requests, total = read_logged_requests(lines)
+
+    assert counts.most_common() == [("a", 2), ("b", 1)]
+    assert requests["a"] == LoggedRequest("POST", "/api/v2/search/spending_by_award/", "", '{"page": 1}')
+    assert requests["b"] == LoggedRequest("GET", "/api/v2/references/toptier_agencies/", "sort=name", "")
+    assert total == 4
@@ -6,23 +6,28 @@ from pathlib import Path
 from typing import Optional, Tuple, List
 
 import psutil as ps
+import psycopg2
 import re
 import shutil
 import subprocess
 import tempfile
+import threading
 import time
 import traceback
 
+from concurrent.futures import as_completed, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext, suppress
 from datetime import datetime, timezone
 from ddtrace import tracer
 from ddtrace.ext import SpanTypes
 from django.conf import settings
+from django.db import connections
 
 from usaspending_api.download.models.download_job_lookup import DownloadJobLookup
 from usaspending_api.settings import MAX_DOWNLOAD_LIMIT
 from usaspending_api.awards.v2.filters.filter_helpers import add_date_range_comparison_types
 from usaspending_api.awards.v2.lookups.lookups import contract_type_mapping, assistance_type_mapping, idv_type_mapping
-from usaspending_api.common.csv_helpers import count_rows_in_delimited_file, partition_large_delimited_file
+from usaspending_api.common.csv_helpers import fast_count_rows_in_delimited_file, fast_partition_large_delimited_file
 from usaspending_api.common.exceptions import InvalidParameterException
 from usaspending_api.common.helpers.orm_helpers import generate_raw_quoted_query
 from usaspending_api.common.helpers.s3_helpers import multipart_upload
@@ -33,8 +38,13 @@ from usaspending_api.download.download_utils import construct_data_date_range
 from usaspending_api.download.filestreaming import NAMING_CONFLICT_DISCRIMINATOR
 from usaspending_api.download.filestreaming.download_source import DownloadSource
 from usaspending_api.download.filestreaming.file_description import build_file_description, save_file_description
-from usaspending_api.download.filestreaming.zip_file import append_files_to_zip_file
+from usaspending_api.download.filestreaming.zip_file import append_files_to_zip_file, StreamingZipWriter
 from usaspending_api.download.helpers import verify_requested_columns_available, write_to_download_log as write_to_log
+from usaspending_api.download.helpers.download_deduplication import (
+    compute_download_request_hash,
+    copy_download_file,
+    find_reusable_download,
+)
 from usaspending_api.download.lookups import JOB_STATUS_DICT, VALUE_MAPPINGS, FILE_FORMATS
 from usaspending_api.download.models.download_job import DownloadJob
 
@@ -46,6 +56,9 @@ JOB_TYPE = "USAspendingDownloader"
 
 logger = logging.getLogger(__name__)
 
+# Guards the DownloadJob counters updated by the threads of concurrently exported sources
+_download_job_lock = threading.Lock()
+
 
 def generate_download(download_job: DownloadJob, origination: Optional[str] = None):
     """Create data archive files from the download job object"""
@@ -65,6 +78,9 @@ def generate_download(download_job: DownloadJob, origination: Optional[str] = No
         span.resource = request_type
 
     file_name = start_download(download_job)
+    if settings.DOWNLOAD_DEDUPLICATION and not download_job.monthly_download and reuse_finished_download(download_job):
+        return finish_download(download_job)
+
     working_dir = None
     try:
         if limit is not None and limit > MAX_DOWNLOAD_LIMIT:
@@ -84,18 +100,9 @@ def generate_download(download_job: DownloadJob, origination: Optional[str] = No
 
         # Generate sources from the JSON request object
         sources = get_download_sources(json_request, download_job, origination)
-        for source in sources:
-            # Parse and write data to the file; if there are no matching columns for a source then add an empty file
-            source_column_count = len(source.columns(columns))
-            if source_column_count == 0:
-                create_empty_data_file(
-                    source, download_job, working_dir, piid, assistance_id, zip_file_path, file_format
-                )
-            else:
-                download_job.number_of_columns += source_column_count
-                parse_source(
-                    source, columns, download_job, working_dir, piid, assistance_id, zip_file_path, limit, file_format
-                )
+        generate_source_files(
+            sources, columns, download_job, working_dir, piid, assistance_id, zip_file_path, limit, file_format
+        )
         include_data_dictionary = json_request.get("include_data_dictionary")
         if include_data_dictionary:
             add_data_dictionary_to_zip(working_dir, zip_file_path)
@@ -304,8 +311,256 @@ def build_data_file_name(source, download_job, piid, assistance_id):
     return file_name_pattern.format(**file_name_values)
 
 
-def parse_source(source, columns, download_job, working_dir, piid, assistance_id, zip_file_path, limit, file_format):
-    """Write to delimited text file(s) and zip file(s) using the source data"""
+def generate_source_files(
+    sources, columns, download_job, working_dir, piid, assistance_id, zip_file_path, limit, file_format
+):
+    """
+    Write the data file(s) of every source to the zip file. Up to DOWNLOAD_SOURCE_CONCURRENCY sources are exported
+    at once, each on its own thread so the job's DownloadJob object and zip file are shared between them.
+    """
+    concurrency = min(settings.DOWNLOAD_SOURCE_CONCURRENCY, len(sources))
+    if concurrency <= 1:
+        for source in sources:
+            # Parse and write data to the file; if there are no matching columns for a source then add an empty file
+            source_column_count = len(source.columns(columns))
+            if source_column_count == 0:
+                create_empty_data_file(
+                    source, download_job, working_dir, piid, assistance_id, zip_file_path, file_format
+                )
+            else:
+                download_job.number_of_columns += source_column_count
+                with _source_export_slot(download_job):
+                    parse_source(
+                        source,
+                        columns,
+                        download_job,
+                        working_dir,
+                        piid,
+                        assistance_id,
+                        zip_file_path,
+                        limit,
+                        file_format,
+                    )
+        return
+
+    sources_to_export = []
+    for source in sources:
+        source_column_count = len(source.columns(columns))
+        if source_column_count == 0:
+            create_empty_data_file(source, download_job, working_dir, piid, assistance_id, zip_file_path, file_format)
+        else:
+            download_job.number_of_columns += source_column_count
+            sources_to_export.append(source)
+
+    write_to_log(
+        message=f"Exporting {len(sources_to_export)} sources, up to {concurrency} at a time", download_job=download_job
+    )
+    # Shared by the threads, so only one of them appends to the zip file at a time
+    zip_lock = threading.Lock()
+    exports = _SourceExports()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="download-source")
+    futures = [
+        executor.submit(
+            _parse_source_in_thread,
+            source,
+            columns,
+            download_job,
+            working_dir,
+            piid,
+            assistance_id,
+            zip_file_path,
+            limit,
+            file_format,
+            zip_lock,
+            exports,
+        )
+        for source in sources_to_export
+    ]
+    try:
+        for future in as_completed(futures):
+            future.result()
+    except Exception:
+        # Stop the other exports rather than leave them writing to the zip file, and wait for them to let go of it
+        for future in futures:
+            future.cancel()
+        exports.stop()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+
+
+def _parse_source_in_thread(
+    source,
+    columns,
+    download_job,
+    working_dir,
+    piid,
+    assistance_id,
+    zip_file_path,
+    limit,
+    file_format,
+    zip_lock,
+    exports,
+):
+    try:
+        with _source_export_slot(download_job, exports):
+            parse_source(
+                source,
+                columns,
+                download_job,
+                working_dir,
+                piid,
+                assistance_id,
+                zip_file_path,
+                limit,
+                file_format,
+                zip_lock,
+                exports,
+            )
+    finally:
+        # Django opens a database connection for each thread, which would otherwise be left open
+        connections.close_all()
+
+
+class SourceExportStopped(Exception):
+    pass
+
+
+class _SourceExports:
+    """
+    What the threads exporting the sources of one download job are running, so that when the export of one source
+    fails the exports of the others can be stopped
+    """
+
+    def __init__(self):
+        self.stopped = False
+        self._lock = threading.Lock()
+        self._stop_callbacks = set()
+
+    def raise_if_stopped(self):
+        if self.stopped:
+            raise SourceExportStopped("Stopped because the export of another source failed")
+
+    @contextmanager
+    def stoppable(self, stop):
+        """Call `stop`, e.g. to terminate a process or cancel a query, if the exports are stopped within the block"""
+        with self._lock:
+            self.raise_if_stopped()
+            self._stop_callbacks.add(stop)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stop_callbacks.discard(stop)
+        self.raise_if_stopped()
+
+    def check_output(self, args, timeout=None, **kwargs):
+        """
+        subprocess.check_output(), terminating the process if the exports are stopped while it runs. Unlike forking a
+        multiprocessing.Process, which copies whatever locks the other threads hold, this is safe from any thread.
+        """
+        self.raise_if_stopped()
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, **kwargs)
+        try:
+            with self.stoppable(process.terminate):
+                output, _ = process.communicate(timeout=timeout)
+        except BaseException:
+            process.kill()
+            process.communicate()
+            raise
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, args, output=output)
+        return output
+
+    def stop(self):
+        with self._lock:
+            self.stopped = True
+            stop_callbacks = list(self._stop_callbacks)
+        for stop in stop_callbacks:
+            with suppress(Exception):
+                stop()
+
+
+class _SourceExportSlots:
+    """
+    DOWNLOAD_MAX_CONCURRENT_SOURCES slots shared by every download job forked from the same worker process. A slot
+    records the PID of the job holding it, so that the slots of a job killed mid-export are taken back by the next
+    export to look for a free one instead of being leaked.
+    """
+
+    def __init__(self, slot_count):
+        self._owners = multiprocessing.Array("i", slot_count)
+
+    def try_acquire(self) -> Optional[int]:
+        """Claim a free slot for this process, returning its index, or None if every slot is held"""
+        with self._owners.get_lock():
+            for index, owner in enumerate(self._owners):
+                if owner and _pid_is_running(owner):
+                    continue
+                if owner:
+                    logger.warning(f"Reclaiming the source export slot of process {owner}, which is no longer running")
+                self._owners[index] = os.getpid()
+                return index
+        return None
+
+    def release(self, index):
+        with self._owners.get_lock():
+            self._owners[index] = 0
+
+
+def _pid_is_running(pid):
+    try:
+        # A killed job process that its parent has yet to wait on still exists, as a zombie
+        return ps.Process(pid).status() != ps.STATUS_ZOMBIE
+    except ps.NoSuchProcess:
+        return False
+
+
+# Created on import so that it is shared by every download job forked from the same worker process
+_DOWNLOAD_SOURCE_SLOTS = (
+    _SourceExportSlots(settings.DOWNLOAD_MAX_CONCURRENT_SOURCES) if settings.DOWNLOAD_MAX_CONCURRENT_SOURCES else None
+)
+
+
+@contextmanager
+def _source_export_slot(download_job, exports=None):
+    """Hold one of the DOWNLOAD_MAX_CONCURRENT_SOURCES slots shared by every job forked from this worker process"""
+    if _DOWNLOAD_SOURCE_SLOTS is None:
+        yield
+        return
+
+    slot = _DOWNLOAD_SOURCE_SLOTS.try_acquire()
+    if slot is None:
+        write_to_log(message="Waiting for a free source export slot", download_job=download_job)
+    while slot is None:
+        if exports:
+            exports.raise_if_stopped()
+        time.sleep(WAIT_FOR_PROCESS_SLEEP / 5)
+        slot = _DOWNLOAD_SOURCE_SLOTS.try_acquire()
+    try:
+        yield
+    finally:
+        _DOWNLOAD_SOURCE_SLOTS.release(slot)
+
+
+def parse_source(
+    source,
+    columns,
+    download_job,
+    working_dir,
+    piid,
+    assistance_id,
+    zip_file_path,
+    limit,
+    file_format,
+    zip_lock=None,
+    exports=None,
+):
+    """
+    Write to delimited text file(s) and zip file(s) using the source data. `exports` is given when the source is
+    exported on one of several threads, which must not fork; psql then runs as a plain subprocess and the file is
+    split and zipped on the thread itself.
+    """
 
     data_file_name = build_data_file_name(source, download_job, piid, assistance_id)
 
@@ -318,37 +573,50 @@ def parse_source(source, columns, download_job, working_dir, piid, assistance_id
 
     # Generate the query file; values, limits, dates fixed
     export_query = generate_export_query(source_query, limit, source, columns, file_format)
+
+    if settings.DOWNLOAD_USE_NATIVE_COPY:
+        export_and_zip_data_files(
+            export_query, zip_file_path, source_path, data_file_name, file_format, download_job, zip_lock, exports
+        )
+        return
+
     temp_file, temp_file_path = generate_export_query_temp_file(export_query, download_job)
 
     start_time = time.perf_counter()
     try:
-        # Create a separate process to run the PSQL command; wait
-        psql_process = multiprocessing.Process(target=execute_psql, args=(temp_file_path, source_path, download_job))
         write_to_log(message=f"Running {source.file_name} using psql", download_job=download_job)
-        psql_process.start()
-        wait_for_process(psql_process, start_time, download_job)
-
-        delim = FILE_FORMATS[file_format]["delimiter"]
+        if exports:
+            execute_psql(temp_file_path, source_path, download_job, exports, start_time)
+        else:
+            # Create a separate process to run the PSQL command; wait
+            psql_process = multiprocessing.Process(
+                target=execute_psql, args=(temp_file_path, source_path, download_job)
+            )
+            psql_process.start()
+            wait_for_process(psql_process, start_time, download_job)
 
         # Log how many rows we have
         write_to_log(message="Counting rows in delimited text file", download_job=download_job)
+        row_count = 0
         try:
-            download_job.number_of_rows += count_rows_in_delimited_file(
-                filename=source_path, has_header=True, delimiter=delim
-            )
+            row_count = fast_count_rows_in_delimited_file(filename=source_path, has_header=True)
         except Exception:
             write_to_log(
                 message="Unable to obtain delimited text file line count", is_error=True, download_job=download_job
             )
-        download_job.save()
+        _add_rows_to_download_job(download_job, row_count)
 
-        # Create a separate process to split the large data files into smaller file and write to zip; wait
-        zip_process = multiprocessing.Process(
-            target=split_and_zip_data_files,
-            args=(zip_file_path, source_path, data_file_name, file_format, download_job),
-        )
-        zip_process.start()
-        wait_for_process(zip_process, start_time, download_job)
+        if exports:
+            exports.raise_if_stopped()
+            split_and_zip_data_files(zip_file_path, source_path, data_file_name, file_format, download_job, zip_lock)
+        else:
+            # Create a separate process to split the large data files into smaller file and write to zip; wait
+            zip_process = multiprocessing.Process(
+                target=split_and_zip_data_files,
+                args=(zip_file_path, source_path, data_file_name, file_format, download_job, zip_lock),
+            )
+            zip_process.start()
+            wait_for_process(zip_process, start_time, download_job)
         download_job.save()
     except Exception as e:
         raise e
@@ -358,7 +626,7 @@ def parse_source(source, columns, download_job, working_dir, piid, assistance_id
         os.remove(temp_file_path)
 
 
-def split_and_zip_data_files(zip_file_path, source_path, data_file_name, file_format, download_job=None):
+def split_and_zip_data_files(zip_file_path, source_path, data_file_name, file_format, download_job=None, zip_lock=None):
     with SubprocessTrace(
         name=f"job.{JOB_TYPE}.download.zip",
         service="bulk-download",
@@ -370,13 +638,12 @@ def split_and_zip_data_files(zip_file_path, source_path, data_file_name, file_fo
             # Split data files into separate files
             # e.g. `Assistance_prime_transactions_delta_%s.csv`
             log_time = time.perf_counter()
-            delim = FILE_FORMATS[file_format]["delimiter"]
             extension = FILE_FORMATS[file_format]["extension"]
 
             output_template = f"{data_file_name}_%s.{extension}"
             write_to_log(message="Beginning the delimited text file partition", download_job=download_job)
-            list_of_files = partition_large_delimited_file(
-                file_path=source_path, delimiter=delim, row_limit=EXCEL_ROW_LIMIT, output_name_template=output_template
+            list_of_files = fast_partition_large_delimited_file(
+                file_path=source_path, row_limit=EXCEL_ROW_LIMIT, output_name_template=output_template
             )
             span.set_tag("file_parts", len(list_of_files))
 
@@ -386,7 +653,13 @@ def split_and_zip_data_files(zip_file_path, source_path, data_file_name, file_fo
             # Zip the split files into one zipfile
             write_to_log(message="Beginning zipping and compression", download_job=download_job)
             log_time = time.perf_counter()
-            append_files_to_zip_file(list_of_files, zip_file_path)
+            append_files_to_zip_file(
+                list_of_files,
+                zip_file_path,
+                zip_lock,
+                compresslevel=settings.DOWNLOAD_ZIP_COMPRESSION_LEVEL,
+                processes=settings.DOWNLOAD_ZIP_PROCESSES,
+            )
 
             write_to_log(
                 message=f"Writing to zipfile took {time.perf_counter() - log_time:.4f}s", download_job=download_job
@@ -401,6 +674,184 @@ def split_and_zip_data_files(zip_file_path, source_path, data_file_name, file_fo
             raise e
 
 
+def export_and_zip_data_files(
+    export_query, zip_file_path, source_path, data_file_name, file_format, download_job, zip_lock=None, exports=None
+):
+    """Export the query straight into row-limited part files and write them to the zip file"""
+    extension = FILE_FORMATS[file_format]["extension"]
+    output_template = os.path.join(os.path.dirname(source_path), f"{data_file_name}_%s.{extension}")
+
+    write_to_log(message=f"Running {os.path.basename(source_path)} using COPY", download_job=download_job)
+    if settings.DOWNLOAD_PIPELINE_ZIP:
+        # Compress each part file as soon as it is complete, while COPY writes the next one
+        zip_writer = StreamingZipWriter(zip_file_path, zip_lock, settings.DOWNLOAD_ZIP_COMPRESSION_LEVEL)
+        try:
+            row_count, _ = execute_copy_export(
+                export_query, output_template, download_job, on_part_complete=zip_writer.submit, exports=exports
+            )
+        except BaseException:
+            # Still wait for the writer to let go of the zip file, without its error hiding the export's
+            with suppress(Exception):
+                zip_writer.close()
+            raise
+        log_time = time.perf_counter()
+        zip_writer.close()
+        write_to_log(
+            message=f"Zipping finished {time.perf_counter() - log_time:.4f}s after the export",
+            download_job=download_job,
+        )
+    else:
+        row_count, list_of_files = execute_copy_export(export_query, output_template, download_job, exports=exports)
+        if exports:
+            exports.raise_if_stopped()
+        write_to_log(message="Beginning zipping and compression", download_job=download_job)
+        log_time = time.perf_counter()
+        append_files_to_zip_file(
+            list_of_files,
+            zip_file_path,
+            zip_lock,
+            compresslevel=settings.DOWNLOAD_ZIP_COMPRESSION_LEVEL,
+            processes=settings.DOWNLOAD_ZIP_PROCESSES,
+        )
+        write_to_log(
+            message=f"Writing to zipfile took {time.perf_counter() - log_time:.4f}s", download_job=download_job
+        )
+
+    if download_job:
+        _add_rows_to_download_job(download_job, row_count)
+
+
+def _add_rows_to_download_job(download_job, row_count):
+    with _download_job_lock:
+        download_job.number_of_rows += row_count
+        download_job.save()
+
+
+def execute_copy_export(
+    export_query, output_template, download_job, row_limit=EXCEL_ROW_LIMIT, on_part_complete=None, exports=None
+):
+    """
+    In-process alternative to execute_psql() followed by split_and_zip_data_files(). The COPY output is streamed
+    through psycopg2 into part files of at most `row_limit` rows each, so the rows are counted and split in the same
+    pass that writes them instead of by re-reading the whole file twice. Returns the row count and the part files.
+
+    `on_part_complete` is called with the path of each part file once it is complete, in order. If `exports` are
+    stopped while COPY runs, its query is cancelled.
+    """
+    download_sql = export_query[1:] if export_query.startswith("\\COPY") else export_query
+    connect_options = {}
+    if download_job and not download_job.monthly_download:
+        # Same limits as the PGOPTIONS given to psql, as there is no separate process to terminate on a timeout
+        connect_options["options"] = (
+            f"-c statement_timeout={settings.DOWNLOAD_DB_TIMEOUT_IN_HOURS}h "
+            f"-c work_mem={settings.DOWNLOAD_DB_WORK_MEM_IN_MB}MB"
+        )
+
+    with tracer.trace(
+        name=f"job.{JOB_TYPE}.download.copy", service="bulk-download", resource=download_sql, span_type=SpanTypes.SQL
+    ) as span, tracer.trace(
+        name="postgres.query", service="db_downloaddb", resource=download_sql, span_type=SpanTypes.SQL
+    ):
+        log_time = time.perf_counter()
+        writer = _PartitionedCopyWriter(output_template, row_limit, on_part_complete)
+        connection = psycopg2.connect(dsn=retrieve_db_string(), **connect_options)
+        try:
+            with exports.stoppable(connection.cancel) if exports else nullcontext(), connection.cursor() as cursor:
+                cursor.copy_expert(download_sql, writer)
+            writer.complete_part()
+        except Exception:
+            logger.error(f"Faulty SQL: {download_sql}")
+            raise
+        finally:
+            writer.close()
+            connection.close()
+
+        span.set_tag("file_parts", len(writer.file_paths))
+        write_to_log(
+            message=f"Wrote {writer.row_count:,} rows to {len(writer.file_paths)} files, "
+            f"took {time.perf_counter() - log_time:.4f} seconds",
+            download_job=download_job,
+        )
+
+    return writer.row_count, writer.file_paths
+
+
+class _PartitionedCopyWriter:
+    """
+    File-like target for cursor.copy_expert() that rotates to a new part file every `row_limit` rows, repeating the
+    header in each. It relies on psycopg2 making exactly one write() per row of COPY output (the header included), so
+    rows with quoted line breaks are never split across files. Bytes are written as received; nothing is re-parsed.
+    """
+
+    def __init__(self, output_template, row_limit, on_part_complete=None):
+        self.output_template = output_template
+        self.row_limit = row_limit
+        self.on_part_complete = on_part_complete
+        self.file_paths = []
+        self.row_count = 0
+        self._header = None
+        self._rows_in_part = 0
+        self._part = None
+
+    def write(self, data):
+        if self._header is None:
+            self._header = data
+            self._open_next_part()
+            return
+        if self._rows_in_part >= self.row_limit:
+            self._open_next_part()
+        self._part.write(data)
+        self._rows_in_part += 1
+        self.row_count += 1
+
+    def _open_next_part(self):
+        self.complete_part()
+        self.file_paths.append(self.output_template % (len(self.file_paths) + 1))
+        self._part = open(self.file_paths[-1], "wb")
+        self._part.write(self._header)
+        self._rows_in_part = 0
+
+    def complete_part(self):
+        """Close the current part file and hand it off to `on_part_complete`"""
+        if self._part and not self._part.closed:
+            self._part.close()
+            if self.on_part_complete:
+                self.on_part_complete(self.file_paths[-1])
+
+    def close(self):
+        """Close the current part file without handing it off, e.g. when the export failed"""
+        if self._part and not self._part.closed:
+            self._part.close()
+
+
+def reuse_finished_download(download_job):
+    """
+    Stand in the zip of an earlier finished DownloadJob for this one's if both have the same request hash, i.e. the
+    same request over the same data. Any problem finding or copying a zip means the download is generated as usual.
+    """
+    try:
+        download_job.request_hash = compute_download_request_hash(json.loads(download_job.json_request))
+        download_job.save()
+        reusable_job = find_reusable_download(download_job) if download_job.request_hash else None
+        if reusable_job is None:
+            return False
+
+        copy_download_file(reusable_job.file_name, download_job.file_name)
+    except Exception:
+        write_to_log(message="Unable to reuse a finished download", download_job=download_job, is_error=True)
+        return False
+
+    download_job.reused_download_job_id = reusable_job.download_job_id
+    download_job.number_of_rows = reusable_job.number_of_rows
+    download_job.number_of_columns = reusable_job.number_of_columns
+    download_job.file_size = reusable_job.file_size
+    write_to_log(
+        message=f"Reused the zip of DownloadJob {reusable_job.download_job_id} ({reusable_job.file_name})",
+        download_job=download_job,
+    )
+    return True
+
+
 def start_download(download_job):
     # Update job attributes
     download_job.job_status_id = JOB_STATUS_DICT["running"]
@@ -476,7 +927,7 @@ def generate_export_query_temp_file(export_query, download_job, temp_dir=None):
     if temp_dir:
         dir_name = temp_dir
     # Create a unique temporary file to hold the raw query, using \copy
-    (temp_sql_file, temp_sql_file_path) = tempfile.mkstemp(prefix="bd_sql_", dir=dir_name)
+    temp_sql_file, temp_sql_file_path = tempfile.mkstemp(prefix="bd_sql_", dir=dir_name)
 
     with open(temp_sql_file_path, "w") as file:
         file.write(export_query)
@@ -589,8 +1040,12 @@ def _top_level_split(sql, splitter):
     raise Exception(f"SQL string ${sql} cannot be split on ${splitter}")
 
 
-def execute_psql(temp_sql_file_path, source_path, download_job):
-    """Executes a single PSQL command within its own Subprocess"""
+def execute_psql(temp_sql_file_path, source_path, download_job, exports=None, start_time=None):
+    """
+    Executes a single PSQL command within its own Subprocess. Given `exports`, it is run on one of the threads
+    exporting sources concurrently: psql is then terminated if the exports are stopped or it runs past
+    MAX_VISIBILITY_TIMEOUT since `start_time`, and its failures are raised since there is no exit code to check.
+    """
     download_sql = Path(temp_sql_file_path).read_text()
     if download_sql.startswith("\\COPY"):
         # Trace library parses the SQL, but cannot understand the psql-specific \COPY command. Use standard COPY here.
@@ -617,13 +1072,18 @@ def execute_psql(temp_sql_file_path, source_path, download_job):
                     f"--work-mem={settings.DOWNLOAD_DB_WORK_MEM_IN_MB}MB"
                 )
 
-            cat_command = subprocess.Popen(["cat", temp_sql_file_path], stdout=subprocess.PIPE)
-            subprocess.check_output(
-                ["psql", "-q", "-o", source_path, retrieve_db_string(), "-v", "ON_ERROR_STOP=1"],
-                stdin=cat_command.stdout,
-                stderr=subprocess.STDOUT,
-                env=temp_env,
-            )
+            psql_command = ["psql", "-q", "-o", source_path, retrieve_db_string(), "-v", "ON_ERROR_STOP=1"]
+            if exports:
+                timeout = None
+                if download_job and not download_job.monthly_download:
+                    timeout = MAX_VISIBILITY_TIMEOUT - (time.perf_counter() - start_time)
+                with open(temp_sql_file_path, "rb") as sql_file:
+                    exports.check_output(
+                        psql_command, timeout=timeout, stdin=sql_file, stderr=subprocess.STDOUT, env=temp_env
+                    )
+            else:
+                cat_command = subprocess.Popen(["cat", temp_sql_file_path], stdout=subprocess.PIPE)
+                subprocess.check_output(psql_command, stdin=cat_command.stdout, stderr=subprocess.STDOUT, env=temp_env)
 
             duration = time.perf_counter() - log_time
             write_to_log(
@@ -631,6 +1091,12 @@ def execute_psql(temp_sql_file_path, source_path, download_job):
             )
         except subprocess.CalledProcessError as e:
             logger.error(f"PSQL Error: {e.output.decode()}")
+            if exports:
+                if not settings.IS_LOCAL:
+                    e.cmd = "[redacted psql command]"
+                raise
+        except SourceExportStopped:
+            raise
         except Exception as e:
             if not settings.IS_LOCAL:
                 # Not logging the command as it can contain the database connection string
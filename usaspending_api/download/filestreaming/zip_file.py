@@ -1,8 +1,25 @@
+import logging
+import multiprocessing
 import os
+import sys
 import zipfile
+import zlib
 
+from contextlib import nullcontext
+from queue import Queue
+from threading import Thread
 
-def append_files_to_zip_file(file_paths, zip_file_path):
+logger = logging.getLogger(__name__)
+
+# Size of the pieces of each file that are compressed independently of one another when compressing in parallel
+PARALLEL_COMPRESSION_CHUNK_SIZE = 32 * 1024 * 1024
+
+# Writing entries compressed in parallel relies on ZipFile internals, which are the same in these Python versions
+PARALLEL_COMPRESSION_PYTHON_VERSIONS = ((3, 7), (3, 12))
+ZIP_FILE_INTERNALS = ("_writecheck", "_didModify", "fp", "start_dir", "filelist", "NameToInfo")
+
+
+def append_files_to_zip_file(file_paths, zip_file_path, lock=None, compresslevel=None, processes=1):
     """
     Create zip archive at the specified zip_file_path if it does not exist, and add all the files at provided
     file_paths to it.
@@ -12,8 +29,142 @@ def append_files_to_zip_file(file_paths, zip_file_path):
     it will throw a UserWarning and duplicate the file.
     Use caution in this case by removing the zip in the finally of an exception and also checking for and removing
     the zip if it exists before you begin to create it from scratch
+
+    When several threads or processes write to the same zip file, they must share a `lock` (e.g. a
+    multiprocessing.Lock) so that only one of them has the zip file open at a time.
+
+    `compresslevel` is the zlib level to deflate with, from 1 (fastest) to 9 (smallest), or the zlib default if None.
+    With more than one of `processes`, files are compressed on a pool of that many processes; see
+    `_write_files_compressed_in_parallel`. They are compressed serially instead on Python versions whose zipfile
+    internals haven't been checked against it.
     """
-    with zipfile.ZipFile(zip_file_path, "a", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zip_file:
+    with lock or nullcontext():
+        with zipfile.ZipFile(
+            zip_file_path, "a", compression=zipfile.ZIP_DEFLATED, allowZip64=True, compresslevel=compresslevel
+        ) as zip_file:
+            if processes > 1 and _can_write_compressed_in_parallel(zip_file):
+                _write_files_compressed_in_parallel(zip_file, file_paths, compresslevel, processes)
+            else:
+                for file_path in file_paths:
+                    archive_name = os.path.basename(file_path)
+                    zip_file.write(file_path, archive_name)
+
+
+def _can_write_compressed_in_parallel(zip_file):
+    min_version, max_version = PARALLEL_COMPRESSION_PYTHON_VERSIONS
+    if min_version <= sys.version_info[:2] <= max_version and all(hasattr(zip_file, a) for a in ZIP_FILE_INTERNALS):
+        return True
+    logger.warning(f"Compressing serially, parallel compression isn't supported on Python {sys.version.split()[0]}")
+    return False
+
+
+def _write_files_compressed_in_parallel(zip_file, file_paths, compresslevel, processes):
+    """
+    Deflate files on a pool of processes, in chunks of PARALLEL_COMPRESSION_CHUNK_SIZE compressed independently of
+    one another, so that a single large file is spread across the pool too. The chunks of a file are written into
+    the zip file in order as one deflate stream: every chunk but the last ends on a sync flush, which ends it on a
+    byte boundary without marking the end of the stream. This costs a little compression at the start of each chunk.
+
+    zipfile only writes entries that it compresses itself, so the entries are written here the way ZipFile.write
+    writes them, with a local header that is rewritten once the CRC and compressed size are known.
+
+    The pool's processes are started by a forkserver rather than forked from this process, whose other threads
+    (e.g. a StreamingZipWriter, or the tracer) could hold locks that a forked copy would never see released.
+    """
+    level = zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel
+    chunks = []
+    for file_path in file_paths:
+        file_size = os.path.getsize(file_path)
+        for offset in range(0, file_size or 1, PARALLEL_COMPRESSION_CHUNK_SIZE):
+            is_last = offset + PARALLEL_COMPRESSION_CHUNK_SIZE >= file_size
+            chunks.append((file_path, offset, PARALLEL_COMPRESSION_CHUNK_SIZE, level, is_last))
+
+    with multiprocessing.get_context("forkserver").Pool(processes) as pool:
+        compressed_chunks = pool.imap(_compress_chunk, chunks)
         for file_path in file_paths:
-            archive_name = os.path.basename(file_path)
-            zip_file.write(file_path, archive_name)
+            zip_info = zipfile.ZipInfo.from_file(file_path, os.path.basename(file_path))
+            zip_info.compress_type = zipfile.ZIP_DEFLATED
+            zip_info.CRC = 0
+            zip_info.compress_size = 0
+            zip64 = zip_info.file_size * 1.05 > zipfile.ZIP64_LIMIT
+
+            zip_file._writecheck(zip_info)
+            zip_file.fp.seek(zip_file.start_dir)
+            zip_info.header_offset = zip_file.fp.tell()
+            zip_file.fp.write(zip_info.FileHeader(zip64))
+
+            # The CRC is of the uncompressed data, read here while the pool compresses the next chunks
+            with open(file_path, "rb") as f:
+                is_last = False
+                while not is_last:
+                    compressed_chunk, is_last = next(compressed_chunks)
+                    zip_info.CRC = zlib.crc32(f.read(PARALLEL_COMPRESSION_CHUNK_SIZE), zip_info.CRC)
+                    zip_info.compress_size += len(compressed_chunk)
+                    zip_file.fp.write(compressed_chunk)
+
+            zip_file.start_dir = zip_file.fp.tell()
+            zip_file.fp.seek(zip_info.header_offset)
+            zip_file.fp.write(zip_info.FileHeader(zip64))
+            zip_file.fp.seek(zip_file.start_dir)
+            zip_file.filelist.append(zip_info)
+            zip_file.NameToInfo[zip_info.filename] = zip_info
+            zip_file._didModify = True
+
+
+def _compress_chunk(chunk):
+    file_path, offset, size, level, is_last = chunk
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        data = f.read(size)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if is_last else zlib.Z_SYNC_FLUSH), is_last
+
+
+class StreamingZipWriter:
+    """
+    Append files to a zip archive on a background thread while the caller is still producing the next ones.
+
+    Files are compressed in the order they are submitted, into a zip file held open for the whole run. zlib releases
+    the GIL while compressing, so a thread is enough to overlap compression with I/O bound work such as a COPY.
+    Any error from the compression thread is raised by close(), which waits for all submitted files to be written.
+
+    Given a `lock` shared with other writers of the same zip file, the zip file is only opened, under the lock, for
+    each submitted file rather than for the whole run.
+    """
+
+    def __init__(self, zip_file_path, lock=None, compresslevel=None):
+        self.zip_file_path = zip_file_path
+        self.lock = lock
+        self.compresslevel = compresslevel
+        self._queue = Queue()
+        self._error = None
+        self._thread = Thread(target=self._compress_submitted_files, name="zip-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path):
+        self._queue.put(file_path)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._error:
+            raise self._error
+
+    def _compress_submitted_files(self):
+        try:
+            if self.lock:
+                for file_path in iter(self._queue.get, None):
+                    append_files_to_zip_file([file_path], self.zip_file_path, self.lock, self.compresslevel)
+            else:
+                with zipfile.ZipFile(
+                    self.zip_file_path,
+                    "a",
+                    compression=zipfile.ZIP_DEFLATED,
+                    allowZip64=True,
+                    compresslevel=self.compresslevel,
+                ) as zf:
+                    for file_path in iter(self._queue.get, None):
+                        zf.write(file_path, os.path.basename(file_path))
+        except Exception as e:
+            # The queue is unbounded, so submit() never blocks on a thread that has stopped writing
+            self._error = e
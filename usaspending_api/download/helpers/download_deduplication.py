@@ -0,0 +1,102 @@
+import hashlib
+import json
+import shutil
+
+from datetime import datetime, timezone
+from django.conf import settings
+from django.db.models import Count, Max, Q, Sum
+from typing import List, Optional
+
+from usaspending_api.broker.lookups import EXTERNAL_DATA_TYPE_DICT
+from usaspending_api.broker.models import ExternalDataLoadDate
+from usaspending_api.common.helpers.dict_helpers import order_nested_object
+from usaspending_api.common.helpers.s3_helpers import copy_s3_object
+from usaspending_api.download.lookups import JOB_STATUS_DICT
+from usaspending_api.download.models.download_job import DownloadJob
+from usaspending_api.submissions.models import DABSSubmissionWindowSchedule
+
+
+def get_download_data_freshness(download_types: Optional[List[str]] = None) -> Optional[datetime]:
+    """
+    Return the last time data affecting downloads of the given types changed: the most recent of the relevant
+    ExternalDataLoadDates, or the latest DABS submission reveal date if that is more recent. Returns None if none
+    of the relevant load dates are recorded, as in local development.
+    """
+    # External data types that directly affect download results
+    if download_types and "elasticsearch_awards" in download_types:
+        external_data_type_name_list = ["es_awards"]
+    elif download_types and "elasticsearch_transactions" in download_types:
+        external_data_type_name_list = ["es_transactions"]
+    else:
+        external_data_type_name_list = ["fpds", "fabs", "es_transactions", "es_awards"]
+
+    external_data_type_id_list = [
+        id for name, id in EXTERNAL_DATA_TYPE_DICT.items() if name in external_data_type_name_list
+    ]
+    updated_date_timestamp = ExternalDataLoadDate.objects.filter(
+        external_data_type_id__in=external_data_type_id_list
+    ).aggregate(Max("last_load_date"))["last_load_date__max"]
+    if not updated_date_timestamp:
+        return None
+
+    recent_submission_window_date = DABSSubmissionWindowSchedule.objects.filter(
+        submission_reveal_date__lt=datetime.max.replace(tzinfo=timezone.utc)
+    ).aggregate(Max("submission_reveal_date"))["submission_reveal_date__max"]
+    return max(filter(None, [updated_date_timestamp, recent_submission_window_date]))
+
+
+def compute_download_request_hash(json_request: dict) -> Optional[str]:
+    """
+    Content address of a download's results: a hash of the normalized request together with the freshness of the
+    data it reads, so a new data load changes the hash of every request it affects. None if freshness is unknown.
+    """
+    data_freshness = get_download_data_freshness(json_request.get("download_types"))
+    if data_freshness is None:
+        return None
+    key = json.dumps({"request": order_nested_object(json_request), "data_freshness": data_freshness.isoformat()})
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def find_reusable_download(download_job: DownloadJob) -> Optional[DownloadJob]:
+    """Most recent other finished DownloadJob with the same request hash, whose zip can stand in for this job's"""
+    return (
+        DownloadJob.objects.filter(
+            request_hash=download_job.request_hash,
+            job_status_id=JOB_STATUS_DICT["finished"],
+            monthly_download=False,
+            file_size__isnull=False,
+        )
+        .exclude(download_job_id=download_job.download_job_id)
+        .order_by("-update_date")
+        .first()
+    )
+
+
+def copy_download_file(source_file_name: str, destination_file_name: str) -> None:
+    if settings.IS_LOCAL:
+        shutil.copyfile(settings.CSV_LOCAL_PATH + source_file_name, settings.CSV_LOCAL_PATH + destination_file_name)
+    else:
+        copy_s3_object(
+            settings.BULK_DOWNLOAD_S3_BUCKET_NAME,
+            settings.USASPENDING_AWS_REGION,
+            source_file_name,
+            destination_file_name,
+        )
+
+
+def get_deduplication_stats(download_job: DownloadJob) -> Optional[dict]:
+    """Whether this job reused another's zip, and the hit rate and bytes saved across all jobs with its request"""
+    if not download_job.request_hash:
+        return None
+    stats = DownloadJob.objects.filter(
+        request_hash=download_job.request_hash, job_status_id=JOB_STATUS_DICT["finished"]
+    ).aggregate(
+        finished=Count("download_job_id"),
+        reused=Count("reused_download_job_id"),
+        bytes_saved=Sum("file_size", filter=Q(reused_download_job_id__isnull=False)),
+    )
+    return {
+        "reused_download": download_job.reused_download_job_id is not None,
+        "hit_rate": round(stats["reused"] / stats["finished"], 4) if stats["finished"] else 0,
+        "bytes_saved": stats["bytes_saved"] or 0,
+    }
@@ -0,0 +1,89 @@
+import json
+import logging
+import multiprocessing as mp
+
+from django.conf import settings
+from typing import Optional
+
+from usaspending_api.download.models.download_job import DownloadJob
+from usaspending_api.download.v2.download_transaction_count import get_download_transaction_count
+
+logger = logging.getLogger(__name__)
+
+SMALL_LANE = "small"
+LARGE_LANE = "large"
+
+# Downloads of a single award's data are always small
+SINGLE_AWARD_REQUEST_TYPES = ("idv", "contract", "assistance")
+
+
+def estimate_download_rows(json_request: dict) -> Optional[int]:
+    """
+    Estimate the number of rows an award download will write, with the same counts as the download count endpoint.
+    Returns None for requests that can't be estimated this way, such as account downloads.
+    """
+    if json_request.get("request_type") != "award" or not isinstance(json_request.get("filters"), dict):
+        return None
+
+    download_types = json_request.get("download_types", [])
+    estimated_rows = 0
+    if any(download_type != "sub_awards" for download_type in download_types):
+        estimated_rows += get_download_transaction_count(json_request["filters"])
+    if "sub_awards" in download_types:
+        estimated_rows += get_download_transaction_count(json_request["filters"], subawards=True)
+
+    if json_request.get("limit"):
+        estimated_rows = min(estimated_rows, json_request["limit"] * len(download_types))
+    return estimated_rows
+
+
+def classify_download_job(download_job: DownloadJob) -> str:
+    """
+    Place a download in the large lane if it is estimated to write at least DOWNLOAD_WORKER_LARGE_JOB_ROWS rows, or
+    if its size can't be estimated, and otherwise in the small lane
+    """
+    json_request = json.loads(download_job.json_request)
+    if json_request.get("request_type") in SINGLE_AWARD_REQUEST_TYPES:
+        return SMALL_LANE
+
+    try:
+        estimated_rows = estimate_download_rows(json_request)
+    except Exception:
+        logger.exception(f"Unable to estimate the rows of DownloadJob {download_job.download_job_id}")
+        estimated_rows = None
+
+    if estimated_rows is None or estimated_rows >= settings.DOWNLOAD_WORKER_LARGE_JOB_ROWS:
+        return LARGE_LANE
+    return SMALL_LANE
+
+
+class DownloadLaneScheduler:
+    """
+    Shares the dispatcher processes of one download worker between a small and a large lane of downloads.
+
+    Any dispatcher process runs small downloads, but at most ``large_lane_slots`` of them run large downloads at a
+    time, so that the rest are always free for small downloads however many large ones are waiting. The state lives
+    in shared memory created before the dispatcher processes are forked, and is kept per dispatcher process so that a
+    slot is given back by the dispatcher even when the worker process running its download is killed.
+    """
+
+    def __init__(self, dispatcher_count: int, large_lane_slots: int):
+        if not 0 < large_lane_slots <= dispatcher_count:
+            raise ValueError(f"large_lane_slots must be between 1 and the dispatcher count of {dispatcher_count}")
+        self.dispatcher_count = dispatcher_count
+        self.large_lane_slots = large_lane_slots
+        self._running_large = mp.get_context("fork").Array("b", dispatcher_count)
+
+    def admit(self, dispatcher_index: int, lane: str) -> bool:
+        """Claim a lane slot for the download about to run on the given dispatcher. False if the lane is full."""
+        if lane == SMALL_LANE:
+            return True
+        with self._running_large.get_lock():
+            if sum(self._running_large) >= self.large_lane_slots:
+                return False
+            self._running_large[dispatcher_index] = 1
+        return True
+
+    def release(self, dispatcher_index: int) -> None:
+        with self._running_large.get_lock():
+            self._running_large[dispatcher_index] = 0
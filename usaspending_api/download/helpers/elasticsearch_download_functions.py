@@ -2,9 +2,11 @@ import itertools
 import logging
 from abc import ABCMeta, abstractmethod
 from datetime import datetime, timezone
-from typing import Union
+from io import StringIO
+from typing import Iterator, List, Union
 
 from django.conf import settings
+from django.db import connection
 from django.db.models import QuerySet
 from elasticsearch_dsl import A
 
@@ -61,12 +63,45 @@ class _ElasticsearchDownload(metaclass=ABCMeta):
 
             yield results
 
+    @classmethod
+    def _get_download_ids_search_after_generator(cls, search: Union[AwardSearch, TransactionSearch], size: int):
+        """
+        Takes an AwardSearch or TransactionSearch object (that specifies the index and filter) and returns a generator
+        that yields lists of up to SIZE IDs. Pages through the hits sorted on the ID field using search_after, so each
+        request is a cheap sorted fetch rather than a terms aggregation over the whole filter.
+        """
+        max_retries = 10
+        search = search.source(False).sort(cls._source_field).extra(track_total_hits=False)
+        last_id = None
+        remaining = settings.MAX_DOWNLOAD_LIMIT
+        while remaining > 0:
+            page_size = min(size, remaining)
+            page = search.extra(size=page_size)
+            if last_id is not None:
+                page = page.extra(search_after=[last_id])
+            response = page.handle_execute(retries=max_retries)
+
+            if response is None:
+                raise Exception("Breaking generator, unable to reach cluster")
+            results = [hit["sort"][0] for hit in response.to_dict()["hits"]["hits"]]
+            if results:
+                yield results
+            if len(results) < page_size:
+                break
+            last_id = results[-1]
+            remaining -= len(results)
+
     @classmethod
     def _populate_download_lookups(cls, filters: dict, download_job: DownloadJob, size: int = 10000) -> None:
         """
         Takes a dictionary of the different download filters and returns a flattened list of ids.
         """
         filter_query = cls._filter_query_func(filters)
+        if settings.DOWNLOAD_STREAM_ES_IDS:
+            search = cls._search_type().filter(filter_query)
+            cls._copy_download_lookups(cls._get_download_ids_search_after_generator(search, size), download_job)
+            return
+
         search = cls._search_type().filter(filter_query).source([cls._source_field])
         ids = cls._get_download_ids_generator(search, size)
         lookup_id_type = cls._search_type.type_as_string()
@@ -91,6 +126,28 @@ class _ElasticsearchDownload(metaclass=ABCMeta):
             download_job=download_job,
         )
 
+    @classmethod
+    def _copy_download_lookups(cls, ids: Iterator[List[int]], download_job: DownloadJob) -> None:
+        """
+        COPY each chunk of IDs into download_job_lookup as it is received, so only one chunk is held in memory
+        instead of a DownloadJobLookup object for every ID.
+        """
+        lookup_table_name = DownloadJobLookup._meta.db_table
+        copy_sql = f"COPY {lookup_table_name} (created_at, download_job_id, lookup_id, lookup_id_type) FROM STDIN"
+        row_suffix = f"\t{cls._search_type.type_as_string()}\n"
+        row_prefix = f"{datetime.now(timezone.utc).isoformat()}\t{download_job.download_job_id}\t"
+        total = 0
+        with connection.cursor() as cursor:
+            for chunk in ids:
+                rows = "".join(f"{row_prefix}{es_id}{row_suffix}" for es_id in chunk)
+                cursor.copy_expert(copy_sql, StringIO(rows))
+                total += len(chunk)
+
+        write_to_log(
+            message=f"Found and inserted {total} {cls._source_field} based on filters into download_job_lookup",
+            download_job=download_job,
+        )
+
     @classmethod
     @abstractmethod
     def query(cls, filters: dict, download_job: DownloadJob) -> QuerySet:
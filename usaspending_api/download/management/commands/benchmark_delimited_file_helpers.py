@@ -0,0 +1,106 @@
+import csv
+import logging
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+from random import Random
+from time import perf_counter
+
+from usaspending_api.common.csv_helpers import (
+    count_rows_in_delimited_file,
+    fast_count_rows_in_delimited_file,
+    fast_partition_large_delimited_file,
+    partition_large_delimited_file,
+)
+from usaspending_api.download.filestreaming.download_generation import EXCEL_ROW_LIMIT
+
+logger = logging.getLogger("script")
+
+
+class Command(BaseCommand):
+    """Compare the row counting and partitioning of download files by parsing them vs. scanning their bytes
+
+    Runs against a given download CSV, or against a synthetic one written like Postgres COPY output, with fields that
+    need quoting (delimiters, quotes, and line breaks) mixed in among plain ones. Both approaches are checked to find
+    the same number of rows and partitions before their timings are reported.
+    """
+
+    help = "Benchmark the parsing vs. byte scanning row count and partition of large download files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", type=str, help="Existing download CSV to benchmark against, instead of a new one")
+        parser.add_argument(
+            "--size-mb",
+            type=int,
+            help="Size of the synthetic CSV to write when no --file is given",
+            default=2048,
+            metavar="(default: 2,048)",
+        )
+        parser.add_argument(
+            "--row-limit",
+            type=int,
+            help="Rows per partition",
+            default=EXCEL_ROW_LIMIT,
+            metavar=f"(default: {EXCEL_ROW_LIMIT:,})",
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as working_dir:
+            if options["file"]:
+                source_path = os.path.join(working_dir, os.path.basename(options["file"]))
+                os.symlink(os.path.abspath(options["file"]), source_path)
+            else:
+                source_path = os.path.join(working_dir, "benchmark.csv")
+                logger.info(f"Writing a {options['size_mb']:,} MB synthetic download CSV")
+                _write_synthetic_download_file(source_path, options["size_mb"] * 1024 * 1024)
+            size_mb = os.path.getsize(source_path) / 1024 / 1024
+
+            counts = {}
+            for label, count_func in (
+                ("parsing", count_rows_in_delimited_file),
+                ("scanning", fast_count_rows_in_delimited_file),
+            ):
+                start = perf_counter()
+                counts[label] = count_func(source_path)
+                _log_timing(f"count by {label}", size_mb, perf_counter() - start)
+            if counts["parsing"] != counts["scanning"]:
+                raise RuntimeError(f"Row counts differ: {counts}")
+            logger.info(f"Both counted {counts['scanning']:,} rows")
+
+            partitions = {}
+            for label, partition_func in (
+                ("parsing", partition_large_delimited_file),
+                ("scanning", fast_partition_large_delimited_file),
+            ):
+                start = perf_counter()
+                partitions[label] = partition_func(
+                    source_path, row_limit=options["row_limit"], output_name_template=f"{label}_%s.csv"
+                )
+                _log_timing(f"partition by {label}", size_mb, perf_counter() - start)
+                for partition_path in partitions[label]:
+                    os.remove(partition_path)
+            if len(partitions["parsing"]) != len(partitions["scanning"]):
+                raise RuntimeError(
+                    f"Partition counts differ: {len(partitions['parsing'])} vs. {len(partitions['scanning'])}"
+                )
+            logger.info(f"Both wrote {len(partitions['scanning']):,} partitions")
+
+
+def _log_timing(label: str, size_mb: float, seconds: float) -> None:
+    logger.info(f"{label:>21}: {size_mb:,.0f} MB in {seconds:.2f}s | {size_mb / seconds:,.0f} MB/sec")
+
+
+def _write_synthetic_download_file(file_path: str, size_bytes: int) -> None:
+    """Write rows of 60 columns until the file reaches the given size, quoting fields only where COPY would"""
+    rng = Random(42)
+    plain_values = ["ACME CORP", "2020-01-15", "12345.67", "", "N", "DEPARTMENT OF DEFENSE", "VA", "541512"]
+    quoted_values = ["SMITH, JOHN", 'THE "BEST" SERVICES', "LINE ONE\nLINE TWO", "SUITE 100, FLOOR 2"]
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow([f"column_{i}" for i in range(60)])
+        while f.tell() < size_bytes:
+            writer.writerows(
+                [rng.choice(quoted_values) if rng.random() < 0.05 else rng.choice(plain_values) for _ in range(60)]
+                for _ in range(10000)
+            )
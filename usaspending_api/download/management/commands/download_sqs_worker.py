@@ -1,11 +1,18 @@
 import logging
+import multiprocessing as mp
+import multiprocessing.connection
+import os
+import signal
 import time
 import traceback
 from ddtrace import tracer
 from ddtrace.ext import SpanTypes
 from ddtrace.constants import ANALYTICS_SAMPLE_RATE_KEY
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
 
 from usaspending_api.common.sqs.sqs_handler import get_sqs_queue
 from usaspending_api.common.sqs.sqs_work_dispatcher import (
@@ -16,6 +23,7 @@ from usaspending_api.common.sqs.sqs_work_dispatcher import (
 from usaspending_api.common.tracing import DatadogEagerlyDropTraceFilter, SubprocessTrace
 from usaspending_api.download.filestreaming.download_generation import generate_download
 from usaspending_api.common.sqs.sqs_job_logging import log_job_message
+from usaspending_api.download.helpers.download_scheduling import classify_download_job, DownloadLaneScheduler
 from usaspending_api.download.helpers.monthly_helpers import download_job_to_log_dict
 from usaspending_api.download.lookups import JOB_STATUS_DICT
 from usaspending_api.download.models.download_job import DownloadJob
@@ -23,64 +31,176 @@ from usaspending_api.download.models.download_job import DownloadJob
 logger = logging.getLogger(__name__)
 JOB_TYPE = "USAspendingDownloader"
 
+# How long a large download waits before it is visible in the queue again, when it was received by a dispatcher while
+# every large lane slot was taken
+LARGE_LANE_REQUEUE_DELAY_SECONDS = 30
+
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.DOWNLOAD_WORKER_CONCURRENCY,
+            help="Number of dispatcher processes polling the queue, each running one download at a time",
+        )
+        parser.add_argument(
+            "--large-lane-slots",
+            type=int,
+            default=settings.DOWNLOAD_WORKER_LARGE_LANE_SLOTS,
+            help="With a concurrency above 1, the number of dispatcher processes that may run large downloads at once",
+        )
+
     def handle(self, *args, **options):
         # Configure Tracer to drop traces of polls of the queue that have been flagged as uninteresting
         DatadogEagerlyDropTraceFilter.activate()
 
-        queue = get_sqs_queue()
-        log_job_message(logger=logger, message="Starting SQS polling", job_type=JOB_TYPE)
+        if options["concurrency"] > 1:
+            scheduler = DownloadLaneScheduler(
+                options["concurrency"], min(options["large_lane_slots"], options["concurrency"])
+            )
+            _run_concurrent_dispatchers(scheduler)
+        else:
+            _poll_queue()
 
-        message_found = None
-        keep_polling = True
-        while keep_polling:
 
-            # Start a Datadog Trace for this poll iter to capture activity in APM
-            with tracer.trace(
-                name=f"job.{JOB_TYPE}", service="bulk-download", resource=queue.url, span_type=SpanTypes.WORKER
-            ) as span:
-                # Set True to add trace to App Analytics:
-                # - https://docs.datadoghq.com/tracing/app_analytics/?tab=python#custom-instrumentation
-                span.set_tag(ANALYTICS_SAMPLE_RATE_KEY, 1.0)
+def _run_concurrent_dispatchers(scheduler):
+    """Fork a dispatcher process per concurrent download, and pass exit signals received by this process on to them
 
-                # Setup dispatcher that coordinates job activity on SQS
-                dispatcher = SQSWorkDispatcher(
-                    queue, worker_process_name=JOB_TYPE, worker_can_start_child_processes=True
+    A dispatcher exits when a download it ran failed, or its worker process died. Only that dispatcher is replaced, so
+    that the downloads running on the others carry on. Once this process receives an exit signal, it waits for every
+    dispatcher to exit, and exits with the first non-zero exit code among them.
+    """
+    log_job_message(
+        logger=logger,
+        message=f"Starting {scheduler.dispatcher_count} dispatchers, {scheduler.large_lane_slots} of which may run "
+        "large downloads at once",
+        job_type=JOB_TYPE,
+    )
+
+    # Don't share database connections with the forked dispatchers
+    connections.close_all()
+    ctx = mp.get_context("fork")
+    dispatchers = {}
+    stopping = False
+
+    def forward_exit_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for dispatcher in dispatchers.values():
+            if dispatcher.is_alive():
+                os.kill(dispatcher.pid, signum)
+
+    def start_dispatcher(index):
+        dispatcher = ctx.Process(name=f"{JOB_TYPE}Dispatcher{index}", target=_run_dispatcher, args=(scheduler, index))
+        # Hold off exit signals until the new dispatcher can be found in `dispatchers` to forward them to
+        signal.pthread_sigmask(signal.SIG_BLOCK, SQSWorkDispatcher.EXIT_SIGNALS)
+        try:
+            dispatcher.start()
+            dispatchers[index] = dispatcher
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, SQSWorkDispatcher.EXIT_SIGNALS)
+
+    previous_handlers = {sig: signal.signal(sig, forward_exit_signal) for sig in SQSWorkDispatcher.EXIT_SIGNALS}
+    try:
+        for index in range(scheduler.dispatcher_count):
+            start_dispatcher(index)
+
+        while not stopping:
+            sentinels = {dispatcher.sentinel: index for index, dispatcher in dispatchers.items()}
+            for sentinel in mp.connection.wait(list(sentinels)):
+                index = sentinels[sentinel]
+                dispatchers[index].join()
+                if stopping:
+                    break
+                log_job_message(
+                    logger=logger,
+                    message=f"{dispatchers[index].name} exited with code {dispatchers[index].exitcode}. "
+                    "Starting a new one in its place",
+                    job_type=JOB_TYPE,
                 )
-
-                try:
-
-                    # Check the queue for work and hand it to the given processing function
-                    message_found = dispatcher.dispatch(download_service_app)
-
-                    # Mark the job as failed if: there was an error processing the download; retries after interrupt
-                    # are not allowed; or all retries have been exhausted
-                    # If the job is interrupted by an OS signal, the dispatcher's signal handling logic will log and
-                    # handle this case
-                    # Retries are allowed or denied by the SQS queue's RedrivePolicy config
-                    # That is, if maxReceiveCount > 1 in the policy, then retries are allowed
-                    # - if queue retries are allowed, the queue message will retry to the max allowed by the queue
-                    # - As coded, no cleanup should be needed to retry a download
-                    #   - the psql -o will overwrite the output file
-                    #   - the zip will use 'w' write mode to create from scratch each time
-                    # The worker function controls the maximum allowed runtime of the job
-
-                except (QueueWorkerProcessError, QueueWorkDispatcherError) as exc:
-                    _handle_queue_error(exc)
-
-                if not message_found:
-                    # Flag the the Datadog trace for dropping, since no trace-worthy activity happened on this poll
-                    DatadogEagerlyDropTraceFilter.drop(span)
-
-                    # When you receive an empty response from the queue, wait before trying again
-                    time.sleep(1)
-
-                # If this process is exiting, don't poll for more work
-                keep_polling = not dispatcher.is_exiting
-
-
-def download_service_app(download_job_id):
+                # Its download is over, whether or not the dispatcher got to give back its lane slot
+                scheduler.release(index)
+                start_dispatcher(index)
+
+        for dispatcher in dispatchers.values():
+            dispatcher.join()
+    finally:
+        for sig, handler in previous_handlers.items():
+            # None when the handler wasn't installed from Python
+            signal.signal(sig, signal.SIG_DFL if handler is None else handler)
+
+    exit_code = next((dispatcher.exitcode for dispatcher in dispatchers.values() if dispatcher.exitcode), 0)
+    if exit_code:
+        raise SystemExit(exit_code)
+
+
+def _run_dispatcher(scheduler, dispatcher_index):
+    # Forked with exit signals blocked and handled by forward_exit_signal(); this process handles its own from now on
+    for sig in SQSWorkDispatcher.EXIT_SIGNALS:
+        signal.signal(sig, signal.SIG_DFL)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, SQSWorkDispatcher.EXIT_SIGNALS)
+    _poll_queue(scheduler, dispatcher_index)
+
+
+def _poll_queue(scheduler=None, dispatcher_index=None):
+    """Poll the queue for downloads and run them one at a time, until this process is signaled to exit"""
+    queue = get_sqs_queue()
+    log_job_message(logger=logger, message="Starting SQS polling", job_type=JOB_TYPE)
+
+    job_kwargs = {"scheduler": scheduler, "dispatcher_index": dispatcher_index} if scheduler else {}
+    message_found = None
+    keep_polling = True
+    while keep_polling:
+
+        # Start a Datadog Trace for this poll iter to capture activity in APM
+        with tracer.trace(
+            name=f"job.{JOB_TYPE}", service="bulk-download", resource=queue.url, span_type=SpanTypes.WORKER
+        ) as span:
+            # Set True to add trace to App Analytics:
+            # - https://docs.datadoghq.com/tracing/app_analytics/?tab=python#custom-instrumentation
+            span.set_tag(ANALYTICS_SAMPLE_RATE_KEY, 1.0)
+
+            # Setup dispatcher that coordinates job activity on SQS
+            dispatcher = SQSWorkDispatcher(queue, worker_process_name=JOB_TYPE, worker_can_start_child_processes=True)
+
+            try:
+
+                # Check the queue for work and hand it to the given processing function
+                message_found = dispatcher.dispatch(download_service_app, **job_kwargs)
+
+                # Mark the job as failed if: there was an error processing the download; retries after interrupt
+                # are not allowed; or all retries have been exhausted
+                # If the job is interrupted by an OS signal, the dispatcher's signal handling logic will log and
+                # handle this case
+                # Retries are allowed or denied by the SQS queue's RedrivePolicy config
+                # That is, if maxReceiveCount > 1 in the policy, then retries are allowed
+                # - if queue retries are allowed, the queue message will retry to the max allowed by the queue
+                # - As coded, no cleanup should be needed to retry a download
+                #   - the psql -o will overwrite the output file
+                #   - the zip will use 'w' write mode to create from scratch each time
+                # The worker function controls the maximum allowed runtime of the job
+
+            except (QueueWorkerProcessError, QueueWorkDispatcherError) as exc:
+                _handle_queue_error(exc)
+
+            finally:
+                # The lane slot of the download is given back here, in case its worker process was killed
+                if scheduler:
+                    scheduler.release(dispatcher_index)
+
+            if not message_found:
+                # Flag the the Datadog trace for dropping, since no trace-worthy activity happened on this poll
+                DatadogEagerlyDropTraceFilter.drop(span)
+
+                # When you receive an empty response from the queue, wait before trying again
+                time.sleep(1)
+
+            # If this process is exiting, don't poll for more work
+            keep_polling = not dispatcher.is_exiting
+
+
+def download_service_app(download_job_id, scheduler=None, dispatcher_index=None):
     with SubprocessTrace(
         name=f"job.{JOB_TYPE}.download",
         service="bulk-download",
@@ -96,7 +216,49 @@ def download_service_app(download_job_id):
             other_params=download_job_details,
         )
         span.set_tags(download_job_details)
+
+        if scheduler is None:
+            generate_download(download_job=download_job)
+            return
+
+        lane = classify_download_job(download_job)
+        if not scheduler.admit(dispatcher_index, lane):
+            _requeue_download_job(download_job_id, lane)
+            return
+
+        # Time spent queued includes time spent requeued while the lane was full
+        queue_seconds = (timezone.now() - download_job.create_date).total_seconds()
+        start_time = time.perf_counter()
         generate_download(download_job=download_job)
+        lane_metrics = {
+            "lane": lane,
+            "queue_seconds": round(queue_seconds, 3),
+            "run_seconds": round(time.perf_counter() - start_time, 3),
+        }
+        span.set_tags(lane_metrics)
+        log_job_message(
+            logger=logger,
+            message=f"Finished download in the {lane} lane",
+            job_type=JOB_TYPE,
+            job_id=download_job_id,
+            other_params=lane_metrics,
+        )
+
+
+def _requeue_download_job(download_job_id, lane):
+    """Send a download back to the queue for another dispatcher, once this one has found its lane full.
+
+    It is sent as a new message, rather than by making the received message visible again, so that waiting for a
+    lane slot does not count towards the retries allowed by the queue's RedrivePolicy. The received message is deleted
+    by the dispatcher once this process exits successfully.
+    """
+    get_sqs_queue().send_message(MessageBody=str(download_job_id), DelaySeconds=LARGE_LANE_REQUEUE_DELAY_SECONDS)
+    log_job_message(
+        logger=logger,
+        message=f"Every {lane} lane slot is taken. Requeued the download for {LARGE_LANE_REQUEUE_DELAY_SECONDS} seconds",
+        job_type=JOB_TYPE,
+        job_id=download_job_id,
+    )
 
 
 def _retrieve_download_job_from_db(download_job_id):
@@ -159,6 +159,21 @@ class Command(BaseCommand):
         parser.add_argument(
             "--empty-contracts-file", dest="empty_contracts_file", default="", help="Empty contracts file for uploading"
         )
+        parser.add_argument(
+            "--zip-compression-level",
+            dest="zip_compression_level",
+            default=None,
+            type=int,
+            help="zlib level to compress the files with, from 1 (fastest) to 9 (smallest)."
+            " Only applies if --local is also provided.",
+        )
+        parser.add_argument(
+            "--zip-processes",
+            dest="zip_processes",
+            default=None,
+            type=int,
+            help="Number of processes compressing the files in parallel (only applies if --local is also provided).",
+        )
 
     def handle(self, *args, **options):
         """Run the application."""
@@ -185,6 +200,12 @@ class Command(BaseCommand):
         if placeholders and (not empty_assistance_file or not empty_contracts_file):
             raise Exception("Placeholder arg provided but empty files not provided")
 
+        # Like the bucket name, these modify the bulk download settings of this instance
+        if options["zip_compression_level"] is not None:
+            settings.DOWNLOAD_ZIP_COMPRESSION_LEVEL = options["zip_compression_level"]
+        if options["zip_processes"] is not None:
+            settings.DOWNLOAD_ZIP_PROCESSES = options["zip_processes"]
+
         current_date = datetime.date.today()
         updated_date_timestamp = datetime.datetime.strftime(current_date, "%Y%m%d")
 
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('download', '0005_downloadjoblookup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='downloadjob',
+            name='request_hash',
+            field=models.TextField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='downloadjob',
+            name='reused_download_job_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -26,6 +26,8 @@ class DownloadJob(models.Model):
     update_date = models.DateTimeField(auto_now=True, null=True)
     monthly_download = models.BooleanField(default=False)
     json_request = models.TextField(blank=True, null=True)
+    request_hash = models.TextField(blank=True, null=True, db_index=True)
+    reused_download_job_id = models.IntegerField(blank=True, null=True)
 
     class Meta:
         managed = True
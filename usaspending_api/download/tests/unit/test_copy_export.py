@@ -0,0 +1,55 @@
+import pytest
+
+from usaspending_api.download.filestreaming import download_generation
+from usaspending_api.download.filestreaming.download_generation import _PartitionedCopyWriter
+
+
+def test_partitioned_copy_writer_rotates_at_row_limit(tmp_path):
+    writer = _PartitionedCopyWriter(str(tmp_path / "output_%s.csv"), row_limit=2)
+    writer.write(b"id,name\n")
+    for row in (b'1,"a"\n', b'2,"line\nbreak"\n', b"3,c\n", b"4,d\n", b"5,e\n"):
+        writer.write(row)
+    writer.close()
+
+    assert writer.row_count == 5
+    assert writer.file_paths == [str(tmp_path / f"output_{i}.csv") for i in (1, 2, 3)]
+    assert (tmp_path / "output_1.csv").read_bytes() == b'id,name\n1,"a"\n2,"line\nbreak"\n'
+    assert (tmp_path / "output_2.csv").read_bytes() == b"id,name\n3,c\n4,d\n"
+    assert (tmp_path / "output_3.csv").read_bytes() == b"id,name\n5,e\n"
+
+
+def test_partitioned_copy_writer_header_only(tmp_path):
+    writer = _PartitionedCopyWriter(str(tmp_path / "output_%s.csv"), row_limit=2)
+    writer.write(b"id,name\n")
+    writer.close()
+
+    assert writer.row_count == 0
+    assert writer.file_paths == [str(tmp_path / "output_1.csv")]
+    assert (tmp_path / "output_1.csv").read_bytes() == b"id,name\n"
+
+
+def test_partitioned_copy_writer_hands_off_completed_parts(tmp_path):
+    completed = []
+    writer = _PartitionedCopyWriter(str(tmp_path / "output_%s.csv"), row_limit=2, on_part_complete=completed.append)
+    writer.write(b"id\n")
+    for row in (b"1\n", b"2\n", b"3\n"):
+        writer.write(row)
+    assert completed == [str(tmp_path / "output_1.csv")]
+
+    writer.complete_part()
+    assert completed == writer.file_paths
+
+
+def test_export_error_is_not_hidden_by_zip_writer_error(tmp_path, monkeypatch, settings):
+    settings.DOWNLOAD_PIPELINE_ZIP = True
+
+    def export_then_fail(export_query, output_template, download_job, on_part_complete, exports):
+        # The zip writer fails on the missing part file, after the export has already failed
+        on_part_complete(str(tmp_path / "missing.csv"))
+        raise RuntimeError("statement timeout")
+
+    monkeypatch.setattr(download_generation, "execute_copy_export", export_then_fail)
+    with pytest.raises(RuntimeError, match="statement timeout"):
+        download_generation.export_and_zip_data_files(
+            "SELECT 1", str(tmp_path / "test.zip"), str(tmp_path / "data.csv"), "data", "csv", None
+        )
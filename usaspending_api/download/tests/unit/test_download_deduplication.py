@@ -0,0 +1,77 @@
+import pytest
+
+from datetime import datetime, timezone
+from model_mommy import mommy
+
+from usaspending_api.broker.lookups import EXTERNAL_DATA_TYPE_DICT
+from usaspending_api.download.helpers.download_deduplication import (
+    compute_download_request_hash,
+    find_reusable_download,
+    get_deduplication_stats,
+)
+from usaspending_api.download.lookups import JOB_STATUS, JOB_STATUS_DICT
+
+
+JSON_REQUEST = {"download_types": ["elasticsearch_awards"], "filters": {"agencies": [], "keywords": ["test"]}}
+
+
+@pytest.fixture
+def load_date(db):
+    for js in JOB_STATUS:
+        mommy.make("download.JobStatus", job_status_id=js.id, name=js.name, description=js.desc)
+    return mommy.make(
+        "broker.ExternalDataLoadDate",
+        external_data_type__external_data_type_id=EXTERNAL_DATA_TYPE_DICT["es_awards"],
+        last_load_date=datetime(2021, 1, 17, 12, 0, 0, 0, timezone.utc),
+    )
+
+
+def test_request_hash_changes_with_data_freshness(load_date):
+    request_hash = compute_download_request_hash(JSON_REQUEST)
+    reordered_request = {"filters": {"keywords": ["test"], "agencies": []}, "download_types": ["elasticsearch_awards"]}
+    assert compute_download_request_hash(reordered_request) == request_hash
+    assert compute_download_request_hash({**JSON_REQUEST, "columns": ["award_id"]}) != request_hash
+
+    load_date.last_load_date = datetime(2021, 1, 18, 12, 0, 0, 0, timezone.utc)
+    load_date.save()
+    assert compute_download_request_hash(JSON_REQUEST) != request_hash
+
+
+def test_request_hash_without_data_freshness(db):
+    assert compute_download_request_hash(JSON_REQUEST) is None
+
+
+def test_find_reusable_download_and_stats(load_date):
+    request_hash = compute_download_request_hash(JSON_REQUEST)
+    mommy.make(
+        "download.DownloadJob",
+        download_job_id=1,
+        file_name="failed.zip",
+        job_status_id=JOB_STATUS_DICT["failed"],
+        request_hash=request_hash,
+    )
+    original = mommy.make(
+        "download.DownloadJob",
+        download_job_id=2,
+        file_name="original.zip",
+        job_status_id=JOB_STATUS_DICT["finished"],
+        request_hash=request_hash,
+        file_size=1000,
+    )
+    new_job = mommy.make(
+        "download.DownloadJob",
+        download_job_id=3,
+        file_name="new.zip",
+        job_status_id=JOB_STATUS_DICT["running"],
+        request_hash=request_hash,
+    )
+
+    assert find_reusable_download(new_job) == original
+    assert get_deduplication_stats(original) == {"reused_download": False, "hit_rate": 0, "bytes_saved": 0}
+
+    new_job.job_status_id = JOB_STATUS_DICT["finished"]
+    new_job.reused_download_job_id = original.download_job_id
+    new_job.file_size = original.file_size
+    new_job.save()
+    assert get_deduplication_stats(new_job) == {"reused_download": True, "hit_rate": 0.5, "bytes_saved": 1000}
+    assert get_deduplication_stats(mommy.make("download.DownloadJob", download_job_id=4)) is None
@@ -0,0 +1,69 @@
+import json
+import pytest
+
+from usaspending_api.download.helpers import download_scheduling
+from usaspending_api.download.helpers.download_scheduling import (
+    classify_download_job,
+    DownloadLaneScheduler,
+    LARGE_LANE,
+    SMALL_LANE,
+)
+from usaspending_api.download.models.download_job import DownloadJob
+
+
+def _download_job(**json_request):
+    return DownloadJob(download_job_id=1, json_request=json.dumps(json_request))
+
+
+@pytest.fixture
+def transaction_count(monkeypatch):
+    counts = {"transactions": 0, "subawards": 0}
+    monkeypatch.setattr(
+        download_scheduling,
+        "get_download_transaction_count",
+        lambda filters, subawards=False: counts["subawards" if subawards else "transactions"],
+    )
+    return counts
+
+
+def test_classify_download_job(settings, transaction_count):
+    settings.DOWNLOAD_WORKER_LARGE_JOB_ROWS = 1000
+    award_request = {"request_type": "award", "download_types": ["elasticsearch_transactions"], "filters": {}}
+
+    transaction_count["transactions"] = 999
+    assert classify_download_job(_download_job(**award_request)) == SMALL_LANE
+
+    transaction_count["subawards"] = 1
+    assert classify_download_job(_download_job(**award_request)) == SMALL_LANE
+    award_request["download_types"].append("sub_awards")
+    assert classify_download_job(_download_job(**award_request)) == LARGE_LANE
+    assert classify_download_job(_download_job(**award_request, limit=100)) == SMALL_LANE
+
+    assert classify_download_job(_download_job(request_type="idv", award_id=1)) == SMALL_LANE
+    assert classify_download_job(_download_job(request_type="account", filters={})) == LARGE_LANE
+
+
+def test_classify_download_job_when_estimate_fails(monkeypatch):
+    def fail(filters, subawards=False):
+        raise ConnectionError()
+
+    monkeypatch.setattr(download_scheduling, "get_download_transaction_count", fail)
+    job = _download_job(request_type="award", download_types=["elasticsearch_awards"], filters={})
+    assert classify_download_job(job) == LARGE_LANE
+
+
+def test_lane_scheduler():
+    scheduler = DownloadLaneScheduler(dispatcher_count=3, large_lane_slots=1)
+
+    assert scheduler.admit(0, LARGE_LANE)
+    assert not scheduler.admit(1, LARGE_LANE)
+    assert scheduler.admit(1, SMALL_LANE)
+    assert scheduler.admit(2, SMALL_LANE)
+
+    scheduler.release(1)
+    assert not scheduler.admit(2, LARGE_LANE)
+    scheduler.release(0)
+    assert scheduler.admit(2, LARGE_LANE)
+
+    with pytest.raises(ValueError):
+        DownloadLaneScheduler(dispatcher_count=2, large_lane_slots=3)
@@ -0,0 +1,42 @@
+import multiprocessing as mp
+import os
+import signal
+import sys
+import threading
+import time
+
+from types import SimpleNamespace
+
+from usaspending_api.download.management.commands import download_sqs_worker
+
+# Number of times each dispatcher was started, shared with the forked dispatchers
+_starts = mp.get_context("fork").Array("i", 3)
+
+
+def _first_dispatcher_fails_once(scheduler, dispatcher_index):
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with _starts.get_lock():
+        _starts[dispatcher_index] += 1
+        start_count = _starts[dispatcher_index]
+    if dispatcher_index == 0 and start_count == 1:
+        time.sleep(0.2)
+        raise SystemExit(3)
+    while True:
+        time.sleep(0.1)
+
+
+def test_concurrent_dispatchers_replace_only_the_one_that_died(monkeypatch):
+    monkeypatch.setattr(download_sqs_worker, "_poll_queue", _first_dispatcher_fails_once)
+    released = []
+    scheduler = SimpleNamespace(dispatcher_count=3, large_lane_slots=1, release=released.append)
+
+    # Stop the dispatchers once the failed one has had time to be replaced
+    stop = threading.Timer(2, os.kill, (os.getpid(), signal.SIGTERM))
+    stop.start()
+    start = time.perf_counter()
+    download_sqs_worker._run_concurrent_dispatchers(scheduler)
+    stop.join()
+
+    assert list(_starts) == [2, 1, 1]
+    assert released == [0]
+    assert time.perf_counter() - start < 10
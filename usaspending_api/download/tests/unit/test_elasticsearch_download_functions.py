@@ -0,0 +1,48 @@
+from unittest.mock import MagicMock
+
+from usaspending_api.download.helpers.elasticsearch_download_functions import AwardsElasticsearchDownload
+
+
+class _FakeSearch:
+    """Serves sorted award IDs a page at a time, honoring the size and search_after of each request"""
+
+    def __init__(self, award_ids, params=None):
+        self.award_ids = award_ids
+        self.params = params or {}
+        self.requests = []
+
+    def source(self, *args):
+        return self
+
+    def sort(self, *args):
+        return self
+
+    def extra(self, **kwargs):
+        search = _FakeSearch(self.award_ids, {**self.params, **kwargs})
+        search.requests = self.requests
+        return search
+
+    def handle_execute(self, retries):
+        self.requests.append(self.params)
+        after = self.params.get("search_after", [float("-inf")])[0]
+        page = [award_id for award_id in self.award_ids if award_id > after][: self.params["size"]]
+        return MagicMock(to_dict=MagicMock(return_value={"hits": {"hits": [{"sort": [i]} for i in page]}}))
+
+
+def test_search_after_generator_pages_through_ids(settings):
+    settings.MAX_DOWNLOAD_LIMIT = 100
+    search = _FakeSearch(list(range(1, 26)))
+
+    chunks = list(AwardsElasticsearchDownload._get_download_ids_search_after_generator(search, 10))
+
+    assert chunks == [list(range(1, 11)), list(range(11, 21)), list(range(21, 26))]
+    assert [request.get("search_after") for request in search.requests] == [None, [10], [20]]
+
+
+def test_search_after_generator_stops_at_download_limit(settings):
+    settings.MAX_DOWNLOAD_LIMIT = 15
+    search = _FakeSearch(list(range(1, 26)))
+
+    chunks = list(AwardsElasticsearchDownload._get_download_ids_search_after_generator(search, 10))
+
+    assert chunks == [list(range(1, 11)), list(range(11, 16))]
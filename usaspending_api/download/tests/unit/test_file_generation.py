@@ -1,3 +1,8 @@
+import os
+import pytest
+import subprocess
+
+from threading import Barrier, Event, Timer
 from unittest.mock import MagicMock
 
 from usaspending_api.awards.v2.lookups.lookups import award_type_mapping, contract_type_mapping, idv_type_mapping
@@ -144,3 +149,69 @@ def test_idv_treasury_account_funding_csv_sources():
     VALUE_MAPPINGS["idv_federal_account_funding"]["filter_function"] = original
     assert csv_sources[0].file_type == "treasury_account"
     assert csv_sources[0].source_type == "idv_federal_account_funding"
+
+
+def test_generate_source_files_exports_sources_concurrently(settings, monkeypatch):
+    settings.DOWNLOAD_SOURCE_CONCURRENCY = 2
+    both_sources_running = Barrier(2, timeout=5)
+    exported = []
+
+    def mock_parse_source(source, *args):
+        both_sources_running.wait()  # times out unless both sources are exported at the same time
+        exported.append(source.file_type)
+
+    monkeypatch.setattr(download_generation, "parse_source", mock_parse_source)
+    download_job = MagicMock(number_of_columns=0)
+    sources = [MagicMock(file_type=file_type, columns=MagicMock(return_value=["a", "b"])) for file_type in ("d1", "d2")]
+
+    download_generation.generate_source_files(sources, None, download_job, None, None, None, None, None, "csv")
+
+    assert sorted(exported) == ["d1", "d2"]
+    assert download_job.number_of_columns == 4
+
+
+def test_generate_source_files_stops_other_exports_when_one_fails(settings, monkeypatch):
+    settings.DOWNLOAD_SOURCE_CONCURRENCY = 2
+    d2_running = Event()
+    d2_stopped = Event()
+
+    def mock_parse_source(source, *args):
+        exports = args[-1]
+        if source.file_type == "d1":
+            d2_running.wait(timeout=5)
+            raise ValueError("d1 failed")
+        with exports.stoppable(d2_stopped.set):
+            d2_running.set()
+            assert d2_stopped.wait(timeout=5)
+
+    monkeypatch.setattr(download_generation, "parse_source", mock_parse_source)
+    download_job = MagicMock(number_of_columns=0)
+    sources = [MagicMock(file_type=file_type, columns=MagicMock(return_value=["a", "b"])) for file_type in ("d1", "d2")]
+
+    with pytest.raises(ValueError, match="d1 failed"):
+        download_generation.generate_source_files(sources, None, download_job, None, None, None, None, None, "csv")
+
+    assert d2_stopped.is_set()
+
+
+def test_stopping_source_exports_terminates_their_processes():
+    exports = download_generation._SourceExports()
+    timer = Timer(0.5, exports.stop)
+    timer.start()
+
+    with pytest.raises(download_generation.SourceExportStopped):
+        exports.check_output(["sleep", "30"], timeout=10)
+    timer.join()
+
+
+def test_source_export_slots_of_dead_processes_are_reclaimed():
+    dead_process = subprocess.Popen(["true"])
+    dead_process.wait()
+    slots = download_generation._SourceExportSlots(1)
+
+    assert slots.try_acquire() == 0
+    assert slots.try_acquire() is None
+
+    slots._owners[0] = dead_process.pid
+    assert slots.try_acquire() == 0
+    assert slots._owners[0] == os.getpid()
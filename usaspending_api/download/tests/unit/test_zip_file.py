@@ -1,8 +1,10 @@
 import os
+import pytest
 import zipfile
 
 from tempfile import NamedTemporaryFile
-from usaspending_api.download.filestreaming.zip_file import append_files_to_zip_file
+from usaspending_api.download.filestreaming import zip_file as zip_file_module
+from usaspending_api.download.filestreaming.zip_file import append_files_to_zip_file, StreamingZipWriter
 
 
 def test_append_files_to_zip_file():
@@ -20,3 +22,63 @@ def test_append_files_to_zip_file():
                         os.path.basename(include_file_1.name),
                         os.path.basename(include_file_2.name),
                     ]
+
+
+def test_append_files_to_zip_file_in_parallel(tmp_path, monkeypatch):
+    # Small chunks, so that files are compressed in several independent pieces
+    monkeypatch.setattr(zip_file_module, "PARALLEL_COMPRESSION_CHUNK_SIZE", 100)
+    contents = {
+        "empty.csv": b"",
+        "small.csv": b"a,b\n1,2\n",
+        "large.csv": b"".join(b"%d,row\n" % i for i in range(500)),
+    }
+    for file_name, content in contents.items():
+        (tmp_path / file_name).write_bytes(content)
+    zip_path = str(tmp_path / "test.zip")
+
+    append_files_to_zip_file([str(tmp_path / "small.csv")], zip_path)
+    append_files_to_zip_file(
+        [str(tmp_path / "large.csv"), str(tmp_path / "empty.csv")], zip_path, compresslevel=1, processes=2
+    )
+
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        assert zf.testzip() is None
+        assert [z.filename for z in zf.filelist] == ["small.csv", "large.csv", "empty.csv"]
+        assert {file_name: zf.read(file_name) for file_name in contents} == contents
+
+
+def test_append_files_to_zip_file_in_parallel_unsupported_python(tmp_path, monkeypatch):
+    monkeypatch.setattr(zip_file_module, "PARALLEL_COMPRESSION_PYTHON_VERSIONS", ((2, 6), (2, 7)))
+    monkeypatch.setattr(zip_file_module, "_write_files_compressed_in_parallel", None)
+    (tmp_path / "large.csv").write_bytes(b"".join(b"%d,row\n" % i for i in range(500)))
+    zip_path = str(tmp_path / "test.zip")
+
+    append_files_to_zip_file([str(tmp_path / "large.csv")], zip_path, processes=2)
+
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        assert zf.testzip() is None
+        assert zf.read("large.csv") == (tmp_path / "large.csv").read_bytes()
+
+
+def test_streaming_zip_writer(tmp_path):
+    file_paths = []
+    for i in range(3):
+        file_paths.append(str(tmp_path / f"part_{i}.csv"))
+        with open(file_paths[-1], "w") as f:
+            f.write(f"part {i}")
+
+    zip_writer = StreamingZipWriter(str(tmp_path / "test.zip"))
+    for file_path in file_paths:
+        zip_writer.submit(file_path)
+    zip_writer.close()
+
+    with zipfile.ZipFile(str(tmp_path / "test.zip"), "r") as zf:
+        assert [z.filename for z in zf.filelist] == ["part_0.csv", "part_1.csv", "part_2.csv"]
+        assert zf.read("part_2.csv") == b"part 2"
+
+
+def test_streaming_zip_writer_raises_on_close(tmp_path):
+    zip_writer = StreamingZipWriter(str(tmp_path / "test.zip"))
+    zip_writer.submit(str(tmp_path / "missing.csv"))
+    with pytest.raises(FileNotFoundError):
+        zip_writer.close()
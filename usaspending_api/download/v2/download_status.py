@@ -2,6 +2,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from usaspending_api.common.exceptions import InvalidParameterException
+from usaspending_api.download.helpers.download_deduplication import get_deduplication_stats
 from usaspending_api.download.v2.base_download_viewset import get_download_job, get_file_path
 
 
@@ -44,6 +45,7 @@ class DownloadStatusViewSet(APIView):
             "total_columns": download_job.number_of_columns,
             "total_rows": download_job.number_of_rows,
             "seconds_elapsed": download_job.seconds_elapsed(),
+            "deduplication": get_deduplication_stats(download_job),
         }
 
         return Response(response)
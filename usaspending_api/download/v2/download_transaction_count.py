@@ -34,15 +34,7 @@ class DownloadTransactionCountViewSet(APIView):
         # If no filters in request return empty object to return all transactions
         filters = json_request.get("filters", {})
 
-        if json_request["subawards"]:
-            total_count = subaward_filter(filters).count()
-        else:
-            filter_query = QueryWithFilters.generate_transactions_elasticsearch_query(filters)
-            search = TransactionSearch().filter(filter_query)
-            total_count = search.handle_count()
-
-        if total_count is None:
-            total_count = 0
+        total_count = get_download_transaction_count(filters, json_request["subawards"])
 
         result = {
             "calculated_transaction_count": total_count,
@@ -54,3 +46,15 @@ class DownloadTransactionCountViewSet(APIView):
         }
 
         return Response(result)
+
+
+def get_download_transaction_count(filters: dict, subawards: bool = False) -> int:
+    """Number of transactions (or subawards) that a download with the given filters would include"""
+    if subawards:
+        total_count = subaward_filter(filters).count()
+    else:
+        filter_query = QueryWithFilters.generate_transactions_elasticsearch_query(filters)
+        search = TransactionSearch().filter(filter_query)
+        total_count = search.handle_count()
+
+    return total_count or 0
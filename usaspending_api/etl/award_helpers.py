@@ -1,6 +1,31 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
 from typing import Optional
 
-from django.db import connection
+logger = logging.getLogger("script")
+
+# Temporary table holding the distinct award ids of the change log batch being recalculated
+AWARD_ROLLUP_BATCH_TABLE = "temp_award_rollup_batch"
+
+# The batch table is dropped first, in case the batches are recalculated within an outer transaction
+claim_award_rollup_batch_sql_string = f"""
+DROP TABLE IF EXISTS {AWARD_ROLLUP_BATCH_TABLE};
+CREATE TEMPORARY TABLE {AWARD_ROLLUP_BATCH_TABLE} (award_id BIGINT PRIMARY KEY) ON COMMIT DROP;
+WITH
+claimed AS (
+  DELETE FROM award_rollup_change_log
+  WHERE id IN (SELECT id FROM award_rollup_change_log ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED)
+  RETURNING award_id
+),
+batch AS (
+  INSERT INTO {AWARD_ROLLUP_BATCH_TABLE} SELECT DISTINCT award_id FROM claimed
+  RETURNING award_id
+)
+SELECT (SELECT COUNT(*) FROM claimed), (SELECT COUNT(*) FROM batch);
+"""
 
 general_award_update_sql_string = """
 WITH
@@ -293,10 +318,18 @@ def convert_award_id_to_guai(award_tuple: tuple) -> tuple:
         return tuple([row[0] for row in cursor.fetchall()])
 
 
-def update_awards(award_tuple: Optional[tuple] = None) -> int:
+def _award_id_table_predicate(award_id_table: str, column: str = "tn.award_id") -> str:
+    """Join to a table of award ids, rather than listing them all in the statement"""
+    return f"WHERE {column} IN (SELECT award_id FROM {award_id_table})"
+
+
+def update_awards(award_tuple: Optional[tuple] = None, award_id_table: Optional[str] = None) -> int:
     """Update Award records using transaction data"""
 
-    if award_tuple:
+    if award_id_table:
+        values = None
+        predicate = _award_id_table_predicate(award_id_table)
+    elif award_tuple:
         values = [award_tuple, award_tuple, award_tuple]
         predicate = "WHERE tn.award_id IN %s"
     else:
@@ -306,14 +339,20 @@ def update_awards(award_tuple: Optional[tuple] = None) -> int:
     return execute_database_statement(general_award_update_sql_string.format(predicate=predicate), values)
 
 
-def prune_empty_awards(award_tuple: Optional[tuple] = None) -> int:
+def prune_empty_awards(award_tuple: Optional[tuple] = None, award_id_table: Optional[str] = None) -> int:
+    if award_id_table:
+        award_filter = f"AND a.id IN (SELECT award_id FROM {award_id_table})"
+        award_tuple = None
+    else:
+        award_filter = "AND a.id IN %s" if award_tuple else ""
+
     _find_empty_awards_sql = """
         SELECT a.id
         FROM awards a
         LEFT JOIN transaction_normalized tn ON tn.award_id = a.id
         WHERE tn IS NULL {}
     """.format(
-        "AND a.id IN %s" if award_tuple else ""
+        award_filter
     )
 
     _modify_subawards_sql = "UPDATE subaward SET award_id = null WHERE award_id IN ({});".format(_find_empty_awards_sql)
@@ -334,13 +373,16 @@ def prune_empty_awards(award_tuple: Optional[tuple] = None) -> int:
 
     return execute_database_statement(
         _modify_subawards_sql + _modify_financial_accounts_sql + _delete_parent_award_sql + _prune_empty_awards_sql,
-        [award_tuple, award_tuple, award_tuple, award_tuple],
+        [award_tuple, award_tuple, award_tuple, award_tuple] if award_tuple else None,
     )
 
 
-def update_assistance_awards(award_tuple: Optional[tuple] = None) -> int:
+def update_assistance_awards(award_tuple: Optional[tuple] = None, award_id_table: Optional[str] = None) -> int:
     """Update assistance-specific award data based on the info in child transactions."""
-    if award_tuple:
+    if award_id_table:
+        values = None
+        predicate = _award_id_table_predicate(award_id_table)
+    elif award_tuple:
         values = [award_tuple]
         predicate = "WHERE tn.award_id IN %s"
     else:
@@ -350,9 +392,12 @@ def update_assistance_awards(award_tuple: Optional[tuple] = None) -> int:
     return execute_database_statement(fabs_award_update_sql_string.format(predicate=predicate), values)
 
 
-def update_procurement_awards(award_tuple: Optional[tuple] = None) -> int:
+def update_procurement_awards(award_tuple: Optional[tuple] = None, award_id_table: Optional[str] = None) -> int:
     """Update procurement-specific award data based on the info in child transactions."""
-    if award_tuple:
+    if award_id_table:
+        values = None
+        predicate = _award_id_table_predicate(award_id_table)
+    elif award_tuple:
         values = [award_tuple, award_tuple, award_tuple]
         predicate = "WHERE tn.award_id IN %s"
     else:
@@ -373,3 +418,46 @@ def update_award_subawards(award_tuple: Optional[tuple] = None) -> int:
         predicate = ""
 
     return execute_database_statement(subaward_award_update_sql_string.format(predicate=predicate), values)
+
+
+def update_awards_from_change_log(batch_size: Optional[int] = None) -> int:
+    """
+    Drain award_rollup_change_log, recalculating the awards appended to it by loaders. Each batch of at most
+    batch_size entries is claimed, deduplicated into a temporary table, and recalculated in its own transaction by
+    joining to that table. Batches are claimed with SKIP LOCKED, so more than one process can drain the log at once.
+    Awards left without any transactions, e.g. by deletes, are removed whichever loader appended them.
+
+    Returns the number of awards recalculated
+    """
+    batch_size = batch_size or settings.AWARD_ROLLUP_BATCH_SIZE
+    total_entries = total_awards = batch_count = 0
+    start = time.perf_counter()
+    while True:
+        batch_start = time.perf_counter()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(claim_award_rollup_batch_sql_string, [batch_size])
+                entry_count, award_count = cursor.fetchone()
+                if not entry_count:
+                    break
+                cursor.execute(f"ANALYZE {AWARD_ROLLUP_BATCH_TABLE}")
+
+            pruned_count = prune_empty_awards(award_id_table=AWARD_ROLLUP_BATCH_TABLE)
+            updated_count = update_awards(award_id_table=AWARD_ROLLUP_BATCH_TABLE)
+            procurement_count = update_procurement_awards(award_id_table=AWARD_ROLLUP_BATCH_TABLE)
+            assistance_count = update_assistance_awards(award_id_table=AWARD_ROLLUP_BATCH_TABLE)
+
+        batch_count += 1
+        total_entries += entry_count
+        total_awards += award_count
+        logger.info(
+            f"Award rollup batch {batch_count:,}: {entry_count:,} change log entries for {award_count:,} awards "
+            f"({pruned_count:,} pruned, {updated_count:,} updated, {procurement_count:,} procurement and "
+            f"{assistance_count:,} assistance updated) in {time.perf_counter() - batch_start:.2f}s"
+        )
+
+    logger.info(
+        f"Drained {total_entries:,} change log entries for {total_awards:,} awards in {batch_count:,} batches "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return total_awards
@@ -1,3 +1,10 @@
+from usaspending_api.etl.elasticsearch_loader_helpers.checkpoint_ledger import (
+    checkpoint_file_path,
+    completed_partition_keys,
+    read_partition_states,
+    record_partition_state,
+    record_pending_partitions,
+)
 from usaspending_api.etl.elasticsearch_loader_helpers.delete_data import (
     delete_docs_by_unique_key,
     delete_awards,
@@ -5,8 +12,11 @@ from usaspending_api.etl.elasticsearch_loader_helpers.delete_data import (
 )
 from usaspending_api.etl.elasticsearch_loader_helpers.extract_data import (
     count_of_records_to_process,
+    count_records_per_even_partition,
     extract_records,
+    extract_records_in_batches,
     obtain_extract_sql,
+    sample_partition_bounds,
 )
 from usaspending_api.etl.elasticsearch_loader_helpers.index_config import (
     create_award_type_aliases,
@@ -17,7 +27,7 @@ from usaspending_api.etl.elasticsearch_loader_helpers.index_config import (
     toggle_refresh_on,
     check_new_index_name_is_ok,
 )
-from usaspending_api.etl.elasticsearch_loader_helpers.load_data import load_data
+from usaspending_api.etl.elasticsearch_loader_helpers.load_data import load_data, load_data_in_batches
 from usaspending_api.etl.elasticsearch_loader_helpers.transform_data import (
     transform_award_data,
     transform_covid19_faba_data,
@@ -28,14 +38,19 @@ from usaspending_api.etl.elasticsearch_loader_helpers.utilities import (
     execute_sql_statement,
     format_log,
     gen_random_name,
+    PipelineStats,
+    stream_sql_statement,
     TaskSpec,
 )
 from usaspending_api.etl.elasticsearch_loader_helpers.controller import Controller
 
 __all__ = [
+    "checkpoint_file_path",
     "chunks",
+    "completed_partition_keys",
     "Controller",
     "count_of_records_to_process",
+    "count_records_per_even_partition",
     "create_award_type_aliases",
     "create_index",
     "delete_docs_by_unique_key",
@@ -43,11 +58,19 @@ __all__ = [
     "delete_transactions",
     "execute_sql_statement",
     "extract_records",
+    "extract_records_in_batches",
     "format_log",
     "gen_random_name",
     "load_data",
+    "load_data_in_batches",
     "obtain_extract_sql",
+    "PipelineStats",
+    "read_partition_states",
+    "record_partition_state",
+    "record_pending_partitions",
+    "sample_partition_bounds",
     "set_final_index_config",
+    "stream_sql_statement",
     "swap_aliases",
     "take_snapshot",
     "TaskSpec",
@@ -1,7 +1,8 @@
 import json
 import logging
 
-from typing import Optional, List
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
 
 logger = logging.getLogger("script")
@@ -179,3 +180,150 @@ def _country_agg_key(location_type, record: dict) -> Optional[str]:
             "country_name": record[f"{location_type}_country_name"],
         }
     )
+
+
+# Columnar variants of the functions above, used by the columnar transform. Each takes a batch of records as a
+# dict of column name -> list of values and returns the list of keys for the batch. Column names are resolved once
+# per batch rather than once per record, and they must produce exactly the same keys as their per-record versions.
+
+
+def _award_recipient_agg_keys(columns: Dict[str, list]) -> List[str]:
+    """Dictionary key order impacts Elasticsearch behavior!!!"""
+    return [
+        json.dumps({"name": name, "unique_id": unique_id, "hash": "", "levels": ""})
+        if recipient_hash is None or levels is None
+        else json.dumps({"name": name, "unique_id": unique_id, "hash": str(recipient_hash), "levels": levels})
+        for name, unique_id, recipient_hash, levels in zip(
+            columns["recipient_name"],
+            columns["recipient_unique_id"],
+            columns["recipient_hash"],
+            columns["recipient_levels"],
+        )
+    ]
+
+
+def _transaction_recipient_agg_keys(columns: Dict[str, list]) -> List[str]:
+    """Dictionary key order impacts Elasticsearch behavior!!!"""
+    return [
+        json.dumps({"name": name, "unique_id": unique_id, "hash_with_level": ""})
+        if recipient_hash is None or levels is None
+        else json.dumps(
+            {
+                "name": name,
+                "unique_id": unique_id,
+                "hash_with_level": f"{recipient_hash}-{_return_one_level(levels)}",
+            }
+        )
+        for name, unique_id, recipient_hash, levels in zip(
+            columns["recipient_name"],
+            columns["recipient_unique_id"],
+            columns["recipient_hash"],
+            columns["recipient_levels"],
+        )
+    ]
+
+
+def _json_agg_keys(
+    columns: Dict[str, list], required_columns: List[str], fields: List[Tuple[str, str]]
+) -> List[Optional[str]]:
+    """
+    JSON encode the (key, column name) fields of each record in order, or None for records where any of the
+    required columns is None. Dictionary key order impacts Elasticsearch behavior!!!
+
+    These keys have far fewer distinct values than a batch has records (agencies, locations, NAICS, PSC),
+    so each distinct combination of values is only encoded once per batch.
+    """
+    keys = [key for key, _ in fields]
+    missing = [value is None for value in columns[required_columns[0]]]
+    for column in required_columns[1:]:
+        missing = [is_missing or value is None for is_missing, value in zip(missing, columns[column])]
+
+    encoded = {}
+    agg_keys = []
+    for is_missing, row in zip(missing, zip(*(columns[column] for _, column in fields))):
+        if is_missing:
+            agg_keys.append(None)
+            continue
+        agg_key = encoded.get(row)
+        if agg_key is None:
+            agg_key = encoded[row] = json.dumps(dict(zip(keys, row)))
+        agg_keys.append(agg_key)
+    return agg_keys
+
+
+def _agency_agg_keys(agency_type: str, agency_tier: str, columns: Dict[str, list]) -> List[Optional[str]]:
+    prefix = f"{agency_type}_{agency_tier}_agency"
+    fields = [("name", f"{prefix}_name")]
+    if f"{prefix}_abbreviation" in columns:
+        fields.append(("abbreviation", f"{prefix}_abbreviation"))
+    if f"{prefix}_code" in columns:
+        fields.append(("code", f"{prefix}_code"))
+    fields.append(("id", f"{agency_type}_toptier_agency_id"))
+    return _json_agg_keys(columns, [f"{prefix}_name"], fields)
+
+
+def _naics_agg_keys(columns: Dict[str, list]) -> List[Optional[str]]:
+    return _json_agg_keys(columns, ["naics_code"], [("code", "naics_code"), ("description", "naics_description")])
+
+
+def _psc_agg_keys(columns: Dict[str, list]) -> List[Optional[str]]:
+    fields = [("code", "product_or_service_code"), ("description", "product_or_service_description")]
+    return _json_agg_keys(columns, ["product_or_service_code"], fields)
+
+
+def _county_agg_keys(location_type: str, columns: Dict[str, list]) -> List[Optional[str]]:
+    fields = [
+        ("country_code", f"{location_type}_country_code"),
+        ("state_code", f"{location_type}_state_code"),
+        ("state_fips", f"{location_type}_state_fips"),
+        ("county_code", f"{location_type}_county_code"),
+        ("county_name", f"{location_type}_county_name"),
+        ("population", f"{location_type}_county_population"),
+    ]
+    return _json_agg_keys(columns, [f"{location_type}_state_code", f"{location_type}_county_code"], fields)
+
+
+def _congressional_agg_keys(location_type: str, columns: Dict[str, list]) -> List[Optional[str]]:
+    fields = [
+        ("country_code", f"{location_type}_country_code"),
+        ("state_code", f"{location_type}_state_code"),
+        ("state_fips", f"{location_type}_state_fips"),
+        ("congressional_code", f"{location_type}_congressional_code"),
+        ("population", f"{location_type}_congressional_population"),
+    ]
+    return _json_agg_keys(columns, [f"{location_type}_state_code", f"{location_type}_congressional_code"], fields)
+
+
+def _state_agg_keys(location_type: str, columns: Dict[str, list]) -> List[Optional[str]]:
+    fields = [
+        ("country_code", f"{location_type}_country_code"),
+        ("state_code", f"{location_type}_state_code"),
+        ("state_name", f"{location_type}_state_name"),
+        ("population", f"{location_type}_state_population"),
+    ]
+    return _json_agg_keys(columns, [f"{location_type}_state_code"], fields)
+
+
+def _country_agg_keys(location_type: str, columns: Dict[str, list]) -> List[Optional[str]]:
+    fields = [("country_code", f"{location_type}_country_code"), ("country_name", f"{location_type}_country_name")]
+    return _json_agg_keys(columns, [f"{location_type}_country_code"], fields)
+
+
+COLUMNAR_AGG_KEY_FUNCTIONS = {
+    award_recipient_agg_key: _award_recipient_agg_keys,
+    transaction_recipient_agg_key: _transaction_recipient_agg_keys,
+    awarding_subtier_agency_agg_key: partial(_agency_agg_keys, "awarding", "subtier"),
+    awarding_toptier_agency_agg_key: partial(_agency_agg_keys, "awarding", "toptier"),
+    funding_subtier_agency_agg_key: partial(_agency_agg_keys, "funding", "subtier"),
+    funding_toptier_agency_agg_key: partial(_agency_agg_keys, "funding", "toptier"),
+    naics_agg_key: _naics_agg_keys,
+    psc_agg_key: _psc_agg_keys,
+    pop_county_agg_key: partial(_county_agg_keys, "pop"),
+    recipient_location_county_agg_key: partial(_county_agg_keys, "recipient_location"),
+    pop_congressional_agg_key: partial(_congressional_agg_keys, "pop"),
+    recipient_location_congressional_agg_key: partial(_congressional_agg_keys, "recipient_location"),
+    pop_state_agg_key: partial(_state_agg_keys, "pop"),
+    recipient_location_state_agg_key: partial(_state_agg_keys, "recipient_location"),
+    pop_country_agg_key: partial(_country_agg_keys, "pop"),
+    recipient_location_country_agg_key: partial(_country_agg_keys, "recipient_location"),
+}
@@ -0,0 +1,69 @@
+import json
+
+from datetime import datetime, timezone
+from django.conf import settings
+from filelock import FileLock
+from pathlib import Path
+from typing import Dict, List, Set
+
+from usaspending_api.etl.elasticsearch_loader_helpers.utilities import TaskSpec
+
+PARTITION_PENDING = "pending"
+PARTITION_RUNNING = "running"
+PARTITION_DONE = "done"
+PARTITION_FAILED = "failed"
+
+
+def checkpoint_file_path(index_name: str) -> str:
+    return str(Path(settings.ES_ETL_CHECKPOINT_DIR) / f"{index_name}.jsonl")
+
+
+def record_partition_state(task: TaskSpec, state: str, **details) -> None:
+    """Append the latest state of a task's partition to the checkpoint ledger of its index"""
+    if task.checkpoint_file:
+        _append_entries(task.checkpoint_file, [_ledger_entry(task, state, **details)])
+
+
+def record_pending_partitions(tasks: List[TaskSpec]) -> None:
+    """Record all of the given tasks' partitions as pending, in a single write"""
+    if tasks and tasks[0].checkpoint_file:
+        _append_entries(tasks[0].checkpoint_file, [_ledger_entry(task, PARTITION_PENDING) for task in tasks])
+
+
+def _ledger_entry(task: TaskSpec, state: str, **details) -> dict:
+    return {
+        "key": task.checkpoint_key,
+        "partition_number": task.partition_number,
+        "state": state,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        **details,
+    }
+
+
+def _append_entries(checkpoint_file: str, entries: List[dict]) -> None:
+    """
+    The ledger is an append-only JSON-lines file, so each update is a single small write no matter how many
+    partitions the run has. A file lock keeps the writes of the pool's processes from interleaving.
+    """
+    Path(checkpoint_file).parent.mkdir(parents=True, exist_ok=True)
+    with FileLock(checkpoint_file + ".lock"):
+        with open(checkpoint_file, "a") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+
+
+def read_partition_states(checkpoint_file: str) -> Dict[str, dict]:
+    """Fold the checkpoint ledger into the latest entry recorded for each partition key"""
+    states = {}
+    if not Path(checkpoint_file).exists():
+        return states
+    with FileLock(checkpoint_file + ".lock"):
+        with open(checkpoint_file) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    states[entry["key"]] = entry
+    return states
+
+
+def completed_partition_keys(checkpoint_file: str) -> Set[str]:
+    return {key for key, entry in read_partition_states(checkpoint_file).items() if entry["state"] == PARTITION_DONE}
@@ -1,35 +1,59 @@
 import logging
 
+from dataclasses import fields
 from django.core.management import call_command
+from elasticsearch import Elasticsearch
 from math import ceil
 from multiprocessing import Pool, Event, Value
+from queue import Empty, Full, Queue
+from threading import Event as ThreadEvent, Thread
 from time import perf_counter
-from typing import Generator, List, Tuple
+from typing import Generator, List, Optional, Tuple
 
 from usaspending_api.broker.helpers.last_load_date import get_earliest_load_date, update_last_load_date
 from usaspending_api.common.elasticsearch.client import instantiate_elasticsearch_client
 from usaspending_api.etl.elasticsearch_loader_helpers import (
+    checkpoint_file_path,
+    completed_partition_keys,
     count_of_records_to_process,
+    count_records_per_even_partition,
     create_index,
     delete_awards,
     delete_transactions,
     extract_records,
+    extract_records_in_batches,
     format_log,
     gen_random_name,
     load_data,
+    load_data_in_batches,
     obtain_extract_sql,
+    PipelineStats,
+    record_partition_state,
+    record_pending_partitions,
+    sample_partition_bounds,
     set_final_index_config,
     swap_aliases,
     TaskSpec,
     toggle_refresh_on,
 )
 from usaspending_api.common.helpers.sql_helpers import close_all_django_db_conns
+from usaspending_api.etl.elasticsearch_loader_helpers.checkpoint_ledger import (
+    PARTITION_DONE,
+    PARTITION_FAILED,
+    PARTITION_RUNNING,
+)
 
 logger = logging.getLogger("script")
 
 total_doc_success = Value("i", 0, lock=True)
 total_doc_fail = Value("i", 0, lock=True)
 
+# Totals of the stats of pipelined tasks, summed (or max'd) across all processes
+total_pipeline_stats = {f.name: Value("d" if f.type is float else "i", 0, lock=True) for f in fields(PipelineStats)}
+
+# Marks the end of the batches put on a pipelined task's queue
+_END_OF_BATCHES = None
+
 
 def init_shared_abort(a: Event) -> None:
     """
@@ -46,8 +70,23 @@ class Controller:
     def __init__(self, config):
         self.config = config
         self.tasks = []
+        self.partition_bounds = []  # (lower_bound, upper_bound, record_count) of partitions sized by ID density
 
     def prepare_for_etl(self) -> None:
+        self.plan_partitions()
+        if self.record_count == 0:
+            return
+
+        if self.config.get("resume"):
+            self.skip_completed_partitions()
+        record_pending_partitions(self.tasks)
+
+        if self.config["create_new_index"]:
+            # ensure template for index is present and the latest version
+            call_command("es_configure", "--template-only", f"--load-type={self.config['data_type']}")
+            create_index(self.config["index_name"], instantiate_elasticsearch_client())
+
+    def plan_partitions(self) -> None:
         logger.info(format_log("Assessing data to process"))
         self.record_count, self.min_id, self.max_id = count_of_records_to_process(self.config)
 
@@ -68,10 +107,41 @@ class Controller:
             )
         )
 
-        if self.config["create_new_index"]:
-            # ensure template for index is present and the latest version
-            call_command("es_configure", "--template-only", f"--load-type={self.config['data_type']}")
-            create_index(self.config["index_name"], instantiate_elasticsearch_client())
+    def skip_completed_partitions(self) -> None:
+        """Drop the tasks whose partitions were completed by a previous run against the same index"""
+        completed_keys = completed_partition_keys(checkpoint_file_path(self.config["index_name"]))
+        remaining_tasks = [task for task in self.tasks if task.checkpoint_key not in completed_keys]
+        msg = (
+            f"Resuming load into '{self.config['index_name']}': skipping {len(self.tasks) - len(remaining_tasks):,}"
+            f" completed partitions, {len(remaining_tasks):,} left to process"
+        )
+        logger.info(format_log(msg))
+        self.tasks = remaining_tasks
+        self.config["processes"] = max(min(self.config["processes"], len(self.tasks)), 1)
+
+    def log_partition_plan(self) -> None:
+        """Log the ID range and record count of each planned partition, without processing any of them"""
+        if self.record_count == 0:
+            logger.info(format_log("No records to process", action="Dry Run"))
+            return
+
+        if self.partition_bounds:
+            sizes = [count for _, _, count in self.partition_bounds]
+        else:
+            sizes = count_records_per_even_partition(self.config, self.config["partitions"], self.min_id)
+
+        for partition_number, size in enumerate(sizes):
+            lower_bound, upper_bound = self.get_id_range_for_partition(partition_number)
+            msg = f"Partition #{partition_number}: IDs {lower_bound} to {upper_bound} | {size:,} records"
+            logger.info(format_log(msg, action="Dry Run"))
+
+        sorted_sizes = sorted(sizes)
+        msg = (
+            f"{len(sizes):,} partitions using the '{self.config.get('partition_strategy', 'even')}' strategy"
+            f" | min: {sorted_sizes[0]:,} | median: {sorted_sizes[len(sizes) // 2]:,} | max: {sorted_sizes[-1]:,}"
+            f" | empty: {sorted_sizes.count(0):,}"
+        )
+        logger.info(format_log(msg, action="Dry Run"))
 
     def dispatch_tasks(self) -> None:
         _abort = Event()  # Event which when set signals an error occurred in a subprocess
@@ -82,6 +152,11 @@ class Controller:
         msg = f"Total documents indexed: {total_doc_success.value}, total document fails: {total_doc_fail.value}"
         logger.info(format_log(msg))
 
+        if self.config.get("pipelined"):
+            totals = PipelineStats(**{name: total.value for name, total in total_pipeline_stats.items()})
+            msg = f"Totals across processes: {totals}"
+            logger.info(format_log(msg, action="Pipeline"))
+
         if _abort.is_set():
             raise RuntimeError("One or more partitions failed!")
 
@@ -105,12 +180,27 @@ class Controller:
             update_last_load_date(f"{self.config['stored_date_key']}", self.config["processing_start_datetime"])
 
     def determine_partitions(self) -> int:
+        """Determine the number of partitions to create, using the configured partition strategy"""
+        if self.config.get("partition_strategy") == "density":
+            return self.determine_density_partitions()
+        return self.determine_even_partitions()
+
+    def determine_even_partitions(self) -> int:
         """Simple strategy of partitions that cover the id-range in an even distribution"""
         id_range_item_count = self.max_id - self.min_id + 1  # total number or records if all IDs exist in DB
         if self.config["partition_size"] > id_range_item_count:
             return 1
         return ceil(id_range_item_count / self.config["partition_size"])
 
+    def determine_density_partitions(self) -> int:
+        """
+        Strategy of partitions holding roughly equal numbers of records, based on the actual distribution of IDs.
+        Unlike an even split of the id-range, sparse ranges won't yield many near-empty partitions and a few huge ones
+        """
+        partitions = ceil(self.record_count / self.config["partition_size"])
+        self.partition_bounds = sample_partition_bounds(self.config, partitions, self.min_id, self.max_id)
+        return len(self.partition_bounds)
+
     def construct_tasks(self) -> List[TaskSpec]:
         """Create the Task objects w/ the appropriate configuration"""
         name_gen = gen_random_name()
@@ -121,8 +211,17 @@ class Controller:
 
         return task_list
 
+    @property
+    def checkpoint_file(self) -> Optional[str]:
+        """Only new indexes have a unique name to key a checkpoint ledger by. Incremental loads use an alias"""
+        return checkpoint_file_path(self.config["index_name"]) if self.config.get("create_new_index") else None
+
     def configure_task(self, partition_number: int, name_gen: Generator, is_null_partition: bool = False) -> TaskSpec:
-        lower_bound, upper_bound = self.get_id_range_for_partition(partition_number)
+        if is_null_partition:
+            # Extracts the records without an ID rather than a range of them, so it has no place among the bounds
+            lower_bound, upper_bound = None, None
+        else:
+            lower_bound, upper_bound = self.get_id_range_for_partition(partition_number)
         sql_config = {**self.config, **{"lower_bound": lower_bound, "upper_bound": upper_bound}}
         sql_str = obtain_extract_sql(sql_config, is_null_partition)
 
@@ -139,9 +238,21 @@ class Controller:
             sql=sql_str,
             transform_func=self.config["data_transform_func"],
             view=self.config["sql_view"],
+            is_streaming=self.config.get("streaming", False),
+            stream_sql_func=self.config.get("stream_sql_func"),
+            stream_batch_size=self.config.get("stream_batch_size", 10000),
+            max_rss_bytes=self.config["max_rss_mb"] * 1024 ** 2 if self.config.get("max_rss_mb") else None,
+            is_pipelined=self.config.get("pipelined", False),
+            queue_size=self.config.get("queue_size", 4),
+            checkpoint_file=self.checkpoint_file,
+            checkpoint_key="null" if is_null_partition else f"{lower_bound}-{upper_bound}",
+            is_columnar_transform=self.config.get("columnar_transform", False),
         )
 
     def get_id_range_for_partition(self, partition_number: int) -> Tuple[int, int]:
+        if self.partition_bounds:
+            lower_bound, upper_bound, _ = self.partition_bounds[partition_number]
+            return lower_bound, upper_bound
         partition_size = self.config["partition_size"]
         lower_bound = self.min_id + (partition_number * partition_size)
         upper_bound = min(lower_bound + partition_size - 1, self.max_id)
@@ -170,24 +281,34 @@ def extract_transform_load(task: TaskSpec) -> None:
     start = perf_counter()
     msg = f"Started processing on partition #{task.partition_number}: {task.name}"
     logger.info(format_log(msg, name=task.name))
+    record_partition_state(task, PARTITION_RUNNING, name=task.name)
 
     client = instantiate_elasticsearch_client()
     try:
-        records = task.transform_func(task, extract_records(task))
-        if abort.is_set():
-            f"Prematurely ending partition #{task.partition_number} due to error in another process"
-            logger.warning(format_log(msg, name=task.name))
-            return
-        if len(records) > 0:
-            success, fail = load_data(task, records, client)
+        if task.is_pipelined:
+            success, fail = pipelined_transform_load(task, client)
+        elif task.is_streaming:
+            success, fail = stream_transform_load(task, client)
         else:
-            logger.info(format_log("No records to index", name=task.name))
-            success, fail = 0, 0
+            records = task.transform_func(task, extract_records(task))
+            if abort.is_set():
+                msg = f"Prematurely ending partition #{task.partition_number} due to error in another process"
+                logger.warning(format_log(msg, name=task.name))
+                return
+            if len(records) > 0:
+                success, fail = load_data(task, records, client)
+            else:
+                logger.info(format_log("No records to index", name=task.name))
+                success, fail = 0, 0
         with total_doc_success.get_lock():
             total_doc_success.value += success
         with total_doc_fail.get_lock():
             total_doc_fail.value += fail
+        if abort.is_set():
+            # The streaming modes may have ended this partition part-way through, so don't checkpoint it as done
+            return
     except Exception:
+        record_partition_state(task, PARTITION_FAILED, name=task.name, seconds=round(perf_counter() - start, 2))
         if abort.is_set():
             msg = f"Partition #{task.partition_number} failed after an error was previously encountered"
             logger.warning(format_log(msg, name=task.name))
@@ -195,5 +316,107 @@ def extract_transform_load(task: TaskSpec) -> None:
             logger.exception(format_log(f"{task.name} failed!", name=task.name))
             abort.set()
     else:
-        msg = f"Partition #{task.partition_number} was successfully processed in {perf_counter() - start:.2f}s"
-        logger.info(format_log(msg, name=task.name))
+        duration = perf_counter() - start
+        # A partition with documents that failed to index is left for --resume to load again
+        state = PARTITION_FAILED if fail else PARTITION_DONE
+        record_partition_state(task, state, name=task.name, seconds=round(duration, 2), success=success, fail=fail)
+        if fail:
+            msg = f"Partition #{task.partition_number} was processed in {duration:.2f}s with {fail:,} failed documents"
+            logger.warning(format_log(msg, name=task.name))
+        else:
+            msg = f"Partition #{task.partition_number} was successfully processed in {duration:.2f}s"
+            logger.info(format_log(msg, name=task.name))
+
+
+def stream_transform_load(task: TaskSpec, client: Elasticsearch) -> Tuple[int, int]:
+    """Transform each batch of records as it is streamed from the DB and feed it straight to the ES bulk helper"""
+
+    def _transformed_batches() -> Generator[List[dict], None, None]:
+        for batch in extract_records_in_batches(task):
+            if abort.is_set():
+                msg = f"Prematurely ending partition #{task.partition_number} due to error in another process"
+                logger.warning(format_log(msg, name=task.name))
+                return
+            yield task.transform_func(task, batch)
+
+    return load_data_in_batches(task, _transformed_batches(), client)
+
+
+def pipelined_transform_load(task: TaskSpec, client: Elasticsearch) -> Tuple[int, int]:
+    """
+    Overlap DB reads with ES bulk writes by extracting (and transforming) batches on a producer thread
+    while this thread indexes them, with the two connected by a bounded queue of task.queue_size batches
+    """
+    batch_queue = Queue(maxsize=task.queue_size)
+    stop = ThreadEvent()  # Set once indexing ends, so the producer does not block on a queue nobody reads
+    stats = PipelineStats()
+    producer_errors = []
+
+    def _put(item) -> None:
+        while not stop.is_set():
+            try:
+                batch_queue.put(item, timeout=1)
+                return
+            except Full:
+                continue
+
+    def _produce() -> None:
+        batches = extract_records_in_batches(task)
+        try:
+            while not stop.is_set():
+                stage_start = perf_counter()
+                batch = next(batches, _END_OF_BATCHES)
+                stats.extract_seconds += perf_counter() - stage_start
+                if batch is _END_OF_BATCHES:
+                    break
+                if abort.is_set():
+                    msg = f"Prematurely ending partition #{task.partition_number} due to error in another process"
+                    logger.warning(format_log(msg, name=task.name))
+                    break
+
+                stage_start = perf_counter()
+                batch = task.transform_func(task, batch)
+                stats.transform_seconds += perf_counter() - stage_start
+
+                stage_start = perf_counter()
+                _put(batch)
+                stats.producer_wait_seconds += perf_counter() - stage_start
+                stats.record_queue_depth(batch_queue.qsize())
+        except Exception as e:
+            producer_errors.append(e)
+        finally:
+            batches.close()
+            _put(_END_OF_BATCHES)
+
+    def _consume() -> Generator[List[dict], None, None]:
+        while True:
+            stage_start = perf_counter()
+            try:
+                batch = batch_queue.get(timeout=1)
+            except Empty:
+                continue
+            finally:
+                stats.consumer_wait_seconds += perf_counter() - stage_start
+            if batch is _END_OF_BATCHES:
+                return
+            yield batch
+
+    producer = Thread(target=_produce, name=f"{task.name} producer", daemon=True)
+    producer.start()
+    start = perf_counter()
+    try:
+        success, fail = load_data_in_batches(task, _consume(), client)
+    finally:
+        stop.set()
+        producer.join()
+    stats.index_seconds = perf_counter() - start - stats.consumer_wait_seconds
+
+    if producer_errors:
+        raise producer_errors[0]
+
+    logger.info(format_log(str(stats), name=task.name, action="Pipeline"))
+    for name, total in total_pipeline_stats.items():
+        with total.get_lock():
+            value = getattr(stats, name)
+            total.value = max(total.value, value) if name == "queue_depth_max" else total.value + value
+    return success, fail
@@ -1,7 +1,7 @@
 import logging
 
 from time import perf_counter
-from typing import List, Tuple
+from typing import Generator, List, Tuple
 
 from usaspending_api.etl.elasticsearch_loader_helpers.utilities import TaskSpec, format_log, execute_sql_statement
 
@@ -31,6 +31,28 @@ MIN_MAX_COUNT_SQL = """
     "\n", ""
 )
 
+PARTITION_BOUNDS_SQL = """
+    SELECT min(id) AS lower_bound, max(id) AS upper_bound, count(*) AS count
+    FROM (
+        SELECT "{primary_key}" AS id, ntile({partitions}) OVER (ORDER BY "{primary_key}") AS bucket
+        FROM "{sql_view}"
+        {optional_predicate} "{primary_key}" IS NOT NULL
+    ) AS ids
+    GROUP BY bucket
+    ORDER BY bucket
+""".replace(
+    "\n", ""
+)
+
+EVEN_PARTITION_COUNTS_SQL = """
+    SELECT ("{primary_key}" - {min_id}) / {partition_size} AS partition_number, count(*) AS count
+    FROM "{sql_view}"
+    {optional_predicate} "{primary_key}" IS NOT NULL
+    GROUP BY partition_number
+""".replace(
+    "\n", ""
+)
+
 
 def obtain_min_max_count_sql(config: dict) -> str:
     if "optional_predicate" not in config:
@@ -52,6 +74,15 @@ def obtain_extract_sql(config: dict, is_null_partition: bool = False) -> str:
     return sql.format(**config).format(**config)  # fugly. Allow string values to have expressions
 
 
+def obtain_partition_sizing_sql(sql: str, config: dict) -> str:
+    config = {**config}
+    if not config.get("optional_predicate"):
+        config["optional_predicate"] = "WHERE"
+    else:
+        config["optional_predicate"] += " AND "
+    return sql.format(**config).format(**config)  # fugly. Allow string values to have expressions
+
+
 def count_of_records_to_process(config: dict) -> Tuple[int, int, int]:
     start = perf_counter()
     results = execute_sql_statement(obtain_min_max_count_sql(config), True, config["verbose"])[0]
@@ -61,6 +92,42 @@ def count_of_records_to_process(config: dict) -> Tuple[int, int, int]:
     return count, min_id, max_id
 
 
+def sample_partition_bounds(config: dict, partitions: int, min_id: int, max_id: int) -> List[Tuple[int, int, int]]:
+    """
+    Use the actual distribution of IDs to split the ID range into (lower_bound, upper_bound, record_count)
+    partitions holding roughly equal numbers of records
+    """
+    start = perf_counter()
+    sql = obtain_partition_sizing_sql(PARTITION_BOUNDS_SQL, {**config, "partitions": partitions})
+    results = execute_sql_statement(sql, True, config["verbose"])
+
+    bounds = []
+    for row in results:
+        # Make the ranges contiguous and cover min_id to max_id, so no ID in the range can fall between partitions
+        lower_bound = bounds[-1][1] + 1 if bounds else min(min_id, row["lower_bound"])
+        if row["upper_bound"] < lower_bound:
+            # All IDs of this bucket share an ID with the end of the prior one (only when IDs are not unique)
+            bounds[-1] = (bounds[-1][0], bounds[-1][1], bounds[-1][2] + row["count"])
+            continue
+        bounds.append((lower_bound, row["upper_bound"], row["count"]))
+    if bounds:
+        bounds[-1] = (bounds[-1][0], max(max_id, bounds[-1][1]), bounds[-1][2])
+
+    msg = f"Sampled {len(bounds):,} partition ranges by ID density, took {perf_counter() - start:.2f}s"
+    logger.info(format_log(msg, action="Extract"))
+    return bounds
+
+
+def count_records_per_even_partition(config: dict, partitions: int, min_id: int) -> List[int]:
+    """Count the records falling in each partition of an even split of the ID range"""
+    sql = obtain_partition_sizing_sql(EVEN_PARTITION_COUNTS_SQL, {**config, "min_id": min_id})
+    counts = [0] * partitions
+    for row in execute_sql_statement(sql, True, config["verbose"]):
+        if row["partition_number"] < partitions:  # guard against IDs added since the range was counted
+            counts[row["partition_number"]] = row["count"]
+    return counts
+
+
 def extract_records(task: TaskSpec) -> List[dict]:
     start = perf_counter()
     logger.info(format_log(f"Extracting data from source", name=task.name, action="Extract"))
@@ -74,3 +141,21 @@ def extract_records(task: TaskSpec) -> List[dict]:
     msg = f"{len(records):,} records extracted in {perf_counter() - start:.2f}s"
     logger.info(format_log(msg, name=task.name, action="Extract"))
     return records
+
+
+def extract_records_in_batches(task: TaskSpec) -> Generator[List[dict], None, None]:
+    """Lazily extract the task's records from a server-side cursor, one batch at a time"""
+    start = perf_counter()
+    logger.info(format_log(f"Streaming data from source", name=task.name, action="Extract"))
+
+    count = 0
+    try:
+        for batch in task.stream_sql_func(task.sql, task.stream_batch_size, max_rss_bytes=task.max_rss_bytes):
+            count += len(batch)
+            yield batch
+    except Exception as e:
+        logger.exception(f"Failed on partition {task.name} with '{task.sql}'")
+        raise e
+
+    msg = f"{count:,} records streamed in {perf_counter() - start:.2f}s"
+    logger.info(format_log(msg, name=task.name, action="Extract"))
@@ -2,7 +2,7 @@ import logging
 
 from elasticsearch import Elasticsearch, helpers
 from time import perf_counter
-from typing import List, Tuple
+from typing import Generator, Iterable, List, Tuple
 
 from usaspending_api.etl.elasticsearch_loader_helpers.delete_data import delete_docs_by_unique_key
 from usaspending_api.etl.elasticsearch_loader_helpers.utilities import TaskSpec, format_log
@@ -40,6 +40,18 @@ def load_data(worker: TaskSpec, records: List[dict], client: Elasticsearch) -> T
     return success, failed
 
 
+def load_data_in_batches(
+    worker: TaskSpec, record_batches: Iterable[List[dict]], client: Elasticsearch
+) -> Tuple[int, int]:
+    start = perf_counter()
+    logger.info(format_log(f"Starting streaming Index operation", name=worker.name, action="Index"))
+    success, failed = streaming_post_batches_to_es(
+        client, record_batches, worker.index, worker.name, delete_before_index=worker.is_incremental
+    )
+    logger.info(format_log(f"Index operation took {perf_counter() - start:.2f}s", name=worker.name, action="Index"))
+    return success, failed
+
+
 def streaming_post_to_es(
     client: Elasticsearch,
     chunk: list,
@@ -71,22 +83,44 @@ def streaming_post_to_es(
 
     Returns: (succeeded, failed) tuple, which counts successful index doc writes vs. failed doc writes
     """
+    return streaming_post_batches_to_es(client, [chunk], index_name, job_name, delete_before_index, delete_key)
+
+
+def streaming_post_batches_to_es(
+    client: Elasticsearch,
+    batches: Iterable[List[dict]],
+    index_name: str,
+    job_name: str = None,
+    delete_before_index: bool = True,
+    delete_key: str = "_id",
+) -> Tuple[int, int]:
+    """
+    Pump data into an Elasticsearch index as each batch of documents is produced. The batches are consumed lazily
+    by a single bulk helper, so only the batch in flight is held in memory when given a generator.
+    See streaming_post_to_es(...) for details on the other arguments.
+
+    Returns: (succeeded, failed) tuple, which counts successful index doc writes vs. failed doc writes
+    """
+
+    def _actions() -> Generator[dict, None, None]:
+        for batch in batches:
+            if delete_before_index:
+                value_list = [doc[delete_key] for doc in batch]
+                delete_docs_by_unique_key(
+                    client,
+                    delete_key,
+                    value_list,
+                    job_name,
+                    index_name,
+                    refresh_after=False,
+                )
+            yield from batch
 
     success, failed = 0, 0
     try:
-        if delete_before_index:
-            value_list = [doc[delete_key] for doc in chunk]
-            delete_docs_by_unique_key(
-                client,
-                delete_key,
-                value_list,
-                job_name,
-                index_name,
-                refresh_after=False,
-            )
         for ok, item in helpers.streaming_bulk(
             client,
-            actions=chunk,
+            actions=_actions(),
             chunk_size=ES_BATCH_ENTRIES,
             max_chunk_bytes=ES_MAX_BATCH_BYTES,
             max_retries=10,
@@ -136,6 +136,9 @@ def transform_data(
     drop_fields: List[str],
     routing_field: Optional[str] = None,
 ) -> List[dict]:
+    if worker.is_columnar_transform:
+        return transform_data_columnar(worker, records, converters, agg_key_creations, drop_fields, routing_field)
+
     logger.info(format_log(f"Transforming data", name=worker.name, action="Transform"))
 
     start = perf_counter()
@@ -168,3 +171,59 @@ def transform_data(
     duration = perf_counter() - start
     logger.info(format_log(f"Transformation operation took {duration:.2f}s", name=worker.name, action="Transform"))
     return records
+
+
+def transform_data_columnar(
+    worker: TaskSpec,
+    records: List[dict],
+    converters: Dict[str, Callable],
+    agg_key_creations: Dict[str, Callable],
+    drop_fields: List[str],
+    routing_field: Optional[str] = None,
+) -> List[dict]:
+    """
+    Produces the same documents as the per-record path of transform_data(...), but computes each converter and
+    agg key over a whole column of the batch at a time. See transform_data(...) for details on the routing and _id.
+    """
+    logger.info(format_log(f"Transforming data by column", name=worker.name, action="Transform"))
+
+    start = perf_counter()
+    columns = _LazyColumns(records)
+
+    for field, converter in converters.items():
+        columns[field] = [converter(value) for value in columns[field]]
+    for key, transform_func in agg_key_creations.items():
+        columnar_func = funcs.COLUMNAR_AGG_KEY_FUNCTIONS.get(transform_func)
+        if columnar_func:
+            columns[key] = columnar_func(columns)
+        else:
+            columns[key] = [transform_func(record) for record in records]
+
+    for field in list(converters) + list(agg_key_creations):
+        for record, value in zip(records, columns[field]):
+            record[field] = value
+    for record in records:
+        if routing_field:
+            record["routing"] = record[routing_field]
+        record["_id"] = record[worker.field_for_es_id]
+        for key in drop_fields:
+            record.pop(key)
+
+    duration = perf_counter() - start
+    logger.info(format_log(f"Transformation operation took {duration:.2f}s", name=worker.name, action="Transform"))
+    return records
+
+
+class _LazyColumns(dict):
+    """Column name -> list of values in a batch of records, only pivoted out of the records when first used"""
+
+    def __init__(self, records: List[dict]):
+        super().__init__()
+        self.records = records
+
+    def __missing__(self, field: str) -> list:
+        column = self[field] = [record[field] for record in self.records]
+        return column
+
+    def __contains__(self, field: str) -> bool:
+        return super().__contains__(field) or (len(self.records) > 0 and field in self.records[0])
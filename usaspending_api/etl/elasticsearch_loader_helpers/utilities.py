@@ -1,5 +1,6 @@
 import json
 import logging
+import psutil as ps
 import psycopg2
 import re
 
@@ -9,11 +10,15 @@ from elasticsearch import Elasticsearch
 from pathlib import Path
 from random import choice
 from typing import Any, Generator, List, Optional
+from uuid import uuid4
 
 from usaspending_api.common.helpers.sql_helpers import get_database_dsn_string
 
 logger = logging.getLogger("script")
 
+# Smallest number of rows a streaming extract will shrink its fetch size down to when over its RSS cap
+MIN_STREAM_BATCH_SIZE = 500
+
 
 @dataclass
 class TaskSpec:
@@ -31,6 +36,47 @@ class TaskSpec:
     is_incremental: bool
     execute_sql_func: callable = None
     transform_func: callable = None
+    is_streaming: bool = False
+    stream_sql_func: callable = None
+    stream_batch_size: int = 10000
+    max_rss_bytes: Optional[int] = None
+    is_pipelined: bool = False
+    queue_size: int = 4
+    checkpoint_file: Optional[str] = None
+    checkpoint_key: Optional[str] = None
+    is_columnar_transform: bool = False
+
+
+@dataclass
+class PipelineStats:
+    """Per-stage timings and queue depth samples of a pipelined (producer/consumer) ETL task"""
+
+    extract_seconds: float = 0.0
+    transform_seconds: float = 0.0
+    index_seconds: float = 0.0
+    producer_wait_seconds: float = 0.0  # extract thread blocked on a full queue: ES is the bottleneck
+    consumer_wait_seconds: float = 0.0  # index thread blocked on an empty queue: the DB is the bottleneck
+    queue_depth_total: int = 0
+    queue_depth_max: int = 0
+    queue_depth_samples: int = 0
+
+    def record_queue_depth(self, depth: int) -> None:
+        self.queue_depth_total += depth
+        self.queue_depth_max = max(self.queue_depth_max, depth)
+        self.queue_depth_samples += 1
+
+    @property
+    def bottleneck(self) -> str:
+        return "DB-bound" if self.consumer_wait_seconds > self.producer_wait_seconds else "ES-bound"
+
+    def __str__(self) -> str:
+        avg_depth = self.queue_depth_total / self.queue_depth_samples if self.queue_depth_samples else 0
+        return (
+            f"extract: {self.extract_seconds:.2f}s | transform: {self.transform_seconds:.2f}s"
+            f" | index: {self.index_seconds:.2f}s | extract waited: {self.producer_wait_seconds:.2f}s"
+            f" | index waited: {self.consumer_wait_seconds:.2f}s"
+            f" | queue depth avg: {avg_depth:.1f} max: {self.queue_depth_max} | {self.bottleneck}"
+        )
 
 
 def chunks(items: List[Any], size: int) -> List[Any]:
@@ -68,6 +114,49 @@ def execute_sql_statement(cmd: str, results: bool = False, verbose: bool = False
     return rows
 
 
+def stream_sql_statement(
+    cmd: str, batch_size: int, verbose: bool = False, max_rss_bytes: Optional[int] = None
+) -> Generator[List[dict], None, None]:
+    """
+    Execute SQL using a server-side (named) cursor on a single-use psycopg2 connection, yielding the results
+    in batches of row dictionaries so the full result set is never held in memory.
+
+    If max_rss_bytes is provided, the resident memory of this process is checked after each batch has been
+    consumed and the size of the following fetches is halved (down to MIN_STREAM_BATCH_SIZE) while over the cap.
+    """
+    if verbose:
+        print(cmd)
+
+    connection = psycopg2.connect(dsn=get_database_dsn_string())
+    try:
+        # Named cursors must run inside of a transaction, so autocommit is left off for this read-only connection
+        with connection.cursor(name=f"es_etl_{uuid4().hex}") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(cmd)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                columns = [col[0] for col in cursor.description]
+                yield [dict(zip(columns, row)) for row in rows]
+                batch_size = adjust_batch_size_for_rss(batch_size, max_rss_bytes)
+    finally:
+        connection.close()
+
+
+def adjust_batch_size_for_rss(batch_size: int, max_rss_bytes: Optional[int]) -> int:
+    """Halve the batch size when this process's resident memory is over the provided cap"""
+    if not max_rss_bytes or batch_size <= MIN_STREAM_BATCH_SIZE:
+        return batch_size
+    rss = ps.Process().memory_info().rss
+    if rss <= max_rss_bytes:
+        return batch_size
+    new_batch_size = max(batch_size // 2, MIN_STREAM_BATCH_SIZE)
+    msg = f"RSS of {rss / 1024 ** 2:,.0f}MB is over the cap. Reducing batch size to {new_batch_size:,}"
+    logger.warning(format_log(msg, action="Extract"))
+    return new_batch_size
+
+
 def db_rows_to_dict(cursor: psycopg2.extensions.cursor) -> List[dict]:
     """Return a dictionary of all row results from a database connection cursor"""
     columns = [col[0] for col in cursor.description]
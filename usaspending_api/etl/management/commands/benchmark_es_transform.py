@@ -0,0 +1,179 @@
+import gc
+import logging
+
+from copy import deepcopy
+from django.core.management.base import BaseCommand
+from random import Random
+from time import perf_counter
+from typing import Dict
+
+from usaspending_api.etl.elasticsearch_loader_helpers import TaskSpec, transform_award_data, transform_transaction_data
+
+logger = logging.getLogger("script")
+
+
+class Command(BaseCommand):
+    """Compare rows/sec of the per-record and columnar transforms of the Elasticsearch ETL
+
+    Synthetic records shaped like rows of the ETL views are generated in memory and transformed in batches the size
+    of an indexer partition, so the DB and the ES cluster play no part in the results. Both transforms are checked
+    to produce identical documents before their timings are reported.
+    """
+
+    help = "Benchmark the per-record vs. columnar transform of the Elasticsearch ETL on synthetic records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--load-type",
+            type=str,
+            help="Which transform to benchmark",
+            default="transaction",
+            choices=["transaction", "award"],
+        )
+        parser.add_argument(
+            "--rows",
+            type=int,
+            help="Total number of synthetic records to transform",
+            default=1000000,
+            metavar="(default: 1,000,000)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of records transformed at a time, like the records of one partition or streamed batch",
+            default=10000,
+            metavar="(default: 10,000)",
+        )
+
+    def handle(self, *args, **options):
+        transform_func = transform_transaction_data if options["load_type"] == "transaction" else transform_award_data
+        field_for_es_id = f"{options['load_type']}_id"
+        rng = Random(42)
+        pools = _build_value_pools(rng)
+        timings = {False: 0.0, True: 0.0}
+
+        # Silence the transforms' own logging of each batch
+        logger.disabled = True
+        try:
+            for batch_number, batch_start in enumerate(range(0, options["rows"], options["batch_size"])):
+                batch_size = min(options["batch_size"], options["rows"] - batch_start)
+                records = [_synthetic_record(rng, pools, batch_start + i, field_for_es_id) for i in range(batch_size)]
+                results = {}
+                # Alternate which transform goes first, and keep garbage collection out of the timings like timeit
+                for is_columnar in (False, True) if batch_number % 2 == 0 else (True, False):
+                    task = _benchmark_task(field_for_es_id, is_columnar)
+                    batch = deepcopy(records)  # the transforms modify the records in place
+                    gc.collect()
+                    gc.disable()
+                    start = perf_counter()
+                    results[is_columnar] = transform_func(task, batch)
+                    timings[is_columnar] += perf_counter() - start
+                    gc.enable()
+                if results[False] != results[True]:
+                    raise RuntimeError(f"Transforms produced different documents for batch at row {batch_start}")
+        finally:
+            logger.disabled = False
+
+        for is_columnar, label in ((False, "per-record"), (True, "columnar")):
+            rate = options["rows"] / timings[is_columnar] if timings[is_columnar] else 0
+            logger.info(f"{label:>10}: {options['rows']:,} rows in {timings[is_columnar]:.2f}s | {rate:,.0f} rows/sec")
+        logger.info(f"Columnar speedup: {timings[False] / timings[True]:.2f}x")
+
+
+def _benchmark_task(field_for_es_id: str, is_columnar: bool) -> TaskSpec:
+    return TaskSpec(
+        name="transform benchmark",
+        index=None,
+        sql=None,
+        view=None,
+        base_table=None,
+        base_table_id=None,
+        field_for_es_id=field_for_es_id,
+        primary_key=field_for_es_id,
+        partition_number=0,
+        is_incremental=False,
+        is_columnar_transform=is_columnar,
+    )
+
+
+def _build_value_pools(rng: Random) -> Dict[str, list]:
+    """Distinct values to draw records from, with roughly the cardinality of the real reference data"""
+    states = [(f"S{i:02}", f"State {i}", f"{i:02}", rng.randint(500000, 40000000)) for i in range(56)]
+    return {
+        "agencies": [(f"Agency {i}", f"AG{i}", f"{i:03}", i) for i in range(1, 201)],
+        "subtier_agencies": [(f"Subtier Agency {i}", f"SA{i}", f"{i:04}") for i in range(1, 2001)],
+        "states": states,
+        "counties": [
+            (rng.choice(states), f"{i % 999 + 1:03}", f"County {i}", rng.randint(1000, 10000000)) for i in range(3200)
+        ],
+        "districts": [(rng.choice(states), f"{i % 53 + 1:02}", rng.randint(500000, 900000)) for i in range(440)],
+        "naics": [(str(100000 + i), f"Industry {i}") for i in range(1000)],
+        "psc": [(f"{1000 + i}", f"Product {i}") for i in range(2000)],
+        "recipients": [
+            (
+                f"RECIPIENT {i}",
+                str(100000000 + i),
+                f"{rng.getrandbits(128):032x}" if i % 20 else None,
+                rng.choice([["C"], ["P", "R"], ["C", "P"], ["R"], None]),
+            )
+            for i in range(100000)
+        ],
+    }
+
+
+def _synthetic_record(rng: Random, pools: Dict[str, list], record_id: int, field_for_es_id: str) -> dict:
+    """A record with the columns read by the transforms, plus unrelated columns like those of the ETL views"""
+    recipient_name, recipient_unique_id, recipient_hash, recipient_levels = rng.choice(pools["recipients"])
+    naics_code, naics_description = rng.choice(pools["naics"]) if rng.random() > 0.3 else (None, None)
+    psc_code, psc_description = rng.choice(pools["psc"]) if rng.random() > 0.3 else (None, None)
+    record = {
+        field_for_es_id: record_id,
+        "recipient_name": recipient_name,
+        "recipient_unique_id": recipient_unique_id,
+        "recipient_hash": recipient_hash,
+        "recipient_levels": recipient_levels,
+        "naics_code": naics_code,
+        "naics_description": naics_description,
+        "product_or_service_code": psc_code,
+        "product_or_service_description": psc_description,
+        "federal_accounts": [{"id": rng.randint(1, 3000), "account_title": "Synthetic Account"}],
+    }
+    for agency_type in ("awarding", "funding"):
+        toptier_name, toptier_abbreviation, toptier_code, toptier_id = rng.choice(pools["agencies"])
+        subtier_name, subtier_abbreviation, subtier_code = rng.choice(pools["subtier_agencies"])
+        is_missing = rng.random() < 0.05
+        record.update(
+            {
+                f"{agency_type}_toptier_agency_id": None if is_missing else toptier_id,
+                f"{agency_type}_toptier_agency_name": None if is_missing else toptier_name,
+                f"{agency_type}_toptier_agency_abbreviation": None if is_missing else toptier_abbreviation,
+                f"{agency_type}_toptier_agency_code": None if is_missing else toptier_code,
+                f"{agency_type}_subtier_agency_name": None if is_missing else subtier_name,
+                f"{agency_type}_subtier_agency_abbreviation": None if is_missing else subtier_abbreviation,
+                f"{agency_type}_subtier_agency_code": None if is_missing else subtier_code,
+            }
+        )
+    record["funding_subtier_agency_id"] = rng.randint(1, 2000)
+    for location_type in ("pop", "recipient_location"):
+        county_state, county_code, county_name, county_population = rng.choice(pools["counties"])
+        district_state, congressional_code, congressional_population = rng.choice(pools["districts"])
+        state_code, state_name, state_fips, state_population = county_state
+        is_domestic = rng.random() > 0.05
+        record.update(
+            {
+                f"{location_type}_country_code": "USA" if is_domestic else "CAN",
+                f"{location_type}_country_name": "UNITED STATES" if is_domestic else "CANADA",
+                f"{location_type}_state_code": state_code if is_domestic else None,
+                f"{location_type}_state_name": state_name if is_domestic else None,
+                f"{location_type}_state_fips": state_fips if is_domestic else None,
+                f"{location_type}_state_population": state_population if is_domestic else None,
+                f"{location_type}_county_code": county_code if is_domestic else None,
+                f"{location_type}_county_name": county_name if is_domestic else None,
+                f"{location_type}_county_population": county_population if is_domestic else None,
+                f"{location_type}_congressional_code": congressional_code if is_domestic else None,
+                f"{location_type}_congressional_population": congressional_population if is_domestic else None,
+            }
+        )
+    for i in range(40):
+        record[f"other_field_{i}"] = rng.random()
+    return record
@@ -13,6 +13,7 @@ from usaspending_api.etl.elasticsearch_loader_helpers import (
     Controller,
     execute_sql_statement,
     format_log,
+    stream_sql_statement,
     toggle_refresh_off,
     transform_award_data,
     transform_covid19_faba_data,
@@ -73,6 +74,12 @@ class Command(BaseCommand):
             "is always a safe format. Wrap in quotes if date/time contains spaces. Does not apply to deletes",
             metavar="",
         )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Resume a failed --create-new-index run into the same --index-name, skipping the partitions "
+            "its checkpoint ledger records as done. Partition settings must match the original run.",
+        )
         parser.add_argument(
             "--skip-delete-index",
             action="store_true",
@@ -101,11 +108,67 @@ class Command(BaseCommand):
             default=10000,
             metavar="(default: 10,000)",
         )
+        parser.add_argument(
+            "--partition-strategy",
+            type=str,
+            help="How partitions are sized. 'even' splits the ID range into equal spans of --partition-size IDs. "
+            "'density' samples the actual ID distribution to build partitions of roughly --partition-size records, "
+            "avoiding many near-empty and a few enormous partitions when IDs are sparse.",
+            default="even",
+            choices=["even", "density"],
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Log the planned partitions with their ID ranges and record counts, then exit without indexing",
+        )
+        parser.add_argument(
+            "--columnar-transform",
+            action="store_true",
+            help="Transform each batch of records a column at a time, encoding each distinct agg key once per batch. "
+            "Produces the same documents as the default per-record transform. See the benchmark_es_transform command",
+        )
         parser.add_argument(
             "--drop-db-view",
             action="store_true",
             help="After completing the ETL, drop the SQL view used for the data extraction",
         )
+        parser.add_argument(
+            "--streaming",
+            action="store_true",
+            help="Extract each partition in batches from a server-side cursor, transforming and indexing each batch "
+            "as it arrives so that memory per process stays flat regardless of partition size. "
+            "Not supported for --load-type=covid19-faba, which groups records across the whole partition.",
+        )
+        parser.add_argument(
+            "--stream-batch-size",
+            type=int,
+            help="Number of rows fetched from the server-side cursor at a time. "
+            "Only used with --streaming or --pipelined",
+            default=10000,
+            metavar="(default: 10,000)",
+        )
+        parser.add_argument(
+            "--max-rss-mb",
+            type=int,
+            help="Soft cap (in MB) on the resident memory of each process. When over it, the batch size is halved. "
+            "Only used with --streaming or --pipelined",
+            metavar="",
+        )
+        parser.add_argument(
+            "--pipelined",
+            action="store_true",
+            help="Like --streaming, but each process extracts and transforms batches on one thread while indexing "
+            "them on another, so that DB reads and ES bulk writes overlap. Logs per-stage timings and queue depth "
+            "to show whether the run is DB-bound or ES-bound. Not supported for --load-type=covid19-faba.",
+        )
+        parser.add_argument(
+            "--queue-size",
+            type=int,
+            help="Max number of transformed batches waiting to be indexed per process. Only used with --pipelined",
+            default=4,
+            metavar="(default: 4)",
+        )
 
     def handle(self, *args, **options):
         elasticsearch_client = instantiate_elasticsearch_client()
@@ -120,6 +183,11 @@ class Command(BaseCommand):
         error_addition = ""
         loader = Controller(config)
 
+        if config["dry_run"]:
+            loader.plan_partitions()
+            loader.log_partition_plan()
+            return
+
         if config["is_incremental_load"]:
             toggle_refresh_off(elasticsearch_client, config["index_name"])  # Turned back on at end.
 
@@ -153,21 +221,35 @@ class Command(BaseCommand):
 
 def parse_cli_args(options: dict, es_client) -> dict:
     passthrough_values = [
+        "columnar_transform",
         "create_new_index",
         "drop_db_view",
+        "dry_run",
         "index_name",
         "load_type",
+        "max_rss_mb",
         "partition_size",
+        "partition_strategy",
+        "pipelined",
         "process_deletes",
         "deletes_only",
         "processes",
+        "queue_size",
+        "resume",
         "skip_counts",
         "skip_delete_index",
+        "stream_batch_size",
+        "streaming",
     ]
     config = set_config(passthrough_values, options)
 
+    if (config["streaming"] or config["pipelined"]) and config["load_type"] == "covid19-faba":
+        raise SystemExit("Fatal error: '--streaming' and '--pipelined' don't support '--load-type=covid19-faba'.")
+
     if config["create_new_index"] and not config["index_name"]:
         raise SystemExit("Fatal error: '--create-new-index' requires '--index-name'.")
+    elif config["resume"] and not config["create_new_index"]:
+        raise SystemExit("Fatal error: '--resume' requires '--create-new-index'.")
     elif config["create_new_index"]:
         config["index_name"] = config["index_name"].lower()
         config["starting_date"] = config["initial_datetime"]
@@ -194,7 +276,7 @@ def parse_cli_args(options: dict, es_client) -> dict:
             logger.error(f"Write alias '{config['write_alias']}' is missing")
             raise SystemExit(1)
     else:
-        if config["index_name"] and es_client.indices.exists(config["index_name"]):
+        if config["index_name"] and es_client.indices.exists(config["index_name"]) and not config["resume"]:
             logger.error(f"Data load into existing index. Change index name or run an incremental load")
             raise SystemExit(1)
 
@@ -216,6 +298,7 @@ def set_config(passthrough_values: list, arg_parse_options: dict) -> dict:
             "data_transform_func": transform_award_data,
             "data_type": "award",
             "execute_sql_func": execute_sql_statement,
+            "stream_sql_func": stream_sql_statement,
             "extra_null_partition": False,
             "field_for_es_id": "award_id",
             "initial_datetime": default_datetime,
@@ -237,6 +320,7 @@ def set_config(passthrough_values: list, arg_parse_options: dict) -> dict:
             "data_transform_func": transform_transaction_data,
             "data_type": "transaction",
             "execute_sql_func": execute_sql_statement,
+            "stream_sql_func": stream_sql_statement,
             "extra_null_partition": False,
             "field_for_es_id": "transaction_id",
             "initial_datetime": default_datetime,
@@ -258,6 +342,7 @@ def set_config(passthrough_values: list, arg_parse_options: dict) -> dict:
             "data_transform_func": transform_covid19_faba_data,
             "data_type": "covid19-faba",
             "execute_sql_func": execute_sql_statement,
+            "stream_sql_func": stream_sql_statement,
             "extra_null_partition": True,
             "field_for_es_id": "financial_account_distinct_award_key",
             "initial_datetime": datetime.strptime(f"2020-04-01+0000", "%Y-%m-%d%z"),
@@ -1,4 +1,5 @@
 import logging
+import multiprocessing
 
 from datetime import timedelta
 from django.core.management import call_command
@@ -7,8 +8,12 @@ from django.db import transaction
 from django.db.models import Max
 from django.utils.crypto import get_random_string
 from usaspending_api.common.helpers.date_helper import now, datetime_command_line_argument_type
+from usaspending_api.common.helpers.sql_helpers import close_all_django_db_conns
 from usaspending_api.etl.submission_loader_helpers.final_of_fy import populate_final_of_fy
-from usaspending_api.etl.submission_loader_helpers.submission_ids import get_new_or_updated_submission_ids
+from usaspending_api.etl.submission_loader_helpers.submission_ids import (
+    get_new_or_updated_submission_ids,
+    get_submission_toptier_codes,
+)
 from usaspending_api.submissions import dabs_loader_queue_helpers as dlqh
 from usaspending_api.submissions.models import SubmissionAttributes
 
@@ -38,6 +43,7 @@ class Command(BaseCommand):
     processor_id = None
     heartbeat_timer = None
     file_c_chunk_size = 100000
+    processes = 1
     do_not_retry = []
 
     def add_arguments(self, parser):
@@ -90,6 +96,18 @@ class Command(BaseCommand):
             ),
         )
 
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=self.processes,
+            help=(
+                "Number of worker processes loading submissions from the queue at the same time.  "
+                "Workers never load two submissions of the same agency at once, and load each "
+                "agency's submissions in queue order.  This is in addition to any other loaders "
+                f"running against the queue.  Default is {self.processes}."
+            ),
+        )
+
         parser.epilog = (
             "And to answer your next question, yes this can be run standalone.  The parallelization "
             "code is pretty minimal and should not add significant time to the overall run time of "
@@ -107,10 +125,15 @@ class Command(BaseCommand):
 
         if self.submission_ids:
             self.add_specific_submissions_to_queue()
-            processed_count = self.load_specific_submissions()
         else:
             since_datetime = self.start_datetime or self.calculate_load_submissions_since_datetime()
             self.add_submissions_since_datetime_to_queue(since_datetime)
+
+        if self.processes > 1:
+            processed_count = self.load_submissions_in_parallel()
+        elif self.submission_ids:
+            processed_count = self.load_specific_submissions()
+        else:
             processed_count = self.load_incremental_submissions()
 
         ready, in_progress, abandoned, failed, unrecognized = dlqh.get_queue_status()
@@ -130,6 +153,7 @@ class Command(BaseCommand):
         self.start_datetime = options.get("start_datetime")
         self.report_queue_status_only = options.get("report_queue_status_only")
         self.file_c_chunk_size = options.get("file_c_chunk_size")
+        self.processes = options.get("processes")
         self.processor_id = f"{now()}/{get_random_string()}"
 
         logger.info(f'processor_id = "{self.processor_id}"')
@@ -177,6 +201,7 @@ class Command(BaseCommand):
         with transaction.atomic():
             added = dlqh.add_submission_ids(self.submission_ids)
             dlqh.mark_force_reload(self.submission_ids)
+        self.record_toptier_codes(self.submission_ids)
         count = len(self.submission_ids)
         logger.info(
             f"Received {count:,} submission ids on the command line.  {added:,} were "
@@ -194,20 +219,81 @@ class Command(BaseCommand):
                 processed_count += 1
         return processed_count
 
-    @staticmethod
-    def add_submissions_since_datetime_to_queue(since_datetime):
+    def add_submissions_since_datetime_to_queue(self, since_datetime):
         if since_datetime is None:
             logger.info("No records found in submission_attributes.  Performing a full load.")
         else:
             logger.info(f"Performing incremental load starting from {since_datetime}.")
         submission_ids = get_new_or_updated_submission_ids(since_datetime)
         added = dlqh.add_submission_ids(submission_ids)
+        self.record_toptier_codes(submission_ids)
         count = len(submission_ids)
         logger.info(
             f"Identified {count:,} new or updated submission ids in Broker.  {added:,} were "
             f"added to the queue.  {count - added:,} already existed."
         )
 
+    @staticmethod
+    def record_toptier_codes(submission_ids):
+        """ Agencies are what parallel loaders use to keep submissions in order. """
+        dlqh.set_toptier_codes(get_submission_toptier_codes(submission_ids))
+
+    def load_submissions_in_parallel(self):
+        """
+        Forks worker processes that each claim and load submissions from the queue until there are none
+        left they can take.  Returns the count of submissions loaded across all of them.
+        """
+        logger.info(f"Loading submissions with {self.processes:,} worker processes.")
+        context = multiprocessing.get_context("fork")
+        processed_count = context.Value("i", 0)
+
+        # Each worker has to open its own database connections.
+        close_all_django_db_conns()
+        manager = context.Manager()
+        try:
+            # Shared so that a submission that fails in one worker isn't retried by the others.
+            do_not_retry = manager.list(self.do_not_retry)
+            workers = [
+                context.Process(
+                    target=self.load_queued_submissions_in_worker,
+                    args=(f"{self.processor_id}/{i}", do_not_retry, processed_count),
+                    name=f"load_multiple_submissions-{i}",
+                )
+                for i in range(self.processes)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            manager.shutdown()
+
+        for worker in workers:
+            if worker.exitcode != 0:
+                logger.error(f"Worker {worker.name} exited with code {worker.exitcode}")
+        return processed_count.value
+
+    def load_queued_submissions_in_worker(self, processor_id, do_not_retry, processed_count):
+        self.processor_id = processor_id
+        self.do_not_retry = do_not_retry
+        logger.info(f'Worker processor_id = "{self.processor_id}"')
+
+        count = 0
+        while True:
+            submission_id, force_reload = dlqh.claim_next_available_submission(
+                self.processor_id, list(self.do_not_retry), self.submission_ids, keep_agencies_in_order=True
+            )
+            if submission_id is None:
+                logger.info("No more submissions in the queue this worker can take.  Exiting.")
+                break
+            # Submissions provided on the command line are always fully reloaded.
+            self.load_submission(submission_id, force_reload or bool(self.submission_ids))
+            count += 1
+
+        with processed_count.get_lock():
+            processed_count.value += count
+        close_all_django_db_conns()
+
     def load_incremental_submissions(self):
         processed_count = 0
         while True:
@@ -6,6 +6,7 @@ from django.core.management.base import CommandError
 from django.db import transaction
 from usaspending_api.etl.broker_etl_helpers import dictfetchall
 from usaspending_api.etl.management import load_base
+from usaspending_api.etl.reference_data_cache import reference_data
 from usaspending_api.etl.submission_loader_helpers.file_a import get_file_a, load_file_a
 from usaspending_api.etl.submission_loader_helpers.file_b import get_file_b, load_file_b
 from usaspending_api.etl.submission_loader_helpers.file_c import get_file_c, load_file_c
@@ -85,6 +86,7 @@ class Command(load_base.Command):
         logger.info(f"{new_program_activities:,} new program activities created")
 
         self.load_in_transaction()
+        reference_data.log_stats()
 
     @transaction.atomic
     def load_in_transaction(self):
@@ -0,0 +1,31 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from usaspending_api.etl.award_helpers import update_awards_from_change_log
+
+logger = logging.getLogger("script")
+
+
+class Command(BaseCommand):
+    """
+    Recalculates the awards appended to award_rollup_change_log by loaders, in batches, until the change log is empty.
+    Loaders run with AWARD_ROLLUP_CHANGE_LOG drain the change log themselves once they finish loading; this command
+    drains whatever is left behind by a loader that failed before it got there, or catches up on a large backlog with
+    several processes at once.
+    """
+
+    help = "Recalculate the awards in award_rollup_change_log from their transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.AWARD_ROLLUP_BATCH_SIZE,
+            help="Number of change log entries to recalculate the awards of per transaction",
+        )
+
+    def handle(self, *args, **options):
+        award_count = update_awards_from_change_log(options["batch_size"])
+        logger.info(f"{award_count:,} awards recalculated")
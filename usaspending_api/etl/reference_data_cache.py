@@ -0,0 +1,166 @@
+import logging
+
+from collections import defaultdict
+from dataclasses import dataclass
+from django.conf import settings
+from django.db import connection
+from threading import Lock
+from time import monotonic
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional
+
+from usaspending_api.etl.broker_etl_helpers import dictfetchall
+from usaspending_api.references.models import Agency, ObjectClass, RefProgramActivity
+
+logger = logging.getLogger("script")
+
+SUBTIER_AGENCY = "subtier_agency"
+AGENCY_BY_SUBTIER_CODE = "agency_by_subtier_code"
+OBJECT_CLASS = "object_class"
+PROGRAM_ACTIVITY = "program_activity"
+
+
+@dataclass(frozen=True)
+class ReferenceDataSnapshot:
+    """A read-only copy of a reference table's rows, keyed the way loaders look them up"""
+
+    rows: Mapping[Hashable, Any]
+    version: Any
+    loaded_at: float
+
+
+class ReferenceDataCache:
+    """
+    Process-wide snapshots of reference tables, for loaders that would otherwise query them once per loaded row.
+
+    Each table is registered with a function returning its rows keyed for lookups, and optionally a query returning a
+    cheap version of the table, such as its row count and latest update_date. Once a snapshot is older than the TTL,
+    the next lookup runs that query, and the table is only loaded again if its version has changed (or if it has no
+    version query). Snapshots are never modified once loaded, so lookups read them in place rather than copying them.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._loaders = {}
+        self._version_queries = {}
+        self._snapshots = {}
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "loads": 0})
+        self._lock = Lock()
+
+    def register(self, name: str, loader: Callable[[], Dict], version_query: Optional[str] = None) -> None:
+        self._loaders[name] = loader
+        self._version_queries[name] = version_query
+        self._snapshots.pop(name, None)
+
+    def get(self, name: str, key: Hashable, default: Any = None) -> Any:
+        rows = self.rows(name)
+        if key in rows:
+            self._stats[name]["hits"] += 1
+            return rows[key]
+        self._stats[name]["misses"] += 1
+        return default
+
+    def rows(self, name: str) -> Mapping[Hashable, Any]:
+        """All rows of the table's current snapshot, as a read-only mapping"""
+        snapshot = self._snapshots.get(name)
+        if snapshot is None or snapshot.loaded_at + self.ttl_seconds <= monotonic():
+            snapshot = self._refresh(name, force=False)
+        return snapshot.rows
+
+    def refresh(self, name: str) -> None:
+        """Load the table again now, e.g. right after the calling process has added rows to it"""
+        self._refresh(name, force=True)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop the snapshot of the table, or of every table, so that it is loaded again on its next lookup"""
+        with self._lock:
+            if name is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(name, None)
+
+    def stats(self, name: str) -> Dict[str, int]:
+        return dict(self._stats[name])
+
+    def log_stats(self) -> None:
+        for name in sorted(self._stats):
+            stats = self._stats[name]
+            logger.info(
+                f"Reference data '{name}': {stats['hits']:,} hits, {stats['misses']:,} misses, {stats['loads']:,} loads"
+            )
+
+    def _refresh(self, name: str, force: bool) -> ReferenceDataSnapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+            if not force and snapshot is not None and snapshot.loaded_at + self.ttl_seconds > monotonic():
+                # Refreshed by another thread while this one waited for the lock
+                return snapshot
+
+            # The version is read before the rows, so that changes made while loading them cause another load later
+            version = self._current_version(name)
+            if not force and snapshot is not None and version is not None and version == snapshot.version:
+                snapshot = ReferenceDataSnapshot(snapshot.rows, version, monotonic())
+            else:
+                snapshot = ReferenceDataSnapshot(MappingProxyType(self._loaders[name]()), version, monotonic())
+                self._stats[name]["loads"] += 1
+            self._snapshots[name] = snapshot
+            return snapshot
+
+    def _current_version(self, name: str) -> Optional[tuple]:
+        if self._version_queries[name] is None:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(self._version_queries[name])
+            return tuple(cursor.fetchone())
+
+
+def _load_subtier_agencies() -> Dict[str, dict]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT * FROM subtier_agency JOIN agency ON subtier_agency.subtier_agency_id = agency.subtier_agency_id"
+        )
+        return {row["subtier_code"]: MappingProxyType(row) for row in dictfetchall(cursor)}
+
+
+def _load_agencies_by_subtier_code() -> Dict[Optional[str], Agency]:
+    # Only codes of exactly one Agency, as with Agency.get_by_subtier_only
+    agencies_by_subtier_code = defaultdict(list)
+    for agency in Agency.objects.select_related("subtier_agency"):
+        subtier_code = agency.subtier_agency.subtier_code if agency.subtier_agency else None
+        agencies_by_subtier_code[subtier_code].append(agency)
+    return {code: agencies[0] for code, agencies in agencies_by_subtier_code.items() if len(agencies) == 1}
+
+
+def _load_object_classes() -> Dict[tuple, ObjectClass]:
+    return {(oc.object_class, oc.direct_reimbursable): oc for oc in ObjectClass.objects.all()}
+
+
+def _load_program_activities() -> Dict[tuple, RefProgramActivity]:
+    return {
+        (
+            pa.program_activity_code,
+            pa.program_activity_name,
+            pa.budget_year,
+            pa.responsible_agency_id,
+            pa.allocation_transfer_agency_id,
+            pa.main_account_code,
+        ): pa
+        for pa in RefProgramActivity.objects.all()
+    }
+
+
+_AGENCY_VERSION_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM agency),
+        (SELECT MAX(update_date) FROM agency),
+        (SELECT COUNT(*) FROM subtier_agency),
+        (SELECT MAX(update_date) FROM subtier_agency)
+"""
+
+reference_data = ReferenceDataCache(ttl_seconds=settings.REFERENCE_DATA_CACHE_TTL_SECONDS)
+reference_data.register(SUBTIER_AGENCY, _load_subtier_agencies, _AGENCY_VERSION_QUERY)
+reference_data.register(AGENCY_BY_SUBTIER_CODE, _load_agencies_by_subtier_code, _AGENCY_VERSION_QUERY)
+reference_data.register(OBJECT_CLASS, _load_object_classes, "SELECT COUNT(*), MAX(update_date) FROM object_class")
+reference_data.register(
+    PROGRAM_ACTIVITY, _load_program_activities, "SELECT COUNT(*), MAX(update_date) FROM ref_program_activity"
+)
@@ -0,0 +1,45 @@
+from django.db import connection
+from django.db.models import AutoField
+from io import StringIO
+
+from usaspending_api.etl.transaction_loaders.data_load_helpers import format_value_for_copy
+
+
+class BulkCopyManager:
+    """
+    Same interface as BulkCreateManager, but writes the instances with COPY instead of batches of INSERTs, which cuts
+    the per row cost of loading the larger submission files considerably.  Instances are written as they would be
+    saved, less their auto incremented primary key, and are not refreshed afterwards.
+    """
+
+    batch_size = 10000
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = [f for f in model._meta.concrete_fields if not isinstance(f, AutoField)]
+        self.columns = ", ".join(f'"{f.column}"' for f in self.fields)
+        self.rows = StringIO()
+        self.count = 0
+
+    def append(self, instance):
+        self.rows.write(
+            "\t".join(
+                format_value_for_copy(field.get_db_prep_save(field.pre_save(instance, True), connection))
+                for field in self.fields
+            )
+        )
+        self.rows.write("\n")
+        self.count += 1
+        if self.count >= self.batch_size:
+            self._copy()
+
+    def save_stragglers(self):
+        self._copy()
+
+    def _copy(self):
+        if self.count > 0:
+            self.rows.seek(0)
+            with connection.cursor() as cursor:
+                cursor.cursor.copy_expert(f"COPY {self.model._meta.db_table} ({self.columns}) FROM STDIN", self.rows)
+            self.rows = StringIO()
+            self.count = 0
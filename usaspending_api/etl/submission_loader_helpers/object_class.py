@@ -1,18 +1,14 @@
 from usaspending_api.common.containers import Bunch
+from usaspending_api.etl.reference_data_cache import reference_data, OBJECT_CLASS
 from usaspending_api.references.models import ObjectClass
 
 
-OBJECT_CLASSES = None
-
-
 def reset_object_class_cache():
     """
-    An unfortunate side effect of globals is that they don't get refreshed automatically
-    for tests.  So, to keep the performance of caching object classes globally but still
-    allow tests to function properly, we need a way to reset the object class cache.
+    Tests create their object classes after the cached ones may have been loaded, and more quickly than the cache
+    would notice, so they need a way to reset the object class cache.
     """
-    global OBJECT_CLASSES
-    OBJECT_CLASSES = None
+    reference_data.invalidate(OBJECT_CLASS)
 
 
 def get_object_class_row(row):
@@ -24,10 +20,6 @@ def get_object_class_row(row):
          row.object_class: object class from the broker
          row.by_direct_reimbursable_fun: direct/reimbursable flag from the broker
     """
-    global OBJECT_CLASSES
-    if OBJECT_CLASSES is None:
-        OBJECT_CLASSES = {(oc.object_class, oc.direct_reimbursable): oc for oc in ObjectClass.objects.all()}
-
     # Object classes are numeric strings so let's ensure the one we're passed is actually a string before we begin.
     object_class = str(row.object_class).zfill(3) if type(row.object_class) is int else row.object_class
 
@@ -60,12 +52,12 @@ def get_object_class_row(row):
     object_class = f"{object_class[:2]}.{object_class[2:]}"
 
     # This will throw an exception if the object class does not exist which is the new desired behavior.
-    try:
-        return OBJECT_CLASSES[(object_class, direct_reimbursable)]
-    except KeyError:
+    object_class_row = reference_data.get(OBJECT_CLASS, (object_class, direct_reimbursable))
+    if object_class_row is None:
         raise ObjectClass.DoesNotExist(
             f"Unable to find object class for object_class={object_class}, direct_reimbursable={direct_reimbursable}."
         )
+    return object_class_row
 
 
 def get_object_class(row_object_class, row_direct_reimbursable):
@@ -1,9 +1,6 @@
 from django.conf import settings
 from django.db import connection
-from usaspending_api.references.models import RefProgramActivity
-
-
-PROGRAM_ACTIVITIES = {}
+from usaspending_api.etl.reference_data_cache import reference_data, PROGRAM_ACTIVITY
 
 
 def update_program_activities(submission_id):
@@ -13,8 +10,6 @@ def update_program_activities(submission_id):
     the program activities we need for this load.  Because other processes may also be running, we
     have to do this per submission just in case a new program activity is snuck in by another.
     """
-    global PROGRAM_ACTIVITIES
-
     sql = f"""
         insert into ref_program_activity (
                 program_activity_code,
@@ -86,17 +81,7 @@ def update_program_activities(submission_id):
         cursor.execute(sql)
         rowcount = cursor.rowcount
 
-    PROGRAM_ACTIVITIES = {
-        (
-            pa.program_activity_code,
-            pa.program_activity_name,
-            pa.budget_year,
-            pa.responsible_agency_id,
-            pa.allocation_transfer_agency_id,
-            pa.main_account_code,
-        ): pa
-        for pa in RefProgramActivity.objects.all()
-    }
+    reference_data.refresh(PROGRAM_ACTIVITY)
 
     return rowcount
 
@@ -112,4 +97,7 @@ def get_program_activity(row, submission_attributes):
         row["allocation_transfer_agency"],
         row["main_account_code"],
     )
-    return PROGRAM_ACTIVITIES[key]
+    program_activity = reference_data.get(PROGRAM_ACTIVITY, key)
+    if program_activity is None:
+        raise KeyError(key)
+    return program_activity
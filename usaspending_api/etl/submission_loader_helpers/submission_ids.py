@@ -67,3 +67,36 @@ def get_new_or_updated_submission_ids(since_datetime=None):
 
     rows = execute_sql_to_named_tuple(sql)
     return [r.submission_id for r in rows]
+
+
+def get_submission_toptier_codes(submission_ids):
+    """
+    Looks up the agency (CGAC or FREC) of each of the provided Broker submissions and returns a
+    dictionary of toptier codes keyed by submission id.
+    """
+    if not submission_ids:
+        return {}
+
+    ids = ", ".join(str(int(i)) for i in submission_ids)
+    sql = f"""
+        select
+            bs.submission_id,
+            bs.toptier_code
+        from
+            dblink(
+                '{settings.DATA_BROKER_DBLINK_NAME}',
+                '
+                    select  s.submission_id, coalesce(s.cgac_code, s.frec_code) as toptier_code
+                    from    submission as s
+                    where   s.submission_id in ({ids})
+                '
+            ) as bs (
+                submission_id integer,
+                toptier_code text
+            )
+        where
+            bs.toptier_code is not null
+    """
+
+    rows = execute_sql_to_named_tuple(sql)
+    return {r.submission_id: r.toptier_code for r in rows}
@@ -18,6 +18,7 @@ from usaspending_api.etl.management.commands.elasticsearch_indexer import (
     parse_cli_args,
 )
 from usaspending_api.etl.elasticsearch_loader_helpers import (
+    chunks,
     Controller,
     delete_awards,
     delete_transactions,
@@ -128,6 +129,13 @@ def mock_execute_sql(sql, results, verbosity=None):
     return execute_sql_to_ordered_dictionary(sql)
 
 
+def mock_stream_sql(sql, batch_size, verbose=None, max_rss_bytes=None):
+    """Server-side cursor streaming is mocked by chunking the results of the mocked SQL method, for the same
+    reason that ``mock_execute_sql`` is used
+    """
+    yield from chunks(execute_sql_to_ordered_dictionary(sql), batch_size)
+
+
 def test_create_and_load_new_award_index(award_data_fixture, elasticsearch_award_index, monkeypatch):
     """Test the ``elasticsearch_loader`` django management command to create a new awards index and load it
     with data from the DB
@@ -194,6 +202,34 @@ def test_create_and_load_new_transaction_index(award_data_fixture, elasticsearch
     assert es_award_docs == original_db_tx_count
 
 
+def test_create_and_load_new_award_index_streaming(award_data_fixture, elasticsearch_award_index, monkeypatch):
+    """Test that ``--streaming`` loads a new awards index in batches, yielding the same docs as the default path"""
+    client = elasticsearch_award_index.client  # type: Elasticsearch
+
+    # Ensure index is not yet created
+    assert not client.indices.exists(elasticsearch_award_index.index_name)
+    original_db_awards_count = Award.objects.count()
+
+    # Inject ETL args into config for this run, using a batch size that forces multiple batches per partition
+    elasticsearch_award_index.etl_config["create_new_index"] = True
+    elasticsearch_award_index.etl_config["streaming"] = True
+    elasticsearch_award_index.etl_config["stream_batch_size"] = 1
+    es_etl_config = _process_es_etl_test_config(client, elasticsearch_award_index)
+
+    # Must use mock sql function to share test DB conn+transaction in ETL code
+    es_etl_config["stream_sql_func"] = mock_stream_sql
+    loader = Controller(es_etl_config)
+    loader.prepare_for_etl()
+    assert all(task.is_streaming and task.stream_batch_size == 1 for task in loader.tasks)
+    loader.dispatch_tasks()
+    # Along with other things, this will refresh the index, to surface loaded docs
+    set_final_index_config(client, elasticsearch_award_index.index_name)
+
+    assert client.indices.exists(elasticsearch_award_index.index_name)
+    es_award_docs = client.count(index=elasticsearch_award_index.index_name)["count"]
+    assert es_award_docs == original_db_awards_count
+
+
 def test_incremental_load_into_award_index(award_data_fixture, elasticsearch_award_index, monkeypatch):
     """Test the ``elasticsearch_loader`` django management command to incrementally load updated data into the awards ES
     index from the DB, overwriting the doc that was already there
@@ -3,7 +3,13 @@ import pytest
 
 from model_mommy import mommy
 
-from usaspending_api.etl.award_helpers import update_awards, update_procurement_awards, update_assistance_awards
+from usaspending_api.awards.models import Award, AwardRollupChangeLog
+from usaspending_api.etl.award_helpers import (
+    update_assistance_awards,
+    update_awards,
+    update_awards_from_change_log,
+    update_procurement_awards,
+)
 
 
 @pytest.mark.django_db
@@ -469,3 +475,32 @@ def test_award_update_transaction_fk():
         award.period_of_performance_current_end_date.strftime("%Y-%m-%d")
         == txn10.period_of_performance_current_end_date
     )
+
+
+@pytest.mark.django_db
+def test_award_update_from_change_log():
+    """Test that only the awards appended to the change log are updated, in batches, and that the log is drained"""
+    awards = [mommy.make("awards.Award", total_obligation=0, generated_unique_award_id=f"AWARD_{i}") for i in range(5)]
+    for award in awards:
+        mommy.make(
+            "awards.TransactionNormalized",
+            award=award,
+            federal_action_obligation=1000,
+            _quantity=2,
+            unique_award_key=award.generated_unique_award_id,
+        )
+    empty_award = mommy.make("awards.Award", generated_unique_award_id="EMPTY_AWARD")
+
+    AwardRollupChangeLog.objects.append([awards[0].id, awards[1].id, awards[2].id])
+    AwardRollupChangeLog.objects.append([awards[0].id, empty_award.id])
+
+    # Batches of two of the five change log entries, the first award appearing in the first two batches
+    assert update_awards_from_change_log(batch_size=2) == 5
+    assert not AwardRollupChangeLog.objects.exists()
+
+    for award in awards:
+        award.refresh_from_db()
+    assert [award.total_obligation for award in awards] == [2000, 2000, 2000, 0, 0]
+    assert not Award.objects.filter(id=empty_award.id).exists()
+
+    assert update_awards_from_change_log() == 0
@@ -0,0 +1,70 @@
+from usaspending_api.etl.elasticsearch_loader_helpers import Controller, TaskSpec
+from usaspending_api.etl.elasticsearch_loader_helpers.checkpoint_ledger import (
+    completed_partition_keys,
+    PARTITION_DONE,
+    PARTITION_FAILED,
+    PARTITION_RUNNING,
+    read_partition_states,
+    record_partition_state,
+    record_pending_partitions,
+)
+
+
+def _make_task(partition_number, checkpoint_file):
+    return TaskSpec(
+        name=f"task {partition_number}",
+        index="test-index",
+        sql=None,
+        view=None,
+        base_table=None,
+        base_table_id=None,
+        field_for_es_id="award_id",
+        primary_key="award_id",
+        partition_number=partition_number,
+        is_incremental=False,
+        checkpoint_file=checkpoint_file,
+        checkpoint_key=f"{partition_number * 10 + 1}-{partition_number * 10 + 10}",
+    )
+
+
+def test_partition_states_keep_latest_entry(tmp_path):
+    checkpoint_file = str(tmp_path / "checkpoints" / "test-index.jsonl")
+    tasks = [_make_task(i, checkpoint_file) for i in range(3)]
+
+    record_pending_partitions(tasks)
+    record_partition_state(tasks[0], PARTITION_RUNNING)
+    record_partition_state(tasks[0], PARTITION_DONE, success=10, fail=0)
+    record_partition_state(tasks[1], PARTITION_RUNNING)
+    record_partition_state(tasks[1], PARTITION_FAILED)
+
+    states = read_partition_states(checkpoint_file)
+    assert {key: entry["state"] for key, entry in states.items()} == {
+        "1-10": PARTITION_DONE,
+        "11-20": PARTITION_FAILED,
+        "21-30": "pending",
+    }
+    assert states["1-10"]["success"] == 10
+    assert completed_partition_keys(checkpoint_file) == {"1-10"}
+
+
+def test_partition_states_without_ledger(tmp_path):
+    task = _make_task(0, None)
+    record_partition_state(task, PARTITION_DONE)  # no-op when not checkpointing
+    assert read_partition_states(str(tmp_path / "missing.jsonl")) == {}
+
+
+def test_skip_completed_partitions(tmp_path, monkeypatch):
+    checkpoint_file = str(tmp_path / "test-index.jsonl")
+    monkeypatch.setattr(
+        "usaspending_api.etl.elasticsearch_loader_helpers.controller.checkpoint_file_path",
+        lambda index_name: checkpoint_file,
+    )
+    tasks = [_make_task(i, checkpoint_file) for i in range(4)]
+    record_partition_state(tasks[1], PARTITION_DONE)
+    record_partition_state(tasks[3], PARTITION_DONE)
+
+    ctrl = Controller({"index_name": "test-index", "processes": 10})
+    ctrl.tasks = tasks
+    ctrl.skip_completed_partitions()
+    assert [task.partition_number for task in ctrl.tasks] == [0, 2]
+    assert ctrl.config["processes"] == 2
@@ -1,5 +1,16 @@
-from usaspending_api.etl.elasticsearch_loader_helpers import Controller
+import pytest
+
 from math import ceil
+from multiprocessing import Event
+
+from usaspending_api.etl.elasticsearch_loader_helpers import Controller, TaskSpec
+from usaspending_api.etl.elasticsearch_loader_helpers import controller
+from usaspending_api.etl.elasticsearch_loader_helpers.checkpoint_ledger import (
+    PARTITION_DONE,
+    PARTITION_FAILED,
+    read_partition_states,
+)
+from usaspending_api.etl.management.commands.elasticsearch_indexer import set_config
 
 
 def test_get_id_range_for_partition_one_records():
@@ -200,6 +211,104 @@ def test_get_id_range_for_partition_with_empty_partitions():
     assert _remove_seen_ids(ctrl, record_ids) == set({})
 
 
+def test_get_id_range_for_partition_by_density(monkeypatch):
+    """Checks that density-based partitions hold equal counts of sparse records, and are contiguous over the range"""
+    record_ids = [1, 2, 3, 4, 5, 1000, 5000, 99999]
+    partition_size = 2
+    monkeypatch.setattr(
+        "usaspending_api.etl.elasticsearch_loader_helpers.extract_data.execute_sql_statement",
+        lambda sql, results, verbose: _mock_ntile_results(record_ids, len(record_ids) // partition_size),
+    )
+    etl_config = {
+        "partition_size": partition_size,
+        "partition_strategy": "density",
+        "primary_key": "id",
+        "sql_view": "test_view",
+        "verbose": False,
+    }
+    ctrl = Controller(etl_config)
+    ctrl.min_id = min(record_ids)
+    ctrl.max_id = max(record_ids)
+    ctrl.record_count = len(record_ids)
+    ctrl.config["partitions"] = ctrl.determine_partitions()
+    assert ctrl.config["partitions"] == 4
+    assert [count for _, _, count in ctrl.partition_bounds] == [2, 2, 2, 2]
+    assert ctrl.get_id_range_for_partition(0) == (1, 2)
+    assert ctrl.get_id_range_for_partition(1) == (3, 4)
+    assert ctrl.get_id_range_for_partition(2) == (5, 1000)
+    assert ctrl.get_id_range_for_partition(3) == (1001, 99999)
+    assert _remove_seen_ids(ctrl, set(record_ids)) == set({})
+
+
+def test_get_id_range_for_partition_by_density_with_repeated_ids(monkeypatch):
+    """Checks that buckets holding only an ID already seen in the prior bucket are merged into it"""
+    record_ids = [1, 7, 7, 7, 7, 9]
+    monkeypatch.setattr(
+        "usaspending_api.etl.elasticsearch_loader_helpers.extract_data.execute_sql_statement",
+        lambda sql, results, verbose: _mock_ntile_results(record_ids, 3),
+    )
+    etl_config = {
+        "partition_size": 2,
+        "partition_strategy": "density",
+        "primary_key": "id",
+        "sql_view": "test_view",
+        "verbose": False,
+    }
+    ctrl = Controller(etl_config)
+    ctrl.min_id = min(record_ids)
+    ctrl.max_id = max(record_ids)
+    ctrl.record_count = len(record_ids)
+    ctrl.config["partitions"] = ctrl.determine_partitions()
+    assert ctrl.partition_bounds == [(1, 7, 4), (8, 9, 2)]
+    assert _remove_seen_ids(ctrl, set(record_ids)) == set({})
+
+
+def test_construct_tasks_by_density_with_null_partition(monkeypatch):
+    """covid19-faba adds a partition of records without an ID, which is not one of the density-based partitions"""
+    record_ids = [1, 2, 3, 4, 5, 1000, 5000, 99999]
+    monkeypatch.setattr(
+        "usaspending_api.etl.elasticsearch_loader_helpers.extract_data.execute_sql_statement",
+        lambda sql, results, verbose: _mock_ntile_results(record_ids, 4),
+    )
+    config = set_config(
+        ["partition_size", "partition_strategy", "processes", "index_name"],
+        {
+            "load_type": "covid19-faba",
+            "partition_size": 2,
+            "partition_strategy": "density",
+            "processes": 2,
+            "index_name": "test-covid19-faba",
+            "verbosity": 1,
+        },
+    )
+    config["is_incremental_load"] = False
+    ctrl = Controller(config)
+    ctrl.min_id = min(record_ids)
+    ctrl.max_id = max(record_ids)
+    ctrl.record_count = len(record_ids)
+    ctrl.config["partitions"] = ctrl.determine_partitions()
+
+    tasks = ctrl.construct_tasks()
+
+    assert len(tasks) == 5
+    assert tasks[0].checkpoint_key == "null"
+    assert "IS NULL" in tasks[0].sql
+    assert [task.checkpoint_key for task in tasks[1:]] == ["1-2", "3-4", "5-1000", "1001-99999"]
+
+
+def _mock_ntile_results(record_ids, buckets):
+    """Mimics the results of the ntile() query used to sample partition bounds"""
+    record_ids = sorted(record_ids)
+    results = []
+    for bucket in range(buckets):
+        # ntile() puts any remainder records in the earliest buckets
+        size, remainder = divmod(len(record_ids), buckets)
+        start = bucket * size + min(bucket, remainder)
+        bucket_ids = record_ids[start : start + size + (1 if bucket < remainder else 0)]
+        results.append({"lower_bound": bucket_ids[0], "upper_bound": bucket_ids[-1], "count": len(bucket_ids)})
+    return results
+
+
 def _remove_seen_ids(ctrl, id_set):
     """Iterates through each bounded id-range, and removes IDs seen"""
     partition_range = range(0, ctrl.config["partitions"])
@@ -210,3 +319,107 @@ def _remove_seen_ids(ctrl, id_set):
             if lower_bound <= seen_id <= upper_bound:
                 unseen_ids.remove(seen_id)
     return unseen_ids
+
+
+def _etl_task(**kwargs):
+    defaults = {
+        "transform_func": lambda task, records: [{**record, "transformed": True} for record in records],
+        "queue_size": 2,
+    }
+    return TaskSpec(
+        name="test task",
+        index="test-index",
+        sql="",
+        view="test_view",
+        base_table="test_table",
+        base_table_id="id",
+        field_for_es_id="id",
+        primary_key="id",
+        partition_number=0,
+        is_incremental=False,
+        **{**defaults, **kwargs},
+    )
+
+
+def _patch_etl(monkeypatch, record_batches, load_error=None):
+    """Extracts the given batches, and returns the list of documents each load call is given"""
+    loaded = []
+
+    def _load_data_in_batches(task, batches, client):
+        for batch in batches:
+            if load_error:
+                raise load_error
+            loaded.extend(batch)
+        return len(loaded), 0
+
+    def _load_data(task, records, client):
+        loaded.extend(records)
+        return len(records), 0
+
+    def _extract_records_in_batches(task):
+        for batch in record_batches:
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+
+    module = "usaspending_api.etl.elasticsearch_loader_helpers.controller"
+    monkeypatch.setattr(f"{module}.abort", Event(), raising=False)
+    monkeypatch.setattr(f"{module}.extract_records_in_batches", _extract_records_in_batches)
+    monkeypatch.setattr(f"{module}.extract_records", lambda task: [r for b in record_batches for r in b])
+    monkeypatch.setattr(f"{module}.load_data_in_batches", _load_data_in_batches)
+    monkeypatch.setattr(f"{module}.load_data", _load_data)
+    return loaded
+
+
+def test_pipelined_transform_load_matches_serial(monkeypatch):
+    record_batches = [[{"id": i} for i in range(start, start + 3)] for start in range(0, 30, 3)]
+
+    serial_loaded = _patch_etl(monkeypatch, record_batches)
+    task = _etl_task()
+    serial_counts = controller.load_data(task, task.transform_func(task, controller.extract_records(task)), None)
+
+    streamed_loaded = _patch_etl(monkeypatch, record_batches)
+    streamed_counts = controller.stream_transform_load(_etl_task(is_streaming=True), None)
+
+    pipelined_loaded = _patch_etl(monkeypatch, record_batches)
+    pipelined_counts = controller.pipelined_transform_load(_etl_task(is_pipelined=True), None)
+
+    assert pipelined_counts == streamed_counts == serial_counts == (30, 0)
+    assert pipelined_loaded == streamed_loaded == serial_loaded
+    assert pipelined_loaded[0] == {"id": 0, "transformed": True}
+
+
+def test_pipelined_transform_load_raises_extract_errors(monkeypatch):
+    _patch_etl(monkeypatch, [[{"id": 1}], ValueError("extract failed")])
+    with pytest.raises(ValueError, match="extract failed"):
+        controller.pipelined_transform_load(_etl_task(is_pipelined=True), None)
+
+
+def test_pipelined_transform_load_raises_transform_errors(monkeypatch):
+    _patch_etl(monkeypatch, [[{"id": 1}], [{"id": 2}]])
+
+    def _transform(task, records):
+        raise ValueError("transform failed")
+
+    with pytest.raises(ValueError, match="transform failed"):
+        controller.pipelined_transform_load(_etl_task(is_pipelined=True, transform_func=_transform), None)
+
+
+def test_pipelined_transform_load_raises_load_errors(monkeypatch):
+    # More batches than fit on the queue, so the producer is left blocked on it when indexing fails
+    _patch_etl(monkeypatch, [[{"id": i}] for i in range(10)], load_error=ValueError("load failed"))
+    with pytest.raises(ValueError, match="load failed"):
+        controller.pipelined_transform_load(_etl_task(is_pipelined=True), None)
+
+
+@pytest.mark.parametrize("fail, state", [(0, PARTITION_DONE), (1, PARTITION_FAILED)])
+def test_extract_transform_load_checkpoints_failed_documents(monkeypatch, tmp_path, fail, state):
+    _patch_etl(monkeypatch, [[{"id": 1}, {"id": 2}]])
+    module = "usaspending_api.etl.elasticsearch_loader_helpers.controller"
+    monkeypatch.setattr(f"{module}.load_data", lambda task, records, client: (len(records) - fail, fail))
+    monkeypatch.setattr(f"{module}.instantiate_elasticsearch_client", lambda: None)
+    checkpoint_file = str(tmp_path / "test-index.jsonl")
+
+    controller.extract_transform_load(_etl_task(checkpoint_file=checkpoint_file, checkpoint_key="1-2"))
+
+    assert read_partition_states(checkpoint_file)["1-2"]["state"] == state
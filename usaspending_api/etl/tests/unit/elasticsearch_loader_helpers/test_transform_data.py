@@ -0,0 +1,131 @@
+from copy import deepcopy
+
+from usaspending_api.etl.elasticsearch_loader_helpers import aggregate_key_functions as funcs, TaskSpec
+from usaspending_api.etl.elasticsearch_loader_helpers.transform_data import transform_data
+from usaspending_api.etl.elasticsearch_loader_helpers.utilities import convert_postgres_json_array_to_list
+
+
+def _location(location_type, state_code, county_code, congressional_code):
+    return {
+        f"{location_type}_country_code": "USA",
+        f"{location_type}_country_name": "UNITED STATES",
+        f"{location_type}_state_code": state_code,
+        f"{location_type}_state_name": "Virginia",
+        f"{location_type}_state_fips": "51",
+        f"{location_type}_state_population": 8500000,
+        f"{location_type}_county_code": county_code,
+        f"{location_type}_county_name": "FAIRFAX",
+        f"{location_type}_county_population": 1100000,
+        f"{location_type}_congressional_code": congressional_code,
+        f"{location_type}_congressional_population": 750000,
+    }
+
+
+def _records():
+    records = [
+        {
+            "transaction_id": 1,
+            "recipient_name": "RECIPIENT A",
+            "recipient_unique_id": "123456789",
+            "recipient_hash": "1c4e21c0-a5a2-4b8a-b9c5-0f3a1c2b3d4e",
+            "recipient_levels": ["P", "C"],
+            "naics_code": "331122",
+            "naics_description": "STEEL",
+            "awarding_toptier_agency_name": "Department of Transportation",
+            "awarding_toptier_agency_abbreviation": "DOT",
+            "awarding_toptier_agency_id": 1,
+            "federal_accounts": [{"id": 2, "account_title": "B"}, {"account_title": "A", "id": 1}],
+            **_location("pop", "VA", "059", "11"),
+        },
+        {
+            "transaction_id": 2,
+            "recipient_name": "RECIPIENT B",
+            "recipient_unique_id": None,
+            "recipient_hash": None,
+            "recipient_levels": None,
+            "naics_code": None,
+            "naics_description": None,
+            "awarding_toptier_agency_name": None,
+            "awarding_toptier_agency_abbreviation": None,
+            "awarding_toptier_agency_id": None,
+            "federal_accounts": None,
+            **_location("pop", "VA", None, "11"),
+        },
+        {
+            "transaction_id": 3,
+            "recipient_name": "RECIPIENT A",
+            "recipient_unique_id": "123456789",
+            "recipient_hash": "1c4e21c0-a5a2-4b8a-b9c5-0f3a1c2b3d4e",
+            "recipient_levels": ["R"],
+            "naics_code": "331122",
+            "naics_description": "STEEL",
+            "awarding_toptier_agency_name": "Department of Transportation",
+            "awarding_toptier_agency_abbreviation": "DOT",
+            "awarding_toptier_agency_id": 1,
+            "federal_accounts": [],
+            **_location("pop", None, None, None),
+        },
+    ]
+    return records
+
+
+def _transform(records, is_columnar):
+    worker = TaskSpec(
+        name="test worker",
+        index=None,
+        sql=None,
+        view=None,
+        base_table=None,
+        base_table_id=None,
+        field_for_es_id="transaction_id",
+        primary_key="transaction_id",
+        partition_number=0,
+        is_incremental=False,
+        is_columnar_transform=is_columnar,
+    )
+    converters = {"federal_accounts": convert_postgres_json_array_to_list}
+    agg_key_creations = {
+        "awarding_toptier_agency_agg_key": funcs.awarding_toptier_agency_agg_key,
+        "naics_agg_key": funcs.naics_agg_key,
+        "pop_country_agg_key": funcs.pop_country_agg_key,
+        "pop_county_agg_key": funcs.pop_county_agg_key,
+        "pop_congressional_agg_key": funcs.pop_congressional_agg_key,
+        "pop_state_agg_key": funcs.pop_state_agg_key,
+        "recipient_agg_key": funcs.transaction_recipient_agg_key,
+    }
+    drop_fields = ["recipient_levels", "pop_state_population", "awarding_toptier_agency_id"]
+    return transform_data(worker, records, converters, agg_key_creations, drop_fields, "recipient_agg_key")
+
+
+def test_columnar_transform_matches_per_record_transform():
+    expected = _transform(_records(), is_columnar=False)
+    assert _transform(_records(), is_columnar=True) == expected
+
+    assert expected[0]["_id"] == 1
+    assert expected[0]["routing"] == expected[0]["recipient_agg_key"]
+    assert expected[1]["naics_agg_key"] is None
+    assert expected[1]["pop_county_agg_key"] is None
+    assert expected[1]["pop_congressional_agg_key"] is not None
+    assert expected[2]["pop_state_agg_key"] is None
+    assert "recipient_levels" not in expected[0]
+
+
+def test_columnar_agg_key_functions_match_per_record_functions():
+    records = [{**record, "pop_state_population": 8500000} for record in _records()]
+    for record in records:
+        record.update(
+            {
+                "awarding_subtier_agency_name": record["awarding_toptier_agency_name"],
+                "awarding_subtier_agency_code": "069",
+                "funding_toptier_agency_name": None,
+                "funding_toptier_agency_id": None,
+                "funding_subtier_agency_name": "Federal Aviation Administration",
+                "product_or_service_code": "1510",
+                "product_or_service_description": "AIRCRAFT",
+                **_location("recipient_location", "MD", "031", "08"),
+            }
+        )
+    columns = {field: [record[field] for record in records] for field in records[0]}
+
+    for row_func, columnar_func in funcs.COLUMNAR_AGG_KEY_FUNCTIONS.items():
+        assert columnar_func(columns) == [row_func(deepcopy(record)) for record in records], row_func.__name__
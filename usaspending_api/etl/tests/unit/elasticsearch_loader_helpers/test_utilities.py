@@ -1,4 +1,9 @@
-from usaspending_api.etl.elasticsearch_loader_helpers.utilities import is_snapshot_running
+from usaspending_api.etl.elasticsearch_loader_helpers.utilities import (
+    adjust_batch_size_for_rss,
+    is_snapshot_running,
+    MIN_STREAM_BATCH_SIZE,
+    PipelineStats,
+)
 
 
 def test_is_snapshot_running(monkeypatch):
@@ -34,3 +39,43 @@ def test_is_snapshot_running(monkeypatch):
     index_names = ["2021-02-12-transactions", "2021-02-12-awards"]
     result = is_snapshot_running(mock_client, index_names)
     assert result
+
+
+def test_adjust_batch_size_for_rss(monkeypatch):
+    class MockMemoryInfo:
+        rss = 2048
+
+    class MockProcess:
+        def memory_info(self):
+            return MockMemoryInfo()
+
+    monkeypatch.setattr("usaspending_api.etl.elasticsearch_loader_helpers.utilities.ps.Process", MockProcess)
+
+    # no cap provided
+    assert adjust_batch_size_for_rss(10000, None) == 10000
+
+    # under the cap
+    assert adjust_batch_size_for_rss(10000, 4096) == 10000
+
+    # over the cap halves the batch size
+    assert adjust_batch_size_for_rss(10000, 1024) == 5000
+
+    # over the cap never shrinks below the minimum
+    assert adjust_batch_size_for_rss(MIN_STREAM_BATCH_SIZE + 1, 1024) == MIN_STREAM_BATCH_SIZE
+    assert adjust_batch_size_for_rss(MIN_STREAM_BATCH_SIZE, 1024) == MIN_STREAM_BATCH_SIZE
+
+
+def test_pipeline_stats():
+    stats = PipelineStats(producer_wait_seconds=5.0, consumer_wait_seconds=1.0)
+    for depth in (1, 4, 4):
+        stats.record_queue_depth(depth)
+
+    assert stats.queue_depth_max == 4
+    assert stats.bottleneck == "ES-bound"
+    assert "queue depth avg: 3.0 max: 4" in str(stats)
+
+    stats.consumer_wait_seconds = 10.0
+    assert stats.bottleneck == "DB-bound"
+
+    # no samples recorded
+    assert "queue depth avg: 0.0 max: 0" in str(PipelineStats())
@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from decimal import Decimal
+from django.db import connection
+from types import SimpleNamespace
+
+from usaspending_api.awards.models import FinancialAccountsByAwards
+from usaspending_api.etl.submission_loader_helpers.bulk_copy_manager import BulkCopyManager
+
+
+def test_bulk_copy_manager(monkeypatch):
+    copies = []
+
+    def copy_expert(sql, rows):
+        copies.append((sql, rows.read()))
+
+    @contextmanager
+    def cursor():
+        yield SimpleNamespace(cursor=SimpleNamespace(copy_expert=copy_expert))
+
+    monkeypatch.setattr(connection, "cursor", cursor)
+    manager = BulkCopyManager(FinancialAccountsByAwards)
+    manager.batch_size = 2
+    for piid in ("A\tB", "C", "D"):
+        manager.append(
+            FinancialAccountsByAwards(piid=piid, submission_id=7, transaction_obligated_amount=Decimal("12.50"))
+        )
+
+    # A full batch is copied as soon as it is appended, and the rest on save_stragglers
+    assert len(copies) == 1
+    manager.save_stragglers()
+    manager.save_stragglers()
+    assert len(copies) == 2
+
+    sql, rows = copies[0]
+    columns = sql[sql.index("(") + 1 : sql.index(")")].replace('"', "").split(", ")
+    assert sql.startswith(f"COPY {FinancialAccountsByAwards._meta.db_table} (")
+    assert "financial_accounts_by_awards_id" not in columns
+
+    rows = [dict(zip(columns, row.split("\t"))) for row in rows.splitlines()]
+    rows += [dict(zip(columns, row.split("\t"))) for row in copies[1][1].splitlines()]
+    assert [row["piid"] for row in rows] == ["A\\tB", "C", "D"]
+    assert {row["submission_id"] for row in rows} == {"7"}
+    assert {row["transaction_obligated_amount"] for row in rows} == {"12.50"}
+    assert {row["fain"] for row in rows} == {"\\N"}
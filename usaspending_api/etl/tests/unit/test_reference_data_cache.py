@@ -0,0 +1,58 @@
+import pytest
+
+from usaspending_api.etl.reference_data_cache import ReferenceDataCache
+
+
+@pytest.fixture
+def table():
+    return {"loads": 0, "version": 1, "rows": {"A": 1}}
+
+
+@pytest.fixture
+def cache(table, monkeypatch):
+    def load():
+        table["loads"] += 1
+        return dict(table["rows"])
+
+    cache = ReferenceDataCache(ttl_seconds=60)
+    cache.register("letters", load, "SELECT 1")
+    monkeypatch.setattr(cache, "_current_version", lambda name: (table["version"],))
+    return cache
+
+
+def test_lookups_read_one_snapshot(cache, table):
+    assert cache.get("letters", "A") == 1
+    assert cache.get("letters", "B") is None
+    assert cache.get("letters", "B", default=0) == 0
+    assert cache.stats("letters") == {"hits": 1, "misses": 2, "loads": 1}
+    assert table["loads"] == 1
+
+    with pytest.raises(TypeError):
+        cache.rows("letters")["B"] = 2
+
+
+def test_snapshot_is_only_reloaded_when_its_version_changes(cache, table, monkeypatch):
+    cache.get("letters", "A")
+    table["rows"]["B"] = 2
+    assert cache.get("letters", "B") is None
+
+    # Past the TTL, but the table's version is unchanged
+    cache.ttl_seconds = 0
+    assert cache.get("letters", "B") is None
+    assert table["loads"] == 1
+
+    table["version"] = 2
+    assert cache.get("letters", "B") == 2
+    assert table["loads"] == 2
+
+
+def test_refresh_and_invalidate(cache, table):
+    cache.get("letters", "A")
+    table["rows"]["B"] = 2
+
+    cache.refresh("letters")
+    assert cache.get("letters", "B") == 2
+    table["rows"]["C"] = 3
+    cache.invalidate()
+    assert cache.get("letters", "C") == 3
+    assert cache.stats("letters")["loads"] == 3
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 import os
 import re
 import boto3
@@ -39,6 +39,32 @@ def format_value_for_sql(val, cur):
     return str(cur.mogrify("%s", (val,)), "utf-8")
 
 
+def format_value_for_copy(val):
+    """formats a value as a field in the text format of COPY"""
+    if val is None:
+        return "\\N"
+    if isinstance(val, bool):
+        val = "t" if val else "f"
+    elif isinstance(val, (list, tuple)):
+        val = "{{{}}}".format(",".join('"{}"'.format(str(v).replace("\\", "\\\\").replace('"', '\\"')) for v in val))
+    elif isinstance(val, date):
+        val = val.isoformat()
+    else:
+        val = str(val)
+    return val.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def format_column_list(columns, alias=None):
+    """creates a comma separated list of the quoted columns, qualified by the table alias if there is one"""
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(f'{prefix}"{column}"' for column in columns)
+
+
+def format_update_from_pairs(columns, alias, excluded=("create_date", "created_at")):
+    """creates the SET pairs of an UPDATE ... FROM statement, taking each column's value from the aliased table"""
+    return ", ".join(f'"{column}" = {alias}."{column}"' for column in columns if column not in excluded)
+
+
 def format_bulk_insert_list_column_sql(cursor, load_objects, type):
     """creates formatted sql text to put into a bulk insert statement"""
     keys = load_objects[0][type].keys()
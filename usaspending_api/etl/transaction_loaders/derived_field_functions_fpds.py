@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 from usaspending_api.broker.helpers.get_business_categories import get_business_categories
 from usaspending_api.common.helpers.date_helper import cast_datetime_to_utc
 from usaspending_api.common.helpers.date_helper import fy
-from usaspending_api.etl.transaction_loaders.cached_reference_data import subtier_agency_list
+from usaspending_api.etl.reference_data_cache import reference_data, SUBTIER_AGENCY
 
 
 def calculate_fiscal_year(broker_input):
@@ -18,7 +18,7 @@ def calculate_funding_agency(broker_input):
 
 
 def _fetch_subtier_agency_id(code):
-    return subtier_agency_list().get(code, {}).get("id")
+    return reference_data.get(SUBTIER_AGENCY, code, {}).get("id")
 
 
 def current_datetime(broker_input):
@@ -1,7 +1,8 @@
 import logging
 from psycopg2.extras import DictCursor
 from psycopg2 import Error
-from django.db import connection
+from django.conf import settings
+from django.db import connection, transaction
 
 from usaspending_api.etl.transaction_loaders.field_mappings_fpds import (
     transaction_fpds_nonboolean_columns,
@@ -13,13 +14,19 @@ from usaspending_api.etl.transaction_loaders.field_mappings_fpds import (
     transaction_fpds_functions,
     all_broker_columns,
 )
-from usaspending_api.etl.transaction_loaders.data_load_helpers import capitalize_if_string, false_if_null
+from usaspending_api.etl.transaction_loaders.data_load_helpers import (
+    capitalize_if_string,
+    false_if_null,
+    format_column_list,
+    format_update_from_pairs,
+)
 from usaspending_api.etl.transaction_loaders.generic_loaders import (
     update_transaction_fpds,
     update_transaction_normalized,
     insert_transaction_normalized,
     insert_transaction_fpds,
     insert_award,
+    copy_load_objects_to_temp_table,
 )
 from usaspending_api.common.helpers.timing_helpers import ConsoleTimer as Timer
 
@@ -98,7 +105,10 @@ def load_fpds_transactions(chunk):
             if broker_transactions:
                 load_objects = _transform_objects(broker_transactions)
 
-                retval = _load_transactions(load_objects)
+                if settings.FPDS_SET_BASED_LOAD:
+                    retval = _load_transactions_set_based(load_objects)
+                else:
+                    retval = _load_transactions(load_objects)
     logger.info("batch completed in {}".format(timer.as_string(timer.elapsed)))
     return retval
 
@@ -164,25 +174,27 @@ def _load_transactions(load_objects):
         # Handle transaction-to-award relationship for each transaction to be loaded
         for load_object in load_objects:
             try:
-                # AWARD GET OR CREATE
-                award_id = _matching_award(cursor, load_object)
-                if not award_id:
-                    # If there is no award, we need to create one
-                    award_id = insert_award(cursor, load_object)
-
-                load_object["transaction_normalized"]["award_id"] = award_id
+                # Each row in its own savepoint, so that a failed row doesn't abort the chunk's transaction it runs in
+                with transaction.atomic():
+                    # AWARD GET OR CREATE
+                    award_id = _matching_award(cursor, load_object)
+                    if not award_id:
+                        # If there is no award, we need to create one
+                        award_id = insert_award(cursor, load_object)
+
+                    load_object["transaction_normalized"]["award_id"] = award_id
+
+                    # TRANSACTION UPSERT
+                    transaction_id = _lookup_existing_transaction(cursor, load_object)
+                    if transaction_id:
+                        # Inject the Primary Key of transaction_normalized+transaction_fpds that was found, so that the
+                        # following updates can find it to update
+                        load_object["transaction_fpds"]["transaction_id"] = transaction_id
+                        _update_fpds_transaction(cursor, load_object, transaction_id)
+                    else:
+                        # If there is no transaction we create a new one.
+                        transaction_id = _insert_fpds_transaction(cursor, load_object)
                 ids_of_awards_created_or_updated.add(award_id)
-
-                # TRANSACTION UPSERT
-                transaction_id = _lookup_existing_transaction(cursor, load_object)
-                if transaction_id:
-                    # Inject the Primary Key of transaction_normalized+transaction_fpds that was found, so that the
-                    # following updates can find it to update
-                    load_object["transaction_fpds"]["transaction_id"] = transaction_id
-                    _update_fpds_transaction(cursor, load_object, transaction_id)
-                else:
-                    # If there is no transaction we create a new one.
-                    transaction_id = _insert_fpds_transaction(cursor, load_object)
                 load_object["transaction_fpds"]["transaction_id"] = transaction_id
                 load_object["award"]["latest_transaction_id"] = transaction_id
 
@@ -196,6 +208,118 @@ def _load_transactions(load_objects):
     return list(ids_of_awards_created_or_updated)
 
 
+def _load_transactions_set_based(load_objects):
+    """
+    Loads the same rows as _load_transactions, but with a few statements for the whole chunk: its rows are COPYed to
+    temporary tables, and its awards and existing transactions are found with joins against those. When any of the
+    statements fail, the chunk is rolled back and loaded one row at a time, so that only the failing rows are added to
+    failed_ids.
+
+    returns ids for each award touched
+    """
+    if any(load_object["transaction_fpds"]["unique_award_key"] is None for load_object in load_objects):
+        # Each of these gets an award of its own, which can't be matched back to it with a join
+        return _load_transactions(load_objects)
+
+    # Only the last copy of a transaction in the chunk is kept, as it would be when updating one row at a time
+    latest_load_objects = {}
+    for load_object in load_objects:
+        latest_load_objects[load_object["transaction_fpds"]["detached_award_proc_unique"]] = load_object
+    load_objects = list(latest_load_objects.values())
+    try:
+        with transaction.atomic():
+            with connection.connection.cursor() as cursor:
+                return _upsert_chunk(cursor, load_objects)
+    except Error as e:
+        logger.warning(
+            f"set-based load failed for a batch of {len(load_objects):,} transactions, loading them one at a time."
+            f"\nDetails: {e.pgerror}"
+        )
+        return _load_transactions(load_objects)
+
+
+def _upsert_chunk(cursor, load_objects):
+    # A new award is created from the first transaction of the chunk that belongs to it
+    award_load_objects = {}
+    for load_object in load_objects:
+        award_load_objects.setdefault(load_object["award"]["generated_unique_award_id"], load_object)
+
+    award_columns = copy_load_objects_to_temp_table(
+        cursor, list(award_load_objects.values()), "award", "awards", "temp_fpds_award"
+    )
+    normalized_columns = copy_load_objects_to_temp_table(
+        cursor, load_objects, "transaction_normalized", "transaction_normalized", "temp_fpds_transaction_normalized"
+    )
+    fpds_columns = copy_load_objects_to_temp_table(
+        cursor, load_objects, "transaction_fpds", "transaction_fpds", "temp_fpds_transaction_fpds"
+    )
+
+    # AWARD GET OR CREATE
+    cursor.execute(
+        f"""
+        insert into awards ({format_column_list(award_columns)})
+        select {format_column_list(award_columns, "t")}
+        from temp_fpds_award t
+        where not exists (select from awards a where a.generated_unique_award_id = t.generated_unique_award_id)
+        """
+    )
+    cursor.execute(
+        """
+        alter table temp_fpds_transaction_normalized
+            add column award_id bigint,
+            add column id bigint,
+            add column is_new boolean not null default false;
+        update temp_fpds_transaction_normalized t set award_id = a.id
+        from awards a where a.generated_unique_award_id = t.unique_award_key;
+        update temp_fpds_transaction_normalized t set id = f.transaction_id
+        from transaction_fpds f where f.detached_award_proc_unique = t.transaction_unique_id;
+        """
+    )
+
+    # TRANSACTION UPSERT
+    cursor.execute(
+        f"""
+        update transaction_fpds f set {format_update_from_pairs(fpds_columns, "t")}
+        from temp_fpds_transaction_fpds t
+        where f.detached_award_proc_unique = t.detached_award_proc_unique
+        """
+    )
+    cursor.execute(
+        f"""
+        update transaction_normalized n set {format_update_from_pairs(normalized_columns, "t")}, award_id = t.award_id
+        from temp_fpds_transaction_normalized t
+        where n.id = t.id
+        """
+    )
+    logger.debug(f"updated {cursor.rowcount:,} fpds transactions")
+    cursor.execute(
+        f"""
+        with inserted as (
+            insert into transaction_normalized ({format_column_list(normalized_columns)}, award_id)
+            select {format_column_list(normalized_columns, "t")}, t.award_id
+            from temp_fpds_transaction_normalized t
+            where t.id is null
+            returning id, transaction_unique_id
+        )
+        update temp_fpds_transaction_normalized t set id = i.id, is_new = true
+        from inserted i where i.transaction_unique_id = t.transaction_unique_id
+        """
+    )
+    cursor.execute(
+        f"""
+        insert into transaction_fpds (transaction_id, {format_column_list(fpds_columns)})
+        select n.id, {format_column_list(fpds_columns, "f")}
+        from temp_fpds_transaction_fpds f
+        inner join temp_fpds_transaction_normalized n on n.transaction_unique_id = f.detached_award_proc_unique
+        where n.is_new
+        """
+    )
+    logger.debug(f"created {cursor.rowcount:,} fpds transactions")
+
+    cursor.execute("select distinct award_id from temp_fpds_transaction_normalized")
+    return [row[0] for row in cursor.fetchall()]
+
+
 def _matching_award(cursor, load_object):
     """ Try to find an award for this transaction to belong to by unique_award_key"""
     find_matching_award_sql = "select id from awards where generated_unique_award_id = '{}'".format(
@@ -1,4 +1,9 @@
-from usaspending_api.etl.transaction_loaders.data_load_helpers import format_insert_or_update_column_sql
+import io
+
+from usaspending_api.etl.transaction_loaders.data_load_helpers import (
+    format_insert_or_update_column_sql,
+    format_value_for_copy,
+)
 
 
 def insert_award(cursor, load_object):
@@ -39,3 +44,25 @@ def insert_transaction_fpds(cursor, load_object):
     cursor.execute(transaction_fpds_sql)
     created_transaction_fpds = cursor.fetchall()
     return created_transaction_fpds
+
+
+def copy_load_objects_to_temp_table(cursor, load_objects, type, table, temp_table):
+    """
+    Creates a temporary table with the columns of `table` that the load objects have values for under `type`, and
+    COPYs those values into it. The table is dropped when the transaction ends.
+
+    returns the column names
+    """
+    columns = list(load_objects[0][type].keys())
+    column_list = ", ".join('"{}"'.format(column) for column in columns)
+    cursor.execute(
+        "CREATE TEMPORARY TABLE {} ON COMMIT DROP AS SELECT {} FROM {} LIMIT 0".format(temp_table, column_list, table)
+    )
+
+    rows = io.StringIO()
+    for load_object in load_objects:
+        rows.write("\t".join(format_value_for_copy(load_object[type][column]) for column in columns))
+        rows.write("\n")
+    rows.seek(0)
+    cursor.copy_expert("COPY {} ({}) FROM STDIN".format(temp_table, column_list), rows)
+    return columns
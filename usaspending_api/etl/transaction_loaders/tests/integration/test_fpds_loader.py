@@ -5,7 +5,8 @@ import pytest
 from django.core.management import call_command
 from model_mommy import mommy
 
-from usaspending_api.awards.models import Award, TransactionFPDS
+from usaspending_api.awards.models import Award, AwardRollupChangeLog, TransactionFPDS
+from usaspending_api.broker.management.commands import load_fpds_transactions as load_fpds_transactions_command
 from usaspending_api.etl.transaction_loaders.field_mappings_fpds import (
     transaction_fpds_nonboolean_columns,
     transaction_normalized_nonboolean_columns,
@@ -114,3 +115,64 @@ def test_load_source_procurement_by_ids():
     assert transactions_by_id[101].fiscal_year == 2010
     assert transactions_by_id[201].fiscal_year == 2010
     assert transactions_by_id[301].fiscal_year == 2011
+
+
+@pytest.mark.django_db
+def test_load_source_procurement_by_ids_set_based(settings):
+    """Same end-to-end load as above, with each chunk loaded by set-based statements, and then loaded again"""
+    settings.FPDS_SET_BASED_LOAD = True
+    source_procurement_id_list = [101, 201, 301]
+    _assemble_source_procurement_records(source_procurement_id_list)
+
+    call_command("load_fpds_transactions", "--ids", *source_procurement_id_list)
+
+    usaspending_transactions = TransactionFPDS.objects.all()
+    assert sorted(_.detached_award_procurement_id for _ in usaspending_transactions) == [101, 201, 301]
+    assert sorted(_.transaction.transaction_unique_id for _ in usaspending_transactions) == ["101", "201", "301"]
+
+    usaspending_awards = Award.objects.all()
+    assert len(usaspending_awards) == 1
+    new_award = usaspending_awards[0]
+    assert all(_.transaction.award_id == new_award.id for _ in usaspending_transactions)
+    assert new_award.transaction_unique_id == "101"
+    assert new_award.latest_transaction.transaction_unique_id == "301"
+    assert new_award.earliest_transaction.transaction_unique_id == "101"
+
+    transactions_by_id = {
+        transaction.detached_award_procurement_id: transaction.transaction for transaction in usaspending_transactions
+    }
+    assert transactions_by_id[101].fiscal_year == 2010
+    assert transactions_by_id[301].fiscal_year == 2011
+
+    # Loading the same records again updates the existing transactions and award instead of adding new ones
+    transaction_ids = sorted(_.transaction_id for _ in usaspending_transactions)
+    call_command("load_fpds_transactions", "--ids", *source_procurement_id_list)
+
+    assert sorted(_.transaction_id for _ in TransactionFPDS.objects.all()) == transaction_ids
+    assert list(Award.objects.values_list("id", flat=True)) == [new_award.id]
+
+
+@pytest.mark.django_db
+def test_interrupted_load_leaves_touched_awards_in_change_log(settings, monkeypatch, tmp_path):
+    settings.AWARD_ROLLUP_CHANGE_LOG = True
+    loaded_chunks = []
+
+    def load_chunk_then_fail(id_list):
+        if loaded_chunks:
+            raise RuntimeError("Lost the connection to the broker")
+        loaded_chunks.append(id_list)
+        return [1001, 1002]
+
+    monkeypatch.setattr(load_fpds_transactions_command, "load_fpds_transactions", load_chunk_then_fail)
+    monkeypatch.setattr(load_fpds_transactions_command.Command, "modified_award_ids", [])
+    monkeypatch.setattr(
+        load_fpds_transactions_command.Command, "gen_read_file_for_ids", staticmethod(lambda file: iter([["1"], ["2"]]))
+    )
+    id_file = tmp_path / "ids.txt"
+    id_file.write_text("1\n2\n")
+
+    with pytest.raises(RuntimeError):
+        call_command("load_fpds_transactions", "--file", str(id_file))
+
+    assert loaded_chunks == [[1]]
+    assert sorted(AwardRollupChangeLog.objects.values_list("award_id", flat=True)) == [1001, 1002]
@@ -1,4 +1,10 @@
-from usaspending_api.etl.transaction_loaders.data_load_helpers import capitalize_if_string, false_if_null
+from datetime import date, datetime
+
+from usaspending_api.etl.transaction_loaders.data_load_helpers import (
+    capitalize_if_string,
+    false_if_null,
+    format_value_for_copy,
+)
 
 
 def test_capitalize_if_string():
@@ -14,3 +20,15 @@ def test_false_if_null():
     assert false_if_null(True)
     assert not false_if_null(False)
     assert not false_if_null(None)
+
+
+def test_format_value_for_copy():
+    assert format_value_for_copy(None) == "\\N"
+    assert format_value_for_copy(True) == "t"
+    assert format_value_for_copy(False) == "f"
+    assert format_value_for_copy(1000001) == "1000001"
+    assert format_value_for_copy(date(2010, 1, 1)) == "2010-01-01"
+    assert format_value_for_copy(datetime(2010, 1, 1, 12, 30)) == "2010-01-01T12:30:00"
+    assert format_value_for_copy("LINE ONE\nLINE\tTWO\\") == "LINE ONE\\nLINE\\tTWO\\\\"
+    assert format_value_for_copy(["small_business", 'a "b"']) == '{"small_business","a \\\\"b\\\\""}'
+    assert format_value_for_copy([]) == "{}"
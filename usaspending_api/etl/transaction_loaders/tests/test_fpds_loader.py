@@ -88,6 +88,7 @@ def test_load_ids_empty():
 
 
 # These are patched in opposite order from when they're listed in the function params, because that's how the fixture works
+@patch("usaspending_api.etl.transaction_loaders.fpds_loader.transaction")
 @patch("usaspending_api.etl.transaction_loaders.fpds_loader.connection")
 @patch("usaspending_api.etl.transaction_loaders.derived_field_functions_fpds._fetch_subtier_agency_id", return_value=1)
 @patch("usaspending_api.etl.transaction_loaders.fpds_loader._extract_broker_objects")
@@ -113,6 +114,7 @@ def test_load_ids_dummy_id(
     mock__extract_broker_objects,
     mock___fetch_subtier_agency_id,
     mock_connection,
+    mock_transaction,
 ):
     """
     End-to-end unit test (which should not attempt database connections) to exercise the code-under-test
@@ -213,9 +215,10 @@ def test_create_load_object(monkeypatch):
     assert actual_result == expected_result
 
 
+@patch("usaspending_api.etl.transaction_loaders.fpds_loader.transaction")
 @patch("usaspending_api.etl.transaction_loaders.fpds_loader.connection")
 @patch("usaspending_api.etl.transaction_loaders.derived_field_functions_fpds._fetch_subtier_agency_id", return_value=1)
-def test_load_transactions(mock__fetch_subtier_agency_id, mock_connection):
+def test_load_transactions(mock__fetch_subtier_agency_id, mock_connection, mock_transaction):
     """Mostly testing that everything gets the primary keys it was looking for"""
 
     # Setup Mocks
@@ -0,0 +1,203 @@
+import logging
+import random
+
+from collections import Counter, deque
+from contextlib import contextmanager
+from django.db import connections
+from threading import Lock, Thread, local
+from time import monotonic, perf_counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("console")
+
+# Seconds the replica is behind the primary; 0 on the primary, or when the replica has replayed all it has received.
+# NULL when the replica isn't streaming from the primary, as then it can't know how far behind it is. The status of the
+# WAL receiver is NULL unless the user has pg_read_all_stats, in which case it is only known to be running.
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT FROM pg_stat_wal_receiver WHERE COALESCE(status, 'streaming') = 'streaming') THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# Share of reads spread evenly over the healthy databases, so that a database that was slow for a while still serves
+# enough queries for its latency to be measured again once it recovers
+EXPLORE_SHARE = 0.1
+
+_pinned = local()
+
+
+@contextmanager
+def pin_reads_to(alias: str):
+    """Routes the reads of the current thread to the database while in the context, as long as it isn't lagging"""
+    previous = getattr(_pinned, "alias", None)
+    _pinned.alias = alias
+    try:
+        yield
+    finally:
+        _pinned.alias = previous
+
+
+def pinned_alias() -> Optional[str]:
+    return getattr(_pinned, "alias", None)
+
+
+class AliasHealth:
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.latency_total = 0.0
+        self.in_flight = 0
+        self.lag_seconds = 0.0
+        self.routed = Counter()
+
+    def record_latency(self, seconds: float) -> None:
+        if len(self.latencies) == self.latencies.maxlen:
+            self.latency_total -= self.latencies[0]
+        self.latencies.append(seconds)
+        self.latency_total += seconds
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        return self.latency_total / len(self.latencies) if self.latencies else None
+
+
+class ReplicaHealth:
+    """
+    Health of each database that reads can be routed to, for choosing between them.
+
+    The latency of every query run through a Django connection that the wrapper is installed on, raw SQL included, is
+    kept over a rolling window of recent queries, along with the number of queries in flight. Replication lag is
+    sampled on a background thread, started by the first routing decision made once lag_sample_seconds have passed
+    since the last sample, so that no request waits on a slow or unreachable replica. As with the connections
+    themselves, all of it is per process.
+    """
+
+    def __init__(self, window: int, lag_sample_seconds: float, max_lag_seconds: float):
+        self.window = window
+        self.lag_sample_seconds = lag_sample_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self._aliases = {}
+        self._lock = Lock()
+        self._sample_lock = Lock()
+        self._sampled_at = None
+        self._sampler = None
+
+    def alias(self, alias: str) -> AliasHealth:
+        health = self._aliases.get(alias)
+        if health is None:
+            with self._lock:
+                health = self._aliases.setdefault(alias, AliasHealth(self.window))
+        return health
+
+    def install(self, connection) -> None:
+        """Measures the queries of the connection, which Django keeps per thread and alias"""
+        if self.execute_wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self.execute_wrapper)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        health = self.alias(context["connection"].alias)
+        with self._lock:
+            health.in_flight += 1
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - start
+            with self._lock:
+                health.in_flight -= 1
+                health.record_latency(elapsed)
+
+    def is_fresh(self, alias: str) -> bool:
+        return self.alias(alias).lag_seconds <= self.max_lag_seconds
+
+    def record_route(self, alias: str, reason: str) -> None:
+        health = self.alias(alias)
+        with self._lock:
+            health.routed[reason] += 1
+        logger.debug("Routed read to %s (%s)", alias, reason)
+
+    def choose(self, aliases: List[str]) -> str:
+        """
+        Picks one of the databases at random, weighted by the inverse of their mean latency times the queries they have
+        in flight, after leaving out those lagging by more than max_lag_seconds. The first database, expected to be the
+        primary, is never left out.
+        """
+        healthy = [aliases[0]]
+        for alias in aliases[1:]:
+            if self.is_fresh(alias):
+                healthy.append(alias)
+            else:
+                self.record_route(alias, "skipped_for_lag")
+        if len(healthy) == 1:
+            return healthy[0]
+
+        latencies = [self.alias(alias).mean_latency for alias in healthy]
+        measured = [latency for latency in latencies if latency]
+        # Databases without measurements yet are treated like the fastest, so that they are measured soon
+        default_latency = min(measured) if measured else 1.0
+        costs = [
+            (latency or default_latency) * (1 + self.alias(alias).in_flight)
+            for alias, latency in zip(healthy, latencies)
+        ]
+        inverse_total = sum(1 / cost for cost in costs)
+        weights = [(1 - EXPLORE_SHARE) * (1 / cost) / inverse_total + EXPLORE_SHARE / len(healthy) for cost in costs]
+        return random.choices(healthy, weights=weights)[0]
+
+    def sample_lag_if_due(self, aliases: List[str]) -> None:
+        """Starts sampling the lag of the replicas in the background, unless done recently or already under way"""
+        if self._sampled_at is not None and monotonic() - self._sampled_at < self.lag_sample_seconds:
+            return
+        if not self._sample_lock.acquire(blocking=False):
+            return
+        try:
+            self._sampled_at = monotonic()
+            self._sampler = Thread(target=self._sample_lag, args=(aliases,), name="replica-lag-sampler", daemon=True)
+            self._sampler.start()
+        except BaseException:
+            self._sample_lock.release()
+            raise
+
+    def _sample_lag(self, aliases: List[str]) -> None:
+        try:
+            for alias in aliases:
+                self.alias(alias).lag_seconds = _query_lag(alias)
+            self.log_stats()
+        finally:
+            # Django opened connections for this thread, which would otherwise be left open
+            connections.close_all()
+            self._sample_lock.release()
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                alias: {
+                    "mean_latency_ms": round(health.mean_latency * 1000, 1) if health.latencies else None,
+                    "queries_in_window": len(health.latencies),
+                    "in_flight": health.in_flight,
+                    # None when the replica couldn't be reached or isn't streaming from the primary
+                    "lag_seconds": None if health.lag_seconds == float("inf") else health.lag_seconds,
+                    "routed": dict(health.routed),
+                }
+                for alias, health in sorted(self._aliases.items())
+            }
+
+    def log_stats(self) -> None:
+        for alias, stats in self.stats().items():
+            logger.info(f"Database '{alias}': {stats}")
+
+
+def _query_lag(alias: str) -> float:
+    """
+    The replica's lag in seconds, or infinity if it can't be reached or isn't streaming from the primary, so that reads
+    avoid it until the next sample
+    """
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_QUERY)
+            lag = cursor.fetchone()[0]
+            return float("inf") if lag is None else float(lag)
+    except Exception:
+        logger.exception(f"Problem while sampling replication lag of '{alias}'")
+        return float("inf")
@@ -1,8 +1,17 @@
 import random
 
-from django.db import DEFAULT_DB_ALIAS
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
 from usaspending_api.references.models import FilterHash
 from usaspending_api.download.models.download_job import DownloadJob
+from usaspending_api.routers.replica_health import ReplicaHealth, pin_reads_to, pinned_alias
+
+ANALYTICS_DATABASE_ALIAS = "db_analytics"
+
+replica_health = ReplicaHealth(
+    settings.DB_ROUTER_LATENCY_WINDOW, settings.DB_ROUTER_LAG_SAMPLE_SECONDS, settings.DB_ROUTER_MAX_LAG_SECONDS
+)
 
 
 class ReadReplicaRouter:
@@ -43,3 +52,58 @@ class DefaultOnlyRouter(ReadReplicaRouter):
     """ For when only the default connection is used.  Prevents model access/migrations to Broker. """
 
     read_replicas = []
+
+
+class HealthAwareReadReplicaRouter(ReadReplicaRouter):
+    """
+    Balances reads between the USAspending databases by their health rather than at random.  Reads favor the
+    database with the lowest recent query latency and fewest queries in flight, and skip replicas lagging behind the
+    source by more than DB_ROUTER_MAX_LAG_SECONDS.  Reads of requests pinned to the dedicated analytics replica (see
+    PinAnalyticalReadsMiddleware) go to it alone, unless it is lagging.  Routing counts and each database's health
+    are served by /status/replicas/ and logged whenever lag is sampled.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.read_databases = list(self.usaspending_databases)
+        if ANALYTICS_DATABASE_ALIAS in settings.DATABASES:
+            self.usaspending_databases.append(ANALYTICS_DATABASE_ALIAS)
+
+    def db_for_read(self, model, **hints):
+        if model in [FilterHash, DownloadJob]:
+            return self._route(self.writable_database, "writable_model")
+
+        replica_health.sample_lag_if_due(self.usaspending_databases[1:])
+        pinned = pinned_alias()
+        if pinned in self.usaspending_databases:
+            if replica_health.is_fresh(pinned):
+                return self._route(pinned, "pinned")
+            replica_health.record_route(pinned, "skipped_for_lag")
+        return self._route(replica_health.choose(self.read_databases), "healthiest")
+
+    def db_for_write(self, model, **hints):
+        return self._route(self.writable_database, "write")
+
+    def _route(self, alias, reason):
+        replica_health.install(connections[alias])
+        replica_health.record_route(alias, reason)
+        return alias
+
+
+class PinAnalyticalReadsMiddleware:
+    """
+    Pins the reads of requests to the paths in DB_ANALYTICS_PATH_PREFIXES to the dedicated analytics replica, so that
+    heavy analytical queries don't slow down the rest of the API.  Only used along with HealthAwareReadReplicaRouter.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DB_ANALYTICS_PATH_PREFIXES or ANALYTICS_DATABASE_ALIAS not in settings.DATABASES:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.path_prefixes = tuple(settings.DB_ANALYTICS_PATH_PREFIXES)
+
+    def __call__(self, request):
+        if request.path.startswith(self.path_prefixes):
+            with pin_reads_to(ANALYTICS_DATABASE_ALIAS):
+                return self.get_response(request)
+        return self.get_response(request)
@@ -7,6 +7,7 @@ from rest_framework import status
 from usaspending_api.awards.v2.lookups.lookups import all_award_types_mappings
 from usaspending_api.search.tests.data.search_filters_test_data import non_legacy_filters, legacy_filters
 from usaspending_api.search.tests.data.utilities import setup_elasticsearch_test
+from usaspending_api.search.v2.views.spending_by_award import SpendingByAwardVisualizationViewSet
 
 
 @pytest.mark.django_db
@@ -1421,3 +1422,45 @@ def test_uei_keyword_filter(client, monkeypatch, spending_by_award_test_data, el
     assert resp.status_code == status.HTTP_200_OK
     assert len(resp.json().get("results")) == 1
     assert resp.json().get("results") == expected_result, "DEFC filter does not match expected result"
+
+
+@pytest.mark.django_db
+def test_append_recipient_hash_levels():
+    mommy.make("recipient.RecipientLookup", recipient_hash="00000000-0000-0000-0000-000000000001", duns="DUNS_1")
+    mommy.make("recipient.RecipientLookup", recipient_hash="00000000-0000-0000-0000-000000000002", duns="DUNS_2")
+    for recipient_level in ("R", "C", "P"):
+        mommy.make(
+            "recipient.RecipientProfile",
+            recipient_hash="00000000-0000-0000-0000-000000000001",
+            recipient_level=recipient_level,
+            recipient_name="RECIPIENT 1",
+        )
+    mommy.make(
+        "recipient.RecipientProfile",
+        recipient_hash="00000000-0000-0000-0000-000000000002",
+        recipient_level="R",
+        recipient_name="MULTIPLE RECIPIENTS",
+    )
+
+    view = SpendingByAwardVisualizationViewSet()
+    view.fields = ["Award ID", "recipient_id"]
+    results = [
+        {"recipient_id": "DUNS_1", "parent_recipient_unique_id": None},
+        {"recipient_id": "DUNS_1", "parent_recipient_unique_id": "PARENT_DUNS"},
+        {"recipient_id": "DUNS_2", "parent_recipient_unique_id": None},
+        {"recipient_id": "DUNS_3", "parent_recipient_unique_id": None},
+        {"recipient_id": None, "parent_recipient_unique_id": None},
+    ]
+    view.append_recipient_hash_levels(results)
+    assert [result["recipient_id"] for result in results] == [
+        "00000000-0000-0000-0000-000000000001-R",
+        "00000000-0000-0000-0000-000000000001-C",
+        None,
+        None,
+        None,
+    ]
+
+    view.fields = ["Award ID"]
+    results = [{"recipient_id": "DUNS_1", "parent_recipient_unique_id": None}]
+    view.append_recipient_hash_levels(results)
+    assert results == [{"parent_recipient_unique_id": None}]
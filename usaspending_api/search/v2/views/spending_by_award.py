@@ -1,5 +1,6 @@
 import copy
 
+from collections import defaultdict
 from sys import maxsize
 from django.conf import settings
 from django.db.models import F
@@ -39,7 +40,7 @@ from usaspending_api.recipient.v2.lookups import SPECIAL_CASES
 from usaspending_api.common.api_versioning import api_transformations, API_TRANSFORM_FUNCTIONS
 from usaspending_api.common.cache_decorator import cache_response
 from usaspending_api.common.helpers.api_helper import raise_if_award_types_not_valid_subset, raise_if_sort_key_not_valid
-from usaspending_api.common.helpers.sql_helpers import execute_sql_to_ordered_dictionary
+from usaspending_api.common.helpers.sql_helpers import get_connection
 from usaspending_api.common.query_with_filters import QueryWithFilters
 from usaspending_api.common.helpers.generic_helper import get_generic_filters_message
 from usaspending_api.common.validator.award_filter import AWARD_FILTER_NO_RECIPIENT_ID
@@ -325,25 +326,38 @@ class SpendingByAwardVisualizationViewSet(APIView):
 
         return response
 
-    # For an unknown reason, ES tends to return the awarding agency toptier codes as integers or floats, instead of as
-    # text. This function casts the code back to a string and appends any leading zeroes that were lost.
-    def get_agency_database_id(self, code):
-        code = str(code).zfill(3)
-        agency_id = Agency.objects.filter(toptier_agency__toptier_code=code, toptier_flag=True).first()
-        submission = SubmissionAttributes.objects.filter(toptier_code=code).first()
-        if submission is None or agency_id is None:
-            return None
-        return agency_id.id
-
-    def get_agency_slug(self, code):
-        code = str(code).zfill(3)
-        submission = ToptierAgencyPublishedDABSView.objects.filter(toptier_code=code).first()
-        if submission is None:
-            return None
-        return slugify(submission.name)
+    @staticmethod
+    def get_agency_database_ids(codes) -> dict:
+        """Database ids of the toptier Agencies with the given codes, for those with submissions"""
+        agency_ids = {}
+        for code, agency_id in (
+            Agency.objects.filter(toptier_agency__toptier_code__in=codes, toptier_flag=True)
+            .order_by("id")
+            .values_list("toptier_agency__toptier_code", "id")
+        ):
+            agency_ids.setdefault(code, agency_id)
+        submitted_codes = set(
+            SubmissionAttributes.objects.filter(toptier_code__in=codes)
+            .order_by()
+            .values_list("toptier_code", flat=True)
+            .distinct()
+        )
+        return {code: agency_id for code, agency_id in agency_ids.items() if code in submitted_codes}
+
+    @staticmethod
+    def get_agency_slugs(codes) -> dict:
+        agency_slugs = {}
+        for code, name in (
+            ToptierAgencyPublishedDABSView.objects.filter(toptier_code__in=codes)
+            .order_by("pk")
+            .values_list("toptier_code", "name")
+        ):
+            agency_slugs.setdefault(code, slugify(name))
+        return agency_slugs
 
     def construct_es_response_for_prime_awards(self, response) -> dict:
         results = []
+        rows_by_agency_code = defaultdict(list)
         for res in response:
             hit = res.to_dict()
             row = {k: hit[v] for k, v in self.constants["internal_id_fields"].items()}
@@ -368,9 +382,12 @@ class SpendingByAwardVisualizationViewSet(APIView):
             if row.get("Award Amount"):
                 row["Award Amount"] = float(row["Award Amount"])
             if row.get("Awarding Agency"):
-                code = row.pop("agency_code")
-                row["awarding_agency_id"] = self.get_agency_database_id(code)
-                row["agency_slug"] = self.get_agency_slug(code)
+                # For an unknown reason, ES tends to return the awarding agency toptier codes as integers or floats,
+                # instead of as text. The code is cast back to a string with any leading zeroes that were lost.
+                code = str(row.pop("agency_code")).zfill(3)
+                rows_by_agency_code[code].append(row)
+                row["awarding_agency_id"] = None
+                row["agency_slug"] = None
             if row.get("COVID-19 Obligations"):
                 row["COVID-19 Obligations"] = sum(
                     [
@@ -400,10 +417,20 @@ class SpendingByAwardVisualizationViewSet(APIView):
 
             if "Award ID" in self.fields:
                 row["Award ID"] = hit["display_award_id"]
-            row = self.append_recipient_hash_level(row)
-            row.pop("parent_recipient_unique_id")
             results.append(row)
 
+        # Agencies and recipients are looked up for the whole page at once rather than for each of its rows
+        if rows_by_agency_code:
+            agency_ids = self.get_agency_database_ids(rows_by_agency_code)
+            agency_slugs = self.get_agency_slugs(rows_by_agency_code)
+            for code, rows in rows_by_agency_code.items():
+                for row in rows:
+                    row["awarding_agency_id"] = agency_ids.get(code)
+                    row["agency_slug"] = agency_slugs.get(code)
+        self.append_recipient_hash_levels(results)
+        for row in results:
+            row.pop("parent_recipient_unique_id")
+
         last_record_unique_id = None
         last_record_sort_value = None
         offset = 1
@@ -436,36 +463,41 @@ class SpendingByAwardVisualizationViewSet(APIView):
             ],
         }
 
-    def append_recipient_hash_level(self, result) -> dict:
-
+    def append_recipient_hash_levels(self, results: list) -> None:
+        """Replaces the DUNS in the recipient_id of each result with the hash and level of its recipient profile"""
         if "recipient_id" not in self.fields:
-            result.pop("recipient_id")
-            return result
-        recipient_id = result.get("recipient_id")
-        parent_id = result.get("parent_recipient_unique_id")
-        if recipient_id:
-            special_cases = ", ".join([f"'{case}'" for case in SPECIAL_CASES])
-            sql = """(
-                    select
-                        rp.recipient_hash || '-' ||  rp.recipient_level as hash
-                    from
-                        recipient_profile rp
-                        inner join recipient_lookup rl on rl.recipient_hash = rp.recipient_hash
-                    where
-                        rl.duns = {recipient_id} and
-                        rp.recipient_level = case
-                            when {parent_recipient_unique_id} is null then 'R'
-                            else 'C'
-                        end and
-                    rp.recipient_name not in ({special_cases})
-            )""".format(
-                recipient_id=f"'{recipient_id}'",
-                parent_recipient_unique_id=f"'{parent_id}'" if parent_id else "null",
-                special_cases=special_cases,
-            )
-            row = execute_sql_to_ordered_dictionary(sql)
-            if len(row) > 0:
-                result["recipient_id"] = row[0].get("hash")
-            else:
-                result["recipient_id"] = None
-        return result
+            for result in results:
+                result.pop("recipient_id")
+            return
+
+        def recipient_key(result):
+            return str(result["recipient_id"]), "C" if result.get("parent_recipient_unique_id") else "R"
+
+        recipient_keys = {recipient_key(result) for result in results if result.get("recipient_id")}
+        if not recipient_keys:
+            return
+
+        sql = """
+            select
+                rl.duns,
+                rp.recipient_level,
+                rp.recipient_hash || '-' ||  rp.recipient_level as hash
+            from
+                recipient_profile rp
+                inner join recipient_lookup rl on rl.recipient_hash = rp.recipient_hash
+            where
+                (rl.duns, rp.recipient_level) in ({values}) and
+                rp.recipient_name not in %s
+        """.format(
+            values=", ".join(["(%s, %s)"] * len(recipient_keys))
+        )
+        params = [value for key in recipient_keys for value in key] + [tuple(SPECIAL_CASES)]
+        with get_connection().cursor() as cursor:
+            cursor.execute(sql, params)
+            recipient_hashes = {}
+            for duns, recipient_level, recipient_hash in cursor.fetchall():
+                recipient_hashes.setdefault((duns, recipient_level), recipient_hash)
+
+        for result in results:
+            if result.get("recipient_id"):
+                result["recipient_id"] = recipient_hashes.get(recipient_key(result))
@@ -5,6 +5,7 @@ For the full list of settings and their values: https://docs.djangoproject.com/e
 
 import dj_database_url
 import os
+import tempfile
 import ddtrace
 
 from django.db import DEFAULT_DB_ALIAS
@@ -30,6 +31,37 @@ CONNECTION_MAX_SECONDS = 10
 # MAX_CONNECTIONS in this case refers to those serving downloads
 DOWNLOAD_DB_WORK_MEM_IN_MB = os.environ.get("DOWNLOAD_DB_WORK_MEM_IN_MB", 128)
 
+# How download files are exported from the database
+# True: stream COPY output through psycopg2 straight into the row-limited part files, counting rows along the way;
+# False: write the whole file with a psql subprocess, then re-read it to count its rows and split it into parts
+DOWNLOAD_USE_NATIVE_COPY = os.environ.get("DOWNLOAD_USE_NATIVE_COPY", "").lower() in ["true", "1", "yes"]
+# With DOWNLOAD_USE_NATIVE_COPY, compress each part file into the zip while COPY is still writing the next one
+DOWNLOAD_PIPELINE_ZIP = os.environ.get("DOWNLOAD_PIPELINE_ZIP", "").lower() in ["true", "1", "yes"]
+
+# How many sources (e.g. prime contracts and prime assistance) of one download job are exported at the same time,
+# and how many source exports may run at once across all of the jobs of a download worker (0 for no limit)
+DOWNLOAD_SOURCE_CONCURRENCY = int(os.environ.get("DOWNLOAD_SOURCE_CONCURRENCY", 1))
+DOWNLOAD_MAX_CONCURRENT_SOURCES = int(os.environ.get("DOWNLOAD_MAX_CONCURRENT_SOURCES", 0))
+
+# How the award / transaction IDs matching an Elasticsearch-backed download are gathered
+# True: page through the hits sorted on the ID with search_after, copying each page into download_job_lookup;
+# False: run a partitioned terms aggregation per chunk of IDs and bulk insert them all at the end
+DOWNLOAD_STREAM_ES_IDS = os.environ.get("DOWNLOAD_STREAM_ES_IDS", "").lower() in ["true", "1", "yes"]
+
+# zlib level the data files of a download are deflated with (1 is fastest, 9 smallest, -1 the zlib default), and the
+# number of processes compressing them in parallel
+DOWNLOAD_ZIP_COMPRESSION_LEVEL = int(os.environ.get("DOWNLOAD_ZIP_COMPRESSION_LEVEL", -1))
+DOWNLOAD_ZIP_PROCESSES = int(os.environ.get("DOWNLOAD_ZIP_PROCESSES", 1))
+
+# Reuse the zip of a finished download with the same request over the same data, instead of generating it again
+DOWNLOAD_DEDUPLICATION = os.environ.get("DOWNLOAD_DEDUPLICATION", "").lower() in ["true", "1", "yes"]
+
+# Number of SQS dispatcher processes run by each download worker, and how many of them may run large downloads at once
+# (those estimated to write DOWNLOAD_WORKER_LARGE_JOB_ROWS or more rows), keeping the rest free for small downloads
+DOWNLOAD_WORKER_CONCURRENCY = int(os.environ.get("DOWNLOAD_WORKER_CONCURRENCY", 1))
+DOWNLOAD_WORKER_LARGE_LANE_SLOTS = int(os.environ.get("DOWNLOAD_WORKER_LARGE_LANE_SLOTS", 1))
+DOWNLOAD_WORKER_LARGE_JOB_ROWS = int(os.environ.get("DOWNLOAD_WORKER_LARGE_JOB_ROWS", MAX_DOWNLOAD_LIMIT))
+
 API_MAX_DATE = "2024-09-30"  # End of FY2024
 API_MIN_DATE = "2000-10-01"  # Beginning of FY2001
 API_SEARCH_MIN_DATE = "2007-10-01"  # Beginning of FY2008
@@ -93,6 +125,22 @@ if not DELETED_TRANSACTION_JOURNAL_FILES:
 
 ############################################################
 
+# Load each chunk of FPDS transactions with a few set-based statements against staged copies of its rows, instead
+# of looking up and writing the award and transaction of each row one at a time
+FPDS_SET_BASED_LOAD = os.environ.get("FPDS_SET_BASED_LOAD", "").lower() in ["true", "1", "yes"]
+# The same for each chunk of FABS transactions, which also resolves their agencies from a map loaded once per run
+# and creates their missing summary awards with a single bulk insert
+FABS_SET_BASED_LOAD = os.environ.get("FABS_SET_BASED_LOAD", "").lower() in ["true", "1", "yes"]
+
+# How long loaders use a snapshot of a reference table (e.g. agencies or object classes) before checking whether the
+# table has changed since it was loaded, and loading it again if so
+REFERENCE_DATA_CACHE_TTL_SECONDS = int(os.environ.get("REFERENCE_DATA_CACHE_TTL_SECONDS", 300))
+
+# Have the FPDS and FABS loaders append the awards they touch to award_rollup_change_log and recalculate them from
+# there in batches of at most AWARD_ROLLUP_BATCH_SIZE change log entries, instead of in one statement listing them all
+AWARD_ROLLUP_CHANGE_LOG = os.environ.get("AWARD_ROLLUP_CHANGE_LOG", "").lower() in ["true", "1", "yes"]
+AWARD_ROLLUP_BATCH_SIZE = int(os.environ.get("AWARD_ROLLUP_BATCH_SIZE", 50000))
+
 STATE_DATA_BUCKET = ""
 if not STATE_DATA_BUCKET:
     STATE_DATA_BUCKET = os.environ.get("STATE_DATA_BUCKET")
@@ -139,8 +187,22 @@ ES_TRANSACTIONS_NAME_SUFFIX = "transactions"
 ES_TRANSACTIONS_QUERY_ALIAS_PREFIX = "transaction-query"
 ES_TRANSACTIONS_WRITE_ALIAS = "transaction-load-alias"
 ES_TIMEOUT = 90
+
+# Elasticsearch clients are shared by everything in a process that connects with the same timeout.  Each keeps up to
+# ES_MAX_CONNECTIONS connections open per cluster node, reused across requests unless ES_KEEP_ALIVE is turned off.
+ES_MAX_CONNECTIONS = int(os.environ.get("ES_MAX_CONNECTIONS", 10))
+ES_KEEP_ALIVE = os.environ.get("ES_KEEP_ALIVE", "true").lower() in ["true", "1", "yes"]
+
+# Discover the cluster's nodes when a client is created, when a connection fails, and every ES_SNIFFER_TIMEOUT
+# seconds after that.  Only for clusters whose nodes are reachable at the addresses they publish.
+ES_SNIFF = os.environ.get("ES_SNIFF", "").lower() in ["true", "1", "yes"]
+ES_SNIFFER_TIMEOUT = int(os.environ.get("ES_SNIFFER_TIMEOUT", 60))
 ES_REPOSITORY = ""
 ES_ROUTING_FIELD = "recipient_agg_key"
+# Where elasticsearch_indexer keeps the ledger of completed partitions that --resume reads, outside of the repo
+ES_ETL_CHECKPOINT_DIR = os.environ.get(
+    "ES_ETL_CHECKPOINT_DIR", str(Path(tempfile.gettempdir()) / "usaspending_es_etl_checkpoints")
+)
 
 # Grants API
 GRANTS_API_KEY = os.environ.get("GRANTS_API_KEY")
@@ -231,6 +293,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "simple_history.middleware.HistoryRequestMiddleware",
     "usaspending_api.common.logging.LoggingMiddleware",
+    "usaspending_api.routers.replicas.PinAnalyticalReadsMiddleware",
 ]
 
 ROOT_URLCONF = "usaspending_api.urls"
@@ -279,7 +342,8 @@ def _configure_database_connection(environment_variable):
 # (which is "DATABASE_URL" by default). Generally speaking, DB_SOURCE is used to support server
 # environments that support the API/website and docker-compose local setup whereas DATABASE_URL
 # is used for development and operational environments (Jenkins primarily). If DB_SOURCE is provided,
-# then DB_R1 (read replica) must also be provided.
+# then DB_R1 (read replica) must also be provided.  DB_ANALYTICS optionally provides a replica dedicated to the
+# requests to DB_ANALYTICS_PATH_PREFIXES, used when DB_ROUTER_HEALTH_AWARE routes reads by database health.
 if os.environ.get("DB_SOURCE"):
     if not os.environ.get("DB_R1"):
         raise EnvironmentError("DB_SOURCE environment variable defined without DB_R1")
@@ -287,7 +351,12 @@ if os.environ.get("DB_SOURCE"):
         DEFAULT_DB_ALIAS: _configure_database_connection("DB_SOURCE"),
         "db_r1": _configure_database_connection("DB_R1"),
     }
-    DATABASE_ROUTERS = ["usaspending_api.routers.replicas.ReadReplicaRouter"]
+    if os.environ.get("DB_ANALYTICS"):
+        DATABASES["db_analytics"] = _configure_database_connection("DB_ANALYTICS")
+    if os.environ.get("DB_ROUTER_HEALTH_AWARE", "").lower() in ["true", "1", "yes"]:
+        DATABASE_ROUTERS = ["usaspending_api.routers.replicas.HealthAwareReadReplicaRouter"]
+    else:
+        DATABASE_ROUTERS = ["usaspending_api.routers.replicas.ReadReplicaRouter"]
 elif os.environ.get(dj_database_url.DEFAULT_ENV):
     DATABASES = {DEFAULT_DB_ALIAS: _configure_database_connection(dj_database_url.DEFAULT_ENV)}
     DATABASE_ROUTERS = ["usaspending_api.routers.replicas.DefaultOnlyRouter"]
@@ -296,6 +365,17 @@ else:
         "Either {} or DB_SOURCE/DB_R1 environment variable must be defined".format(dj_database_url.DEFAULT_ENV)
     )
 
+# Reads routed by HealthAwareReadReplicaRouter skip replicas lagging by more than DB_ROUTER_MAX_LAG_SECONDS, sampled
+# every DB_ROUTER_LAG_SAMPLE_SECONDS, and favor the database with the lowest mean latency over its last
+# DB_ROUTER_LATENCY_WINDOW queries
+DB_ROUTER_MAX_LAG_SECONDS = int(os.environ.get("DB_ROUTER_MAX_LAG_SECONDS", 60))
+DB_ROUTER_LAG_SAMPLE_SECONDS = int(os.environ.get("DB_ROUTER_LAG_SAMPLE_SECONDS", 30))
+DB_ROUTER_LATENCY_WINDOW = int(os.environ.get("DB_ROUTER_LATENCY_WINDOW", 200))
+# Comma separated path prefixes of heavy analytical endpoints whose reads go to the DB_ANALYTICS replica
+DB_ANALYTICS_PATH_PREFIXES = [
+    prefix for prefix in os.environ.get("DB_ANALYTICS_PATH_PREFIXES", "").split(",") if prefix
+]
+
 DOWNLOAD_DATABASE_URL = os.environ.get("DOWNLOAD_DATABASE_URL")
 
 # import a second database connection for ETL, connecting to the data broker
@@ -434,6 +514,22 @@ CACHE_ENVIRONMENTS = {
 # Set the usaspending-cache to whatever our environment cache dictates
 CACHES["usaspending-cache"] = CACHE_ENVIRONMENTS[CACHE_ENVIRONMENT]
 
+# In-process LRU tier in front of usaspending-cache for cached API responses, bounded by the total bytes of the
+# responses it holds (0 to disable). Its entries are not cleared with usaspending-cache, so keep the TTL short.
+LOCAL_RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("LOCAL_RESPONSE_CACHE_MAX_BYTES", 0))
+LOCAL_RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("LOCAL_RESPONSE_CACHE_TTL_SECONDS", 60))
+
+# Seconds that identical requests missing the response cache at the same time wait for the first of them to compute
+# and cache its response, rather than each running the same queries (0, the default, to disable). Followers in other
+# processes are held off by a lock in usaspending-cache that expires after the same number of seconds.
+RESPONSE_CACHE_SINGLE_FLIGHT_WAIT_SECONDS = int(os.environ.get("RESPONSE_CACHE_SINGLE_FLIGHT_WAIT_SECONDS", 0))
+
+# Serve responses cached before the last data load while refreshing them in the background. When enabled,
+# clear_usaspending_cache marks the cached responses stale instead of deleting them.
+RESPONSE_CACHE_SERVE_STALE = os.environ.get("RESPONSE_CACHE_SERVE_STALE", "").lower() in ["true", "1", "yes"]
+# Seconds before a stale response can be refreshed again, should the refresh already started not finish
+RESPONSE_CACHE_REVALIDATE_LOCK_SECONDS = int(os.environ.get("RESPONSE_CACHE_REVALIDATE_LOCK_SECONDS", 300))
+
 # DRF extensions
 REST_FRAMEWORK_EXTENSIONS = {
     # Not caching errors, these are logged to exceptions.log
@@ -2,10 +2,11 @@ import logging
 import psycopg2
 
 from datetime import timedelta
+from django.db import connection, transaction
 from django.db.models import Q
 from threading import Timer
 from traceback import format_exception
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from usaspending_api.common.helpers.date_helper import now
 from usaspending_api.common.helpers.sql_helpers import get_database_dsn_string, execute_dml_sql
 from usaspending_api.submissions.models import DABSLoaderQueue
@@ -45,6 +46,28 @@ def add_submission_ids(submission_ids: List[int]) -> int:
     return execute_dml_sql(sql)
 
 
+def set_toptier_codes(toptier_codes: Dict[int, str]) -> int:
+    """
+    Records the agency of submissions in the submission queue that don't have one yet so that loaders can keep each
+    agency's submissions in order.  Returns the count of submissions updated.
+    """
+    if not toptier_codes:
+        return 0
+
+    values = ", ".join(["(%s, %s)"] * len(toptier_codes))
+
+    sql = f"""
+        update  {DABSLoaderQueue._meta.db_table} as q
+        set     toptier_code = v.toptier_code
+        from    (values {values}) as v (submission_id, toptier_code)
+        where   q.submission_id = v.submission_id and q.toptier_code is null
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [v for pair in toptier_codes.items() for v in pair])
+        return cursor.rowcount
+
+
 def mark_force_reload(submission_ids: List[int]) -> int:
     """ Mark submissions as requiring a full reload. """
     if not submission_ids:
@@ -58,13 +81,24 @@ def mark_force_reload(submission_ids: List[int]) -> int:
 
 
 def claim_next_available_submission(
-    processor_id: str, exclude: Optional[List[int]] = None
+    processor_id: str,
+    exclude: Optional[List[int]] = None,
+    include: Optional[List[int]] = None,
+    keep_agencies_in_order: bool = False,
 ) -> Tuple[Optional[int], Optional[bool]]:
     """
     Finds a submission id that requires processing, claims it, and returns the submission id.
     Returns None if there are no available submission ids remaining in the queue.
+
+    When keep_agencies_in_order is set, submissions of an agency are claimed one at a time and in order; see
+    _claim_next_submission_in_agency_order.
     """
+    if keep_agencies_in_order:
+        return _claim_next_submission_in_agency_order(processor_id, exclude, include)
+
     q = ~Q(submission_id__in=exclude) if exclude else Q()
+    if include is not None:
+        q &= Q(submission_id__in=include)
     submissions = (
         DABSLoaderQueue.objects.filter(Q(Q(state=DABSLoaderQueue.READY) | Q(state=DABSLoaderQueue.FAILED)) & q)
         .order_by("-state", "submission_id")
@@ -77,6 +111,68 @@ def claim_next_available_submission(
     return None, None
 
 
+def _claim_next_submission_in_agency_order(
+    processor_id: str, exclude: Optional[List[int]], include: Optional[List[int]]
+) -> Tuple[Optional[int], Optional[bool]]:
+    """
+    Claims the lowest submission id that is the lowest READY or FAILED submission of its agency, while no
+    submission of that agency is in progress.  This lets any number of loaders work through the queue at once
+    without ever loading two submissions of the same agency simultaneously or out of order.  Submissions without
+    a toptier_code are treated as if each belonged to its own agency.
+
+    A submission excluded from this run still holds back the later submissions of its agency.  The submission is
+    picked and claimed by one statement, and claims are serialized by a transaction level advisory lock, so a loader
+    always sees the submissions claimed by the others before it picks one.
+    """
+    now_ = now()
+    filters = ""
+    params = [DABSLoaderQueue.IN_PROGRESS, processor_id, now_, now_, DABSLoaderQueue.READY, DABSLoaderQueue.FAILED]
+    if exclude:
+        filters += " and not (c.submission_id = any(%s))"
+        params.append(list(exclude))
+    include_filter = ""
+    if include is not None:
+        include_filter = " and e.submission_id = any(%s)"
+        filters += " and c.submission_id = any(%s)"
+        params.append(list(include))
+    params += [DABSLoaderQueue.IN_PROGRESS, DABSLoaderQueue.READY, DABSLoaderQueue.FAILED]
+    if include is not None:
+        params.append(list(include))
+
+    table = DABSLoaderQueue._meta.db_table
+    sql = f"""
+        update  {table} as q
+        set     state = %s, processor_id = %s, processing_started = %s, heartbeat = %s,
+                processing_failed = null, exception = null
+        where   q.submission_id = (
+                    select      c.submission_id
+                    from        {table} as c
+                    where       c.state in (%s, %s) and c.processor_id is null{filters} and (
+                                    c.toptier_code is null or (
+                                        not exists (
+                                            select from {table} as p
+                                            where p.toptier_code = c.toptier_code and p.state = %s
+                                        ) and c.submission_id = (
+                                            select  min(e.submission_id)
+                                            from    {table} as e
+                                            where   e.toptier_code = c.toptier_code and e.state in (%s, %s){include_filter}
+                                        )
+                                    )
+                                )
+                    order by    c.submission_id
+                    limit       1
+                )
+        returning q.submission_id, q.force_reload
+    """
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("select pg_advisory_xact_lock(hashtext(%s))", [table])
+            cursor.execute(sql, params)
+            claimed = cursor.fetchone()
+    return claimed or (None, None)
+
+
 def start_processing(submission_id: int, processor_id: str) -> int:
     """
     Claim the submission and update the processing_started timestamp.  Returns 1 if the submission
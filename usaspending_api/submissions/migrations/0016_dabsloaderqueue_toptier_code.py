@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0015_submissionattributes_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dabsloaderqueue',
+            name='toptier_code',
+            field=models.TextField(default=None, null=True),
+        ),
+    ]
@@ -13,6 +13,10 @@ class DABSLoaderQueue(Model):
     # Submission unique identifier.  Common to both USAspending and Broker.
     submission_id = IntegerField(primary_key=True)
 
+    # Agency (CGAC or FREC) of the submission in Broker.  When loaders are told to keep agencies in order, only the
+    # lowest pending submission of an agency can be claimed, and only while no other submission of it is in progress.
+    toptier_code = TextField(null=True, default=None)
+
     # There are also two conceptual states; ABANDONED is an IN_PROGRESS submission whose heartbeat
     # has exceeded ABANDONED_LOCK_MINUTES and COMPLETED which is a submission that was successfully
     # loaded but, since COMPLETED records are immediately deleted, is no longer in the table.
@@ -0,0 +1,93 @@
+import pytest
+
+from django.db import connection
+from model_mommy import mommy
+from threading import Barrier, Thread
+
+from usaspending_api.submissions import dabs_loader_queue_helpers as dlqh
+from usaspending_api.submissions.models import DABSLoaderQueue
+
+
+@pytest.mark.django_db
+def test_set_toptier_codes():
+    mommy.make("submissions.DABSLoaderQueue", submission_id=1)
+    mommy.make("submissions.DABSLoaderQueue", submission_id=2, toptier_code="020")
+
+    assert dlqh.set_toptier_codes({1: "010", 2: "099", 3: "030"}) == 1
+    assert dict(DABSLoaderQueue.objects.values_list("submission_id", "toptier_code")) == {1: "010", 2: "020"}
+
+
+@pytest.mark.django_db
+def test_claim_next_available_submission_keeps_agencies_in_order():
+    mommy.make("submissions.DABSLoaderQueue", submission_id=1, toptier_code="010", state=DABSLoaderQueue.IN_PROGRESS)
+    mommy.make("submissions.DABSLoaderQueue", submission_id=2, toptier_code="010")
+    mommy.make("submissions.DABSLoaderQueue", submission_id=3, toptier_code="020")
+    mommy.make("submissions.DABSLoaderQueue", submission_id=4, toptier_code="020")
+    mommy.make("submissions.DABSLoaderQueue", submission_id=5)
+
+    claimed = []
+    while True:
+        submission_id, _ = dlqh.claim_next_available_submission("test", keep_agencies_in_order=True)
+        if submission_id is None:
+            break
+        claimed.append(submission_id)
+
+    # Agency 010 is busy with submission 1, and agency 020 is now busy with submission 3
+    assert claimed == [3, 5]
+
+    dlqh.complete_processing(3, "test")
+    assert dlqh.claim_next_available_submission("test", keep_agencies_in_order=True) == (4, False)
+    assert dlqh.claim_next_available_submission("test", keep_agencies_in_order=True) == (None, None)
+
+    # Without the option, agencies don't matter
+    assert dlqh.claim_next_available_submission("test") == (2, False)
+
+
+@pytest.mark.django_db
+def test_claim_next_available_submission_keeps_failed_submissions_in_order():
+    mommy.make("submissions.DABSLoaderQueue", submission_id=1, toptier_code="010", state=DABSLoaderQueue.FAILED)
+    mommy.make("submissions.DABSLoaderQueue", submission_id=2, toptier_code="010")
+    mommy.make("submissions.DABSLoaderQueue", submission_id=3, toptier_code="020", state=DABSLoaderQueue.FAILED)
+
+    assert dlqh.claim_next_available_submission("test", keep_agencies_in_order=True) == (1, False)
+    assert dlqh.claim_next_available_submission("test", keep_agencies_in_order=True) == (3, False)
+    assert dlqh.claim_next_available_submission("test", keep_agencies_in_order=True) == (None, None)
+
+    # A failed submission skipped by this run still holds back the later submissions of its agency
+    dlqh.fail_processing(1, "test", RuntimeError("Broker went away"))
+    assert dlqh.claim_next_available_submission("test", [1], keep_agencies_in_order=True) == (None, None)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_claim_next_available_submission_keeps_agencies_in_order_across_loaders():
+    for submission_id in range(1, 6):
+        mommy.make("submissions.DABSLoaderQueue", submission_id=submission_id, toptier_code="010")
+    mommy.make("submissions.DABSLoaderQueue", submission_id=6, toptier_code="020")
+
+    loader_count = 8
+    barrier = Barrier(loader_count)
+    claimed = []
+
+    def claim(processor_id):
+        try:
+            barrier.wait()
+            claimed.append(dlqh.claim_next_available_submission(processor_id, keep_agencies_in_order=True)[0])
+        finally:
+            connection.close()
+
+    loaders = [Thread(target=claim, args=(f"loader{i}",)) for i in range(loader_count)]
+    for loader in loaders:
+        loader.start()
+    for loader in loaders:
+        loader.join()
+
+    assert sorted(submission_id for submission_id in claimed if submission_id is not None) == [1, 6]
+
+
+@pytest.mark.django_db
+def test_claim_next_available_submission_include():
+    mommy.make("submissions.DABSLoaderQueue", submission_id=1)
+    mommy.make("submissions.DABSLoaderQueue", submission_id=2)
+
+    assert dlqh.claim_next_available_submission("test", include=[2]) == (2, False)
+    assert dlqh.claim_next_available_submission("test", include=[2]) == (None, None)
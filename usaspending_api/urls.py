@@ -53,6 +53,7 @@ urlpatterns = [
     url(r"^api/v2/subawards/", include("usaspending_api.awards.v2.urls_subawards")),
     url(r"^api/v2/transactions/", include("usaspending_api.awards.v2.urls_transactions")),
     url(r"^docs/", include("usaspending_api.api_docs.urls")),
+    url(r"^status/replicas/", views.ReplicaStatusView.as_view()),
     url(r"^status/", views.StatusView.as_view()),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
@@ -2,8 +2,17 @@ from django.http import HttpResponse
 from django.views import View
 import json
 
+from usaspending_api.routers.replicas import replica_health
+
 
 class StatusView(View):
     def get(self, request, format=None):
         response_object = {"status": "running"}
         return HttpResponse(json.dumps(response_object))
+
+
+class ReplicaStatusView(View):
+    """Health of the databases reads are routed between, and how many reads went to each, in this process"""
+
+    def get(self, request, format=None):
+        return HttpResponse(json.dumps({"databases": replica_health.stats()}), content_type="application/json")